@@ -5,6 +5,7 @@ import boto3
 import os
 from dotenv import load_dotenv
 import json
+import gzip
 from datetime import datetime, timedelta
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
@@ -141,7 +142,11 @@ def handle_subscribe(data):
 @app.route('/api/notify-new-post', methods=['POST'])
 def notify_new_post():
     try:
-        post_data = request.json
+        # Larger batches from the ingestors arrive gzip-compressed
+        if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+            post_data = json.loads(gzip.decompress(request.get_data()))
+        else:
+            post_data = request.json
 
         if not post_data:
             return jsonify({"error": "Invalid post data"}), 400
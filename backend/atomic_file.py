@@ -0,0 +1,43 @@
+"""
+Atomic File Writes
+
+Helpers that write a file by writing a temporary file in the same directory
+and renaming it over the target, so readers never see a half-written file
+and a crash mid-write leaves the previous version intact.
+"""
+
+import os
+import json
+import tempfile
+
+
+def atomic_write_bytes(path, data, fsync=True):
+    """
+    Atomically replace path with data.
+
+    Args:
+        path: Destination file path
+        data: Bytes to write
+        fsync: Flush the data to disk before the rename
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+            if fsync:
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, obj, fsync=True, **json_kwargs):
+    """Atomically replace path with obj serialized as UTF-8 JSON"""
+    data = json.dumps(obj, **json_kwargs).encode('utf-8')
+    atomic_write_bytes(path, data, fsync=fsync)
@@ -0,0 +1,247 @@
+"""
+DynamoDB Batch Writer
+
+Buffers put requests and sends them with BatchWriteItem, up to 25 items per
+round trip. A batch is flushed when it is full or when its oldest item has
+waited flush_interval seconds. Unprocessed items are retried with
+exponential backoff, and every submitted item gets a Future that resolves
+once the item is written (or fails with the last error).
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import Future
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# BatchWriteItem limits and defaults
+MAX_BATCH_SIZE = 25  # Hard limit imposed by DynamoDB
+DEFAULT_FLUSH_INTERVAL = 1.0  # Seconds an item may wait before its batch is sent
+DEFAULT_MAX_RETRIES = 5  # Attempts for unprocessed or throttled items
+DEFAULT_BASE_BACKOFF = 0.05  # Seconds, doubled on each retry
+
+# Errors worth retrying for the whole request
+RETRYABLE_ERRORS = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable'
+}
+
+
+class BatchWriteError(Exception):
+    """Raised through an item's Future when it could not be written"""
+
+
+class DynamoBatchWriter:
+    """
+    Buffered write layer on top of BatchWriteItem.
+
+    Args:
+        dynamodb: boto3 DynamoDB resource
+        key_fields: Mapping of table name to its key attribute names, used to
+            match unprocessed items back to their Futures
+        max_batch_size: Items per BatchWriteItem request (at most 25)
+        flush_interval: Maximum seconds an item waits before being sent
+        max_retries: Attempts before an item is reported as failed
+        base_backoff: Initial retry delay in seconds
+    """
+
+    def __init__(self, dynamodb, key_fields, max_batch_size=MAX_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_retries=DEFAULT_MAX_RETRIES, base_backoff=DEFAULT_BASE_BACKOFF):
+        self.dynamodb = dynamodb
+        self.key_fields = key_fields
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+
+        self._pending = []  # (table_name, item, future, submitted_at)
+        self._in_flight = 0
+        self._flush_requested = False
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.requests_sent = 0
+        self.items_written = 0
+        self.items_failed = 0
+        self.retries = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="dynamo-batch-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Started DynamoDB batch writer (batch size {self.max_batch_size}, "
+                    f"flush interval {self.flush_interval}s)")
+
+    def stop(self):
+        """Write everything still buffered and stop the flush thread"""
+        self.flush()
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, table_name, item):
+        """
+        Buffer a put request.
+
+        Returns:
+            Future: resolves to True once the item is written, or raises BatchWriteError
+        """
+        future = Future()
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("DynamoDB batch writer is not running")
+            self._pending.append((table_name, item, future, time.monotonic()))
+            if len(self._pending) >= self.max_batch_size or len(self._pending) == 1:
+                self._condition.notify_all()
+        return future
+
+    def flush(self, timeout=None):
+        """Send everything buffered now and wait until it has been written or has failed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._running and (self._pending or self._in_flight):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._flush_requested = False
+        return True
+
+    def stats(self):
+        """Return a snapshot of the writer's counters"""
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'requests_sent': self.requests_sent,
+                'items_written': self.items_written,
+                'items_failed': self.items_failed,
+                'retries': self.retries
+            }
+
+    def _item_key(self, table_name, item):
+        """Build a hashable primary key for an item"""
+        return table_name, tuple(item.get(field) for field in self.key_fields[table_name])
+
+    def _next_batch(self):
+        """Wait until a batch is full, old enough, or a flush was requested"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    oldest_age = time.monotonic() - self._pending[0][3]
+                    if (len(self._pending) >= self.max_batch_size or oldest_age >= self.flush_interval
+                            or self._flush_requested or not self._running):
+                        break
+                    self._condition.wait(self.flush_interval - oldest_age)
+                elif not self._running:
+                    return []
+                else:
+                    self._condition.wait()
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            self._in_flight += len(batch)
+            return batch
+
+    def _run(self):
+        """Background loop that sends batches as they become ready"""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Unexpected error in DynamoDB batch writer: {e}")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(BatchWriteError(str(e)))
+            finally:
+                with self._condition:
+                    self._in_flight -= len(batch)
+                    self._condition.notify_all()
+
+    def _write_batch(self, batch):
+        """Send one batch, retrying unprocessed items with exponential backoff"""
+        # BatchWriteItem rejects duplicate keys in one request, so the latest item for a key wins
+        futures_by_key = {}
+        items_by_key = {}
+        for table_name, item, future, _ in batch:
+            key = self._item_key(table_name, item)
+            futures_by_key.setdefault(key, []).append(future)
+            items_by_key[key] = (table_name, item)
+
+        remaining = dict(items_by_key)
+        last_error = None
+
+        for attempt in range(1, self.max_retries + 1):
+            request_items = {}
+            for table_name, item in remaining.values():
+                request_items.setdefault(table_name, []).append({'PutRequest': {'Item': item}})
+
+            try:
+                with self._condition:
+                    self.requests_sent += 1
+                response = self.dynamodb.batch_write_item(RequestItems=request_items)
+                unprocessed = response.get('UnprocessedItems', {})
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                last_error = f"{error_code}: {e}"
+                if error_code not in RETRYABLE_ERRORS:
+                    break
+                unprocessed = None
+
+            if unprocessed is not None:
+                # Everything not listed as unprocessed was written
+                still_pending = {}
+                for table_name, requests in unprocessed.items():
+                    for request in requests:
+                        item = request['PutRequest']['Item']
+                        key = self._item_key(table_name, item)
+                        still_pending[key] = (table_name, item)
+
+                for key in remaining:
+                    if key not in still_pending:
+                        for future in futures_by_key[key]:
+                            future.set_result(True)
+                        with self._condition:
+                            self.items_written += len(futures_by_key[key])
+
+                remaining = still_pending
+                if not remaining:
+                    return
+                last_error = f"{len(remaining)} items left unprocessed"
+
+            if attempt < self.max_retries:
+                # Exponential backoff with jitter before retrying what's left
+                delay = self.base_backoff * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay)
+                with self._condition:
+                    self.retries += 1
+                logger.warning(f"Retrying {len(remaining)} DynamoDB items in {delay:.2f}s "
+                               f"(attempt {attempt}/{self.max_retries}): {last_error}")
+                time.sleep(delay)
+
+        logger.error(f"Failed to write {len(remaining)} DynamoDB items: {last_error}")
+        for key in remaining:
+            for future in futures_by_key[key]:
+                future.set_exception(BatchWriteError(last_error))
+            with self._condition:
+                self.items_failed += len(futures_by_key[key])
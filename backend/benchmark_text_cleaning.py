@@ -0,0 +1,96 @@
+"""
+Text Cleaning Benchmark
+
+Compares text_cleaning.clean_text / clean_texts with the six-pass clean_text
+the ingestors and train.py used before, and checks that the new version gives
+exactly the training output on every sample.
+
+Usage:
+    python benchmark_text_cleaning.py [posts.json] [--repeat N]
+
+The sample texts come from a posts JSON file (disaster_posts.json by default);
+a built-in set of typical posts is used if it is missing.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+
+from text_cleaning import clean_text, clean_texts
+
+# Typical posts, used when no posts file is available
+SAMPLE_POSTS = [
+    "BREAKING: 6.2 magnitude #earthquake hits near @usgs.bsky.social, check https://earthquake.usgs.gov/ for updates!!",
+    "Flooding on Main Street again... roads closed & people being evacuated #flood #weather",
+    "Wildfire smoke is so thick today, can't even see the mountains 🔥🔥 #wildfire #CAfire",
+    "Hurricane Milton now a Category 5 with 180mph winds @NHC_Atlantic https://nhc.noaa.gov/x?id=123",
+    "Just had my coffee and went for a run, beautiful morning!",
+    "Tornado warning until 7:45PM CDT for Lincoln County. Take shelter NOW. #wxtwitter",
+]
+
+
+# The implementation being replaced (training variant: punctuation and digits become spaces)
+def legacy_clean_text(text):
+    """Clean text by removing URLs, mentions, special chars, etc."""
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#(\w+)', r'\1', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\d+', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.lower()
+    return text
+
+
+def load_texts(path):
+    """Load post texts from a posts JSON file, or fall back to the built-in samples"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts = [post['text'] for post in json.load(f) if post.get('text')]
+        if texts:
+            return texts
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+    return SAMPLE_POSTS * 200
+
+
+def best_of(func, repeat):
+    """Return the fastest of repeat runs of func, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark text cleaning')
+    parser.add_argument('posts_file', nargs='?', default='disaster_posts.json', help='Posts JSON file')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation (best is reported)')
+    args = parser.parse_args()
+
+    texts = load_texts(args.posts_file)
+
+    # The new implementation must match training output exactly
+    mismatches = [text for text in texts if clean_text(text) != legacy_clean_text(text)]
+    if clean_texts(texts) != [legacy_clean_text(text) for text in texts]:
+        mismatches.append('<batch>')
+    if mismatches:
+        print(f"{len(mismatches)} texts differ from the training output, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+
+    legacy = best_of(lambda: [legacy_clean_text(text) for text in texts], args.repeat)
+    single = best_of(lambda: [clean_text(text) for text in texts], args.repeat)
+    batch = best_of(lambda: clean_texts(texts), args.repeat)
+
+    print(f"{len(texts)} texts, identical output")
+    print(f"legacy clean_text:  {legacy * 1e6 / len(texts):7.2f} us/text")
+    print(f"clean_text:         {single * 1e6 / len(texts):7.2f} us/text  ({legacy / single:.2f}x)")
+    print(f"clean_texts:        {batch * 1e6 / len(texts):7.2f} us/text  ({legacy / batch:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
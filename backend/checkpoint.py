@@ -0,0 +1,184 @@
+"""
+Checkpoint Store
+
+Keeps the per-keyword last processed timestamps in memory and writes them to
+disk periodically instead of on every update. Each write goes to a temporary
+file and is renamed over the checkpoint, and the previous good versions are
+kept as <path>.1, <path>.2, ... so a corrupt or missing checkpoint falls back
+to the newest readable one instead of resetting every keyword.
+
+The on-disk format is unchanged: a flat JSON object of keyword -> ISO
+timestamp, which connection_monitor.py also reads.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+from atomic_file import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+# Default checkpoint parameters
+DEFAULT_FLUSH_INTERVAL = 30.0  # Seconds between background flushes of pending updates
+DEFAULT_HISTORY = 2  # Previous checkpoints kept for recovery
+
+
+def _validate(data):
+    """Check that data is a keyword -> ISO timestamp mapping"""
+    if not isinstance(data, dict):
+        raise ValueError("checkpoint is not a JSON object")
+    for keyword, timestamp in data.items():
+        if not isinstance(timestamp, str):
+            raise ValueError(f"timestamp for '{keyword}' is not a string")
+        datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return data
+
+
+class CheckpointStore:
+    """
+    Coalescing, atomically persisted keyword -> timestamp map.
+
+    Args:
+        path: Checkpoint file path
+        flush_interval: Seconds between background flushes
+        history: Number of previous checkpoints kept as path.1 .. path.N
+    """
+
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL, history=DEFAULT_HISTORY):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.history = history
+
+        self._values = {}
+        self._dirty = False
+        self._last_written = None  # Bytes of the checkpoint currently on disk
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Statistics
+        self.updates = 0
+        self.flushes = 0
+
+    def _candidates(self):
+        return [self.path] + [f"{self.path}.{i}" for i in range(1, self.history + 1)]
+
+    def load(self, defaults=None):
+        """
+        Load the newest readable checkpoint.
+
+        Args:
+            defaults: Values used for keys missing from the checkpoint (or for
+                everything if no checkpoint can be read)
+
+        Returns:
+            dict: Copy of the loaded values
+        """
+        loaded = None
+        for candidate in self._candidates():
+            try:
+                with open(candidate, 'rb') as f:
+                    raw = f.read()
+                loaded = _validate(json.loads(raw.decode('utf-8')))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {candidate}: {e}")
+                continue
+
+            if candidate != self.path:
+                logger.warning(f"Recovered checkpoint from {candidate}")
+            else:
+                self._last_written = raw
+            break
+
+        with self._lock:
+            self._values = dict(defaults or {})
+            if loaded is not None:
+                self._values.update(loaded)
+            else:
+                logger.info("No checkpoint found; using defaults")
+            # Write back if anything was recovered or filled in from defaults
+            self._dirty = loaded is None or self._last_written is None or set(self._values) != set(loaded)
+            return dict(self._values)
+
+    def get(self, key, default=None):
+        """Return the value for key"""
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value):
+        """Record a new value; it is written on the next flush"""
+        with self._lock:
+            if self._values.get(key) != value:
+                self._values[key] = value
+                self._dirty = True
+                self.updates += 1
+
+    def snapshot(self):
+        """Return a copy of the current values"""
+        with self._lock:
+            return dict(self._values)
+
+    def flush(self):
+        """Write pending updates now, if there are any"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = json.dumps(self._values).encode('utf-8')
+            self._dirty = False
+
+        try:
+            self._write(data)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def _write(self, data):
+        """Shift the history and atomically replace the checkpoint"""
+        if self._last_written is not None and self.history > 0:
+            for i in range(self.history, 1, -1):
+                older = f"{self.path}.{i - 1}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i}")
+            # The history copy is written from memory so the live checkpoint never disappears
+            atomic_write_bytes(f"{self.path}.1", self._last_written)
+
+        atomic_write_bytes(self.path, data)
+        self._last_written = data
+        self.flushes += 1
+
+    def start(self):
+        """Start flushing pending updates every flush_interval seconds"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write anything pending"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                if self.flush():
+                    logger.debug(f"Flushed checkpoint to {self.path}")
+            except Exception as e:
+                logger.error(f"Error flushing checkpoint {self.path}: {e}")
+
+    def stats(self):
+        """Return update and flush counters"""
+        with self._lock:
+            return {'keys': len(self._values), 'updates': self.updates, 'flushes': self.flushes,
+                    'dirty': self._dirty}
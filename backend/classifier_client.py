@@ -0,0 +1,90 @@
+"""
+Classifier Client
+
+Thin client for the local classification service (classifier_service.py).
+Ingestors that set CLASSIFIER_URL send their cleaned texts here instead of
+loading their own copy of the model. Requests reuse one pooled keep-alive
+session. A service that is down or answers with an error raises
+ClassifierUnavailable rather than yielding a made-up prediction, so the
+caller can retry the posts later instead of storing them as non-disasters.
+"""
+
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Default client parameters
+DEFAULT_CONNECT_TIMEOUT = 2.0  # Seconds to establish a connection
+DEFAULT_READ_TIMEOUT = 30.0  # Seconds to wait for predictions
+DEFAULT_MAX_TEXTS = 256  # Texts per request
+
+
+class ClassifierUnavailable(Exception):
+    """The classification service could not classify a batch"""
+
+
+class ClassifierClient:
+    """
+    Client for the classification service.
+
+    Args:
+        url: Base URL of the service, e.g. http://127.0.0.1:8765
+        timeout: (connect, read) timeout in seconds for each request
+        max_texts: Texts sent per request
+    """
+
+    def __init__(self, url, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), max_texts=DEFAULT_MAX_TEXTS):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.max_texts = max_texts
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+
+    def predict(self, texts):
+        """
+        Classify cleaned texts through the service.
+
+        Returns:
+            tuple: ((label, confidence) tuples in the same order as texts, version of the model that made them)
+
+        Raises:
+            ClassifierUnavailable: If the service is unreachable or fails, or the model changed between requests
+        """
+        results = []
+        version = None
+        for start in range(0, len(texts), self.max_texts):
+            batch = texts[start:start + self.max_texts]
+            try:
+                response = self.session.post(f"{self.url}/classify", json={'texts': batch}, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                predictions = [(label, confidence) for label, confidence in data['predictions']]
+                batch_version = data.get('model_version')
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                raise ClassifierUnavailable(f"Error classifying {len(batch)} texts through {self.url}: {e}") from e
+            if len(predictions) != len(batch):
+                raise ClassifierUnavailable(f"{self.url} returned {len(predictions)} predictions for {len(batch)} texts")
+            if start and batch_version != version:
+                # A reload landed between requests; one call's predictions come from one model
+                raise ClassifierUnavailable(f"Model at {self.url} changed from {version} to {batch_version} mid-batch")
+            version = batch_version
+            results.extend(predictions)
+        return results, version
+
+    def health(self):
+        """Return the service's health report, or None if it is unreachable"""
+        try:
+            response = self.session.get(f"{self.url}/health", timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Classification service at {self.url} is not reachable: {e}")
+            return None
+
+    def close(self):
+        self.session.close()
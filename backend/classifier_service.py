@@ -0,0 +1,216 @@
+"""
+Classification Service
+
+Local HTTP service that loads the disaster classifier once and serves every
+ingestor on the box (main.py, custom_feed.py and the scripts in misc/), so
+running several sources takes one model's worth of memory. Requests from all
+clients go through a single InferenceBatcher, which combines them into shared
+micro-batches, and through a PredictionCache.
+
+Endpoints (localhost only by default):
+
+- POST /classify  {"texts": [...]} -> {"predictions": [[label, confidence], ...], "model_version": ...}
+- GET  /health    -> model version, batcher and cache statistics
+
+A new model at --model is picked up without a restart (also on SIGHUP), and
+the ingestors record the version reported with each response. The model
+admin endpoints (GET /admin/model, POST /admin/reload, see model_manager.py)
+are not served on --host: with --admin-port they get their own listener,
+bound to 127.0.0.1 whatever --host is.
+
+Run it with:
+
+    python classifier_service.py --model checkpoint-1800 --port 8765
+
+and point the ingestors at it with CLASSIFIER_URL=http://127.0.0.1:8765.
+"""
+
+import os
+import json
+import logging
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from inference import InferenceBatcher, DEFAULT_BATCH_SIZE, DEFAULT_MAX_WAIT
+from inference_backend import load_classifier, DEFAULT_BACKEND, DEFAULT_NUM_THREADS
+from prediction_cache import PredictionCache, DEFAULT_MAX_ENTRIES
+from model_manager import ModelManager, install_reload_signal, serve_admin, DEFAULT_WATCH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Service parameters
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_TEXTS_PER_REQUEST = 1024  # Larger requests are rejected
+MAX_BODY_BYTES = 4 * 1024 * 1024  # Larger request bodies are rejected
+
+
+class ClassifierService:
+    """
+    Loaded model, shared batcher and cache behind the HTTP handler.
+
+    Args:
+        model_path: Model bundle or fine-tuned checkpoint directory
+        backend: Inference backend (see inference_backend.py)
+        batch_size: Texts per forward pass
+        max_wait: Seconds the batcher waits to fill a batch
+        cache_size: Cached predictions
+        num_threads: Intra-op threads for inference
+        watch_interval: Seconds between checks of model_path for a new model (0 = don't watch)
+    """
+
+    def __init__(self, model_path, backend=DEFAULT_BACKEND, batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                 cache_size=DEFAULT_MAX_ENTRIES, num_threads=DEFAULT_NUM_THREADS, watch_interval=DEFAULT_WATCH_INTERVAL):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.num_threads = num_threads
+        self.cache = PredictionCache(max_entries=cache_size)
+        self.models = ModelManager(model_path, self._load_batcher, self._run_batcher, backend=backend, cache=self.cache,
+                                   watch_interval=watch_interval, warmup_batch_size=batch_size)
+        self.models.load()
+
+    def _load_batcher(self, model_path):
+        """Load a model behind its own batcher (started, so it can be warmed up)"""
+        tokenizer, model, id2label = load_classifier(model_path, self.backend, num_threads=self.num_threads)
+        batcher = InferenceBatcher(tokenizer, model, id2label, max_batch_size=self.batch_size, max_wait=self.max_wait)
+        batcher.start()
+        return tokenizer, batcher, id2label
+
+    @staticmethod
+    def _run_batcher(tokenizer, batcher, id2label, texts):
+        """Classify texts through a model's batcher, bypassing the cache (used for warm-up)"""
+        return batcher.predict(texts)
+
+    @property
+    def model_version(self):
+        return self.models.version
+
+    def start(self):
+        self.models.start()
+
+    def stop(self):
+        self.models.stop()
+
+    def classify(self, texts):
+        """
+        Classify texts, batching the cache misses with other clients' requests.
+
+        Returns:
+            tuple: (predictions, version of the model that made them)
+        """
+        with self.models.use() as loaded:
+            return self.cache.predict(texts, loaded.model.predict), loaded.version
+
+    def health(self):
+        batcher = self.models.current.model
+        return {
+            'status': 'ok',
+            'model_version': self.model_version,
+            'batches_run': batcher.batches_run,
+            'texts_classified': batcher.texts_classified,
+            'cache': self.cache.stats(),
+            'model': self.models.stats()
+        }
+
+
+def make_handler(service):
+    """Build a request handler class bound to a ClassifierService"""
+
+    class ClassifierRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive for the clients' pooled sessions
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, service.health())
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/classify':
+                self._send_json(404, {'error': 'Not found'})
+                return
+
+            length = int(self.headers.get('Content-Length') or 0)
+            if length <= 0 or length > MAX_BODY_BYTES:
+                self._send_json(413 if length > 0 else 400, {'error': 'Invalid request size'})
+                return
+            try:
+                texts = json.loads(self.rfile.read(length))['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings")
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {'error': f"Invalid request: {e}"})
+                return
+            if len(texts) > MAX_TEXTS_PER_REQUEST:
+                self._send_json(413, {'error': f"At most {MAX_TEXTS_PER_REQUEST} texts per request"})
+                return
+
+            try:
+                predictions, version = service.classify(texts)
+            except Exception as e:
+                logger.error(f"Error classifying {len(texts)} texts: {e}")
+                self._send_json(500, {'error': 'Classification failed'})
+                return
+            self._send_json(200, {
+                'predictions': [[label, confidence] for label, confidence in predictions],
+                'model_version': version
+            })
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} - {format % args}")
+
+    return ClassifierRequestHandler
+
+
+def main():
+    load_dotenv('.env')
+    parser = argparse.ArgumentParser(description="Local disaster classification service")
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'checkpoint-1800'), help="Model bundle or checkpoint directory")
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', DEFAULT_BACKEND))
+    parser.add_argument('--host', default=os.getenv('CLASSIFIER_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.getenv('CLASSIFIER_PORT', DEFAULT_PORT)))
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('INFERENCE_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+    parser.add_argument('--max-wait', type=float, default=float(os.getenv('INFERENCE_MAX_WAIT', DEFAULT_MAX_WAIT)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('INFERENCE_THREADS', DEFAULT_NUM_THREADS)))
+    parser.add_argument('--watch-interval', type=float,
+                        default=float(os.getenv('MODEL_WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL)),
+                        help="Seconds between checks of --model for a new model (0 = off)")
+    parser.add_argument('--admin-port', type=int, default=int(os.getenv('CLASSIFIER_ADMIN_PORT', 0)),
+                        help="Port for the model admin endpoints, always on 127.0.0.1 (0 = off)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    service = ClassifierService(args.model, args.backend, batch_size=args.batch_size, max_wait=args.max_wait,
+                                num_threads=args.threads, watch_interval=args.watch_interval)
+    service.start()
+    install_reload_signal(service.models)
+    admin_server = serve_admin(service.models, port=args.admin_port) if args.admin_port else None
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    logger.info(f"Classification service listening on http://{args.host}:{args.port} "
+                f"(model version {service.model_version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Classification service interrupted by user")
+    finally:
+        server.server_close()
+        if admin_server is not None:
+            admin_server.shutdown()
+        service.stop()
+
+
+if __name__ == '__main__':
+    main()
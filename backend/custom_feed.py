@@ -5,7 +5,6 @@ import json
 import os
 import requests  # Added for API notifications
 from atproto import Client, models
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, RobertaConfig
 import torch.nn.functional as F
 from dotenv import load_dotenv
 import re
@@ -14,6 +13,15 @@ import uuid
 from decimal import Decimal
 from botocore.exceptions import ClientError
 import threading
+from text_cleaning import clean_text
+from inference import MAX_SEQ_LENGTH
+from dedup import WindowedDedup
+from journal import PostJournal, compact_journal, DEFAULT_COMPACT_INTERVAL
+from outbox import NotificationOutbox
+from notifier import NotificationDispatcher
+from inference_backend import load_classifier, DEFAULT_BACKEND, DEFAULT_NUM_THREADS
+from classifier_client import ClassifierClient
+from prediction_cache import PredictionCache, model_version
 
 # Set up logging
 logging.basicConfig(
@@ -31,58 +39,31 @@ logger = logging.getLogger(__name__)
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:5000')
 NOTIFICATION_ENDPOINT = f"{API_BASE_URL}/api/notify-new-post"
 
-# Function to notify the Flask API about a new post
-def notify_api_about_new_post(post):
-    """Notify the Flask API about a new post"""
-    try:
-        # Create a JSON-serializable version of the post
-        # Convert Decimal to float for JSON serialization
-        serializable_post = {}
-        for key, value in post.items():
-            if isinstance(value, Decimal):
-                serializable_post[key] = float(value)
-            else:
-                serializable_post[key] = value
+# Batched, keep-alive delivery of new posts to the Flask API
+NOTIFICATION_OUTBOX_DIR = "feed_notification_outbox"  # Pending notifications, kept on disk until the API accepts them
+notification_dispatcher = NotificationDispatcher(NOTIFICATION_ENDPOINT, outbox=NotificationOutbox(NOTIFICATION_OUTBOX_DIR))
 
-        # Send notification to Flask API
-        payload = {
-            'post': serializable_post
-        }
+# CPU inference backend for the classifier
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', DEFAULT_BACKEND)  # torch (default), or opt in to int8, onnx or onnx-int8
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', DEFAULT_NUM_THREADS))  # Intra-op threads (0 = runtime default)
 
-        response = requests.post(
-            NOTIFICATION_ENDPOINT,
-            json=payload,
-            headers={'Content-Type': 'application/json'}
-        )
+# Cache of predictions by cleaned text, so reposts skip the model
+PREDICTION_CACHE_FILE = "feed_prediction_cache.json"
+prediction_cache = PredictionCache(path=PREDICTION_CACHE_FILE)
+
+# Shared classification service; when set, the model is not loaded in this process
+CLASSIFIER_URL = os.getenv('CLASSIFIER_URL', '')  # e.g. http://127.0.0.1:8765 (see classifier_service.py)
 
-        if response.status_code == 200:
-            logger.info(f"Successfully notified API about new post: {post['post_id']}")
-        else:
-            logger.warning(f"Failed to notify API: {response.status_code} - {response.text}")
 
+# Function to notify the Flask API about a new post
+def notify_api_about_new_post(post):
+    """Queue a post for delivery to the Flask API"""
+    try:
+        notification_dispatcher.submit(post)
     except Exception as e:
         logger.error(f"Error notifying API: {e}")
 
 
-# Text cleaning
-def clean_text(text):
-    """Clean text by removing URLs, mentions, special chars, etc."""
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    # Remove mentions
-    text = re.sub(r'@\w+', '', text)
-    # Remove hashtags (keep the text after #)
-    text = re.sub(r'#(\w+)', r'\1', text)
-    # Remove special characters and numbers
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\d+', '', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Convert to lowercase
-    text = text.lower()
-    return text
-
-
 # Extract location from text - placeholder for future NLP implementation
 def extract_location(text):
     """
@@ -128,6 +109,15 @@ load_dotenv('.env')
 
 FEED_URI = 'at://did:plc:qiknc4t5rq7yngvz7g4aezq7/app.bsky.feed.generator/aaaelfwqlfugs'
 
+# Snapshot of recently seen feed posts
+SEEN_POSTS_SNAPSHOT_FILE = "seen_posts.dedup"
+
+# Post journal; posts.json is the compacted "latest posts" view of it
+POSTS_JOURNAL_FILE = "posts.jsonl"
+POSTS_JSON_FILE = "posts.json"
+MAX_JSON_POSTS = 1000  # Posts kept in the compacted JSON view
+JOURNAL_COMPACT_INTERVAL = float(os.getenv('JOURNAL_COMPACT_INTERVAL', DEFAULT_COMPACT_INTERVAL))  # Seconds between JSON view refreshes
+
 # Define table names
 USERS_TABLE = 'DisasterFeed_Users'
 POSTS_TABLE = 'DisasterFeed_Posts'
@@ -160,37 +150,8 @@ def init_dynamodb():
 def init_model(model_path):
     """Initialize AI model with proper error handling"""
     try:
-        logger.info(f"Loading model from {model_path}")
-
-        # Load tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-
-        # Define label mappings
-        id2label = {
-            0: "avalanche", 1: "blizzard", 2: "bush_fire", 3: "cyclone",
-            4: "dust_storm", 5: "earthquake", 6: "flood", 7: "forest_fire",
-            8: "haze", 9: "hurricane", 10: "landslide", 11: "meteor",
-            12: "storm", 13: "tornado", 14: "tsunami", 15: "typhoon",
-            16: "unknown", 17: "volcano", 18: "wild_fire"
-        }
-
-        # Create the reversed mapping
-        label2id = {v: k for k, v in id2label.items()}
-
-        # Create configuration
-        config = RobertaConfig.from_pretrained(
-            "roberta-base",
-            num_labels=19,
-            id2label=id2label,
-            label2id=label2id
-        )
-
-        # Load model
-        model = AutoModelForSequenceClassification.from_pretrained(
-            model_path,
-            config=config,
-            ignore_mismatched_sizes=True
-        )
+        # Model bundles load offline from memory-mapped weights; plain checkpoints still work
+        tokenizer, model, id2label = load_classifier(model_path, INFERENCE_BACKEND, num_threads=INFERENCE_THREADS)
 
         logger.info("Model loaded successfully")
         return tokenizer, model, id2label
@@ -555,14 +516,24 @@ def put_weather_data(dynamodb, weather_data):
 # Predict disaster type from text
 def predict_disaster(tokenizer, model, id2label, text):
     """Predict disaster type from text"""
+    if isinstance(model, ClassifierClient):
+        # Raises ClassifierUnavailable if the service is down, rather than calling the post a non-disaster
+        predictions, _ = model.predict([text])
+        return predictions[0]
+
+    cached = prediction_cache.get(text)
+    if cached is not None:
+        return cached
+
     try:
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=MAX_SEQ_LENGTH)
         outputs = model(**inputs)
         probabilities = F.softmax(outputs.logits, dim=-1)
         predicted_index = probabilities.argmax().item()
         predicted_label = id2label[predicted_index]
         confidence_score = probabilities[0, predicted_index].item()
 
+        prediction_cache.put(text, (predicted_label, confidence_score))
         return predicted_label, confidence_score
     except Exception as e:
         logger.error(f"Error predicting disaster: {e}")
@@ -576,29 +547,22 @@ def process_feed(dynamodb, tokenizer, model, id2label, client):
     No exit condition needed - simplified version.
     """
     log_file_path = "disaster_feed_log.txt"
-    json_file_path = "posts.json"
 
     # Set a start time to filter posts
     start_time = datetime.datetime.now(datetime.timezone.utc)
     start_time_str = start_time.isoformat().replace('+00:00', 'Z')
     logger.info(f"Starting to monitor for new posts after: {start_time_str}")
 
-    # Initialize seen post tracker to avoid duplicates
-    seen_posts = set()
+    # Initialize seen post tracker to avoid duplicates, restored from the last snapshot
+    seen_posts = WindowedDedup.load(SEEN_POSTS_SNAPSHOT_FILE)
 
     # Polling configuration
     poll_interval = 10  # Seconds between polls
 
-    # Load existing posts data if file exists
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as json_file:
-            posts_data = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        posts_data = []
-
-    # Store the initial file content length for comparison
-    initial_post_count = len(posts_data)
-    logger.info(f"Loaded {initial_post_count} existing posts from JSON file")
+    # Processed posts are appended to the journal, one line each
+    journal = PostJournal(POSTS_JOURNAL_FILE)
+    compacted_records = 0  # Posts in the journal when posts.json was last refreshed
+    last_compacted = time.monotonic()
 
     # Open the log file
     with open(log_file_path, "a", encoding='utf-8') as log_file:
@@ -628,20 +592,19 @@ def process_feed(dynamodb, tokenizer, model, id2label, client):
                             # Extract post URI for duplicate checking
                             uri = post.post.uri
 
-                            # Skip if we've already seen this post
-                            if uri in seen_posts:
-                                continue
-
-                            # Add to seen posts set
-                            seen_posts.add(uri)
-
                             # Parse the post's indexed_at timestamp
                             indexed_at = safe_parse_date(post.post.indexed_at)
+                            indexed_at_timestamp = indexed_at.replace(tzinfo=datetime.timezone.utc)
+
+                            # Skip if we've already seen this post; it is recorded once processed,
+                            # so a post that fails (e.g. the classifier is down) is tried again next poll
+                            if seen_posts.seen(uri):
+                                continue
 
                             # Skip posts that are older than when we started
-                            indexed_at_timestamp = indexed_at.replace(tzinfo=datetime.timezone.utc)
                             if indexed_at_timestamp < start_time:
                                 # This post is from before we started running
+                                seen_posts.add(uri, indexed_at_timestamp.timestamp())
                                 continue
 
                             # We've found a genuinely new post - process it
@@ -724,8 +687,9 @@ def process_feed(dynamodb, tokenizer, model, id2label, client):
                                 "location": location_name
                             }
 
-                            # Add to posts data (at the beginning for newest first)
-                            posts_data.insert(0, json_post_data)
+                            # Constant-size append instead of rewriting the whole posts file
+                            journal.append(json_post_data)
+                            seen_posts.add(uri, indexed_at_timestamp.timestamp())
 
                             # Log the new post
                             current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -748,19 +712,17 @@ def process_feed(dynamodb, tokenizer, model, id2label, client):
                     if processed_count > 0:
                         logger.info(f"Processed {processed_count} truly new posts")
 
-                        # Save the posts data to JSON regularly
-                        # Limit the number of posts we keep to avoid huge files
-                        max_json_posts = 1000
-                        if len(posts_data) > max_json_posts:
-                            posts_data = posts_data[:max_json_posts]
-
-                        with open(json_file_path, "w", encoding="utf-8") as json_file:
-                            json.dump(posts_data, json_file, indent=4, ensure_ascii=False)
-
-                        logger.info(f"Saved {len(posts_data)} posts to JSON")
+                        # Snapshot the seen posts so a restart doesn't reprocess them
+                        seen_posts.save(SEEN_POSTS_SNAPSHOT_FILE)
                     else:
                         logger.info("No new posts found in this polling cycle")
 
+                    # Refresh posts.json for the web interface
+                    if journal.records != compacted_records and time.monotonic() - last_compacted >= JOURNAL_COMPACT_INTERVAL:
+                        compact_journal(POSTS_JOURNAL_FILE, POSTS_JSON_FILE, limit=MAX_JSON_POSTS)
+                        compacted_records = journal.records
+                        last_compacted = time.monotonic()
+
                 except Exception as e:
                     error_text = str(e)
 
@@ -794,9 +756,14 @@ def process_feed(dynamodb, tokenizer, model, id2label, client):
         finally:
             # Always save the latest data before exiting
             try:
-                with open(json_file_path, "w", encoding="utf-8") as json_file:
-                    json.dump(posts_data, json_file, indent=4, ensure_ascii=False)
-                logger.info("Saved posts data before exit")
+                journal.close()
+                compact_journal(POSTS_JOURNAL_FILE, POSTS_JSON_FILE, limit=MAX_JSON_POSTS)
+                logger.info("Compacted post journal before exit")
+
+                seen_posts.save(SEEN_POSTS_SNAPSHOT_FILE)
+                logger.info("Saved seen posts snapshot before exit")
+
+                prediction_cache.save()
             except Exception as e:
                 logger.error(f"Error saving final data: {e}")
 
@@ -1063,7 +1030,16 @@ def main(force_recreate_tables=False):
 
         # Initialize AI model
         MODEL_PATH = r'F:\AI SCHOOL\checkpoint-1800'
-        tokenizer, model, id2label = init_model(MODEL_PATH)
+        if CLASSIFIER_URL:
+            logger.info(f"Using classification service at {CLASSIFIER_URL}")
+            tokenizer, model, id2label = None, ClassifierClient(CLASSIFIER_URL), None
+            model.health()
+        else:
+            tokenizer, model, id2label = init_model(MODEL_PATH)
+
+            # Reuse cached predictions only if they came from this model
+            prediction_cache.set_model_version(model_version(MODEL_PATH, INFERENCE_BACKEND))
+            prediction_cache.load()
 
         # List existing tables
         logger.info("Listing existing tables...")
@@ -1127,6 +1103,9 @@ def main(force_recreate_tables=False):
         session_thread.start()
         logger.info("Started session monitoring thread")
 
+        # Start notification delivery
+        notification_dispatcher.start()
+
         # Process new posts
         logger.info("Starting new posts only mode...")
         process_feed_with_fallbacks(dynamodb, tokenizer, model, id2label, client)
@@ -1135,6 +1114,9 @@ def main(force_recreate_tables=False):
         logger.info("Application interrupted by user")
     except Exception as e:
         logger.error(f"Fatal error in main: {e}")
+    finally:
+        # Deliver any notifications still buffered
+        notification_dispatcher.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+"""
+Windowed Post Deduplication
+
+Fixed-memory record of recently seen post URIs. Posts are bucketed by their
+indexed_at time and each bucket has its own Bloom filter; once a bucket falls
+out of the window it is dropped, so memory never grows past
+window / bucket filters. The filters can be snapshotted to disk so a restart
+does not replay or re-classify recent posts.
+"""
+
+import os
+import json
+import math
+import struct
+import hashlib
+import logging
+import threading
+
+from atomic_file import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+# Default dedup parameters
+DEFAULT_WINDOW = 48 * 60 * 60  # Seconds of indexed_at history to remember
+DEFAULT_BUCKET = 60 * 60  # Seconds of indexed_at covered by each Bloom filter
+DEFAULT_BUCKET_CAPACITY = 20000  # Expected posts per bucket
+DEFAULT_FALSE_POSITIVE_RATE = 0.001  # Chance a new post is wrongly reported as seen
+
+# Snapshot file format
+SNAPSHOT_MAGIC = b'DDUP1'
+
+
+class BloomFilter:
+    """Plain Bloom filter over a bytearray, using double hashing of a BLAKE2b digest"""
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate):
+        """Size a filter for capacity items at the given false-positive rate"""
+        num_bits = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class WindowedDedup:
+    """
+    Rotating Bloom filter keyed by indexed_at bucket.
+
+    Args:
+        window: Seconds of history to remember
+        bucket: Seconds covered by each filter
+        bucket_capacity: Expected posts per bucket
+        false_positive_rate: Target false-positive rate across the whole window
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, bucket=DEFAULT_BUCKET, bucket_capacity=DEFAULT_BUCKET_CAPACITY,
+                 false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        self.window = window
+        self.bucket = bucket
+        self.bucket_capacity = bucket_capacity
+        self.false_positive_rate = false_positive_rate
+        self.num_buckets = max(1, int(math.ceil(window / bucket)))
+
+        # A lookup checks every live bucket, so split the error budget between them
+        template = BloomFilter.for_capacity(bucket_capacity, false_positive_rate / self.num_buckets)
+        self.num_bits = template.num_bits
+        self.num_hashes = template.num_hashes
+
+        self._filters = {}  # bucket index -> BloomFilter
+        self._newest_bucket = None
+        self._lock = threading.Lock()
+
+    def _bucket_index(self, timestamp):
+        return int(timestamp // self.bucket)
+
+    def _rotate(self, bucket_index):
+        """Advance the window to include bucket_index and drop buckets that fell out"""
+        if self._newest_bucket is None or bucket_index > self._newest_bucket:
+            self._newest_bucket = bucket_index
+            oldest_allowed = bucket_index - self.num_buckets + 1
+            for stale in [index for index in self._filters if index < oldest_allowed]:
+                del self._filters[stale]
+
+    def _in_window(self, bucket_index):
+        return self._newest_bucket is None or bucket_index > self._newest_bucket - self.num_buckets
+
+    def seen(self, key):
+        """Return True if key was recorded in any live bucket"""
+        with self._lock:
+            return any(key in bloom for bloom in self._filters.values())
+
+    def add(self, key, timestamp):
+        """Record key under the bucket for timestamp (epoch seconds)"""
+        with self._lock:
+            self._add(key, timestamp)
+
+    def _add(self, key, timestamp):
+        bucket_index = self._bucket_index(timestamp)
+        self._rotate(bucket_index)
+        if not self._in_window(bucket_index):
+            # Older than anything we remember; nothing to record
+            return
+        bloom = self._filters.get(bucket_index)
+        if bloom is None:
+            bloom = BloomFilter(self.num_bits, self.num_hashes)
+            self._filters[bucket_index] = bloom
+        bloom.add(key)
+
+    def check_and_add(self, key, timestamp):
+        """
+        Atomically test and record a key.
+
+        Returns:
+            bool: True if the key had already been seen
+        """
+        with self._lock:
+            if any(key in bloom for bloom in self._filters.values()):
+                return True
+            self._add(key, timestamp)
+            return False
+
+    def stats(self):
+        """Return size and fill information"""
+        with self._lock:
+            return {
+                'buckets': len(self._filters),
+                'max_buckets': self.num_buckets,
+                'items': sum(bloom.count for bloom in self._filters.values()),
+                'memory_bytes': len(self._filters) * ((self.num_bits + 7) // 8),
+                'max_memory_bytes': self.num_buckets * ((self.num_bits + 7) // 8)
+            }
+
+    def save(self, path):
+        """Atomically snapshot all live buckets to path"""
+        with self._lock:
+            header = {
+                'window': self.window,
+                'bucket': self.bucket,
+                'bucket_capacity': self.bucket_capacity,
+                'false_positive_rate': self.false_positive_rate,
+                'num_bits': self.num_bits,
+                'num_hashes': self.num_hashes,
+                'newest_bucket': self._newest_bucket,
+                'buckets': [[index, bloom.count] for index, bloom in sorted(self._filters.items())]
+            }
+            chunks = [bytes(self._filters[index].bits) for index, _ in header['buckets']]
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        data = SNAPSHOT_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(chunks)
+        atomic_write_bytes(path, data)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Restore a snapshot written by save(), or start empty.
+
+        kwargs are the constructor parameters; a snapshot written with different
+        parameters is discarded rather than reused.
+        """
+        dedup = cls(**kwargs)
+        if not os.path.exists(path):
+            return dedup
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(SNAPSHOT_MAGIC):
+                raise ValueError("not a dedup snapshot")
+            offset = len(SNAPSHOT_MAGIC)
+            (header_length,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            header = json.loads(data[offset:offset + header_length].decode('utf-8'))
+            offset += header_length
+
+            if (header['num_bits'], header['num_hashes'], header['bucket']) != (
+                    dedup.num_bits, dedup.num_hashes, dedup.bucket):
+                logger.warning(f"Dedup snapshot {path} was written with different parameters; starting empty")
+                return dedup
+
+            bucket_bytes = (dedup.num_bits + 7) // 8
+            for index, count in header['buckets']:
+                bloom = BloomFilter(dedup.num_bits, dedup.num_hashes,
+                                    bytearray(data[offset:offset + bucket_bytes]))
+                bloom.count = count
+                dedup._filters[index] = bloom
+                offset += bucket_bytes
+
+            if header['newest_bucket'] is not None:
+                dedup._rotate(header['newest_bucket'])
+            logger.info(f"Loaded dedup snapshot from {path}: {dedup.stats()}")
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Could not load dedup snapshot {path}: {e}; starting empty")
+            dedup = cls(**kwargs)
+
+        return dedup
@@ -0,0 +1,175 @@
+"""
+Disaster Classifier Inference
+
+Batched inference helpers for the RoBERTa disaster classifier. Texts are
+tokenized together, padded to the longest text in the batch and run through
+the model in a single forward pass, which is much cheaper on CPU than one
+forward pass per post.
+
+Texts are truncated to the sequence length the model was trained with, and
+sorted by token length before they are split into batches, so each batch
+holds texts of similar length and little compute goes into padding.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+# Batching parameters
+DEFAULT_BATCH_SIZE = 32  # Texts per forward pass
+DEFAULT_MAX_WAIT = 0.05  # Seconds the batcher waits to fill a batch
+MAX_SEQ_LENGTH = 128  # Tokens per text; matches max_length in train.py
+
+
+# Classify a list of texts in padded batches
+def predict_disaster_batch(tokenizer, model, id2label, texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Predict disaster types for a list of cleaned texts.
+
+    Args:
+        tokenizer: The HuggingFace tokenizer
+        model: The sequence classification model
+        id2label: Mapping from class index to label
+        texts: List of cleaned texts
+        batch_size: Maximum number of texts per forward pass
+
+    Returns:
+        list: (label, confidence) tuples in the same order as texts
+
+    Raises:
+        Exception: Whatever tokenizing or the forward pass raised. A failed batch is never reported as
+            "unknown", which would store the posts as non-disasters and move the checkpoint past them
+    """
+    results = [None] * len(texts)
+    if not texts:
+        return []
+
+    encodings = tokenizer(texts, truncation=True, max_length=MAX_SEQ_LENGTH)['input_ids']
+
+    # Batch texts of similar token length together to minimize padding
+    order = sorted(range(len(texts)), key=lambda index: len(encodings[index]))
+
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        inputs = tokenizer.pad({'input_ids': [encodings[index] for index in batch]}, return_tensors="pt")
+        with torch.inference_mode():
+            outputs = model(**inputs)
+        probabilities = F.softmax(outputs.logits, dim=-1)
+        confidences, indices = probabilities.max(dim=-1)
+
+        for position, index, confidence in zip(batch, indices.tolist(), confidences.tolist()):
+            results[position] = (id2label[index], confidence)
+
+    return results
+
+
+class InferenceBatcher:
+    """
+    Collects texts submitted from any thread into micro-batches.
+
+    A background thread waits up to max_wait seconds for max_batch_size
+    texts to arrive, then classifies them in one forward pass and resolves
+    the Future returned by submit() for each text.
+    """
+
+    def __init__(self, tokenizer, model, id2label, max_batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.id2label = id2label
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.batches_run = 0
+        self.texts_classified = 0
+
+    def start(self):
+        """Start the background batching thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Started inference batcher (batch size {self.max_batch_size}, max wait {self.max_wait}s)")
+
+    def stop(self):
+        """Stop the batching thread after classifying anything still pending"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, text):
+        """Queue a text for classification and return a Future for its (label, confidence)"""
+        future = Future()
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Inference batcher is not running")
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch_size:
+                self._condition.notify_all()
+            elif len(self._pending) == 1:
+                # Wake the worker so it starts the batching window
+                self._condition.notify_all()
+        return future
+
+    def predict(self, texts):
+        """Classify texts through the batcher and wait for all results, in order"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _next_batch(self):
+        """Wait for a full batch or for the batching window to close"""
+        with self._condition:
+            while self._running and not self._pending:
+                self._condition.wait()
+
+            if self._pending:
+                deadline = time.monotonic() + self.max_wait
+                while self._running and len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        """Background loop that classifies queued texts batch by batch"""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = predict_disaster_batch(self.tokenizer, self.model, self.id2label, texts,
+                                                 batch_size=self.max_batch_size)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error in inference batcher: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches_run += 1
+            self.texts_classified += len(batch)
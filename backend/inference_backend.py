@@ -0,0 +1,329 @@
+"""
+Inference Backends
+
+CPU inference backends for the RoBERTa disaster classifier, selected with
+INFERENCE_BACKEND:
+
+- torch: the full-precision HuggingFace model, run eagerly in PyTorch (default)
+- int8: PyTorch dynamic quantization of every Linear layer to int8 weights
+- onnx: the model exported to ONNX and run with onnxruntime
+- onnx-int8: the ONNX export with int8 dynamically quantized weights
+
+Every backend is called like the HuggingFace model (model(**inputs).logits),
+so predict_disaster_batch and the InferenceBatcher work with any of them.
+The quantized backends shift confidences slightly, which matters for posts
+near the 0.95 database threshold, so they are opt-in: run the parity check
+below on your own sample before switching.
+
+The ONNX exports are cached under ONNX_CACHE_DIR, keyed by a digest of the
+model weights, so new weights always get a fresh export and the watched
+model directory is never written to.
+
+Run this module to check a backend against the fp32 model on a held-out
+sample (top-1 agreement, confidence deltas, latency and memory):
+
+    python inference_backend.py parity checkpoint-1800 --backend int8 --sample disaster_posts.json
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import resource
+import argparse
+from types import SimpleNamespace
+
+import torch
+import torch.nn.functional as F
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+from inference import MAX_SEQ_LENGTH
+from model_bundle import load_model_files, read_manifest, file_digest
+
+logger = logging.getLogger(__name__)
+
+# Backend names
+BACKEND_TORCH = 'torch'
+BACKEND_INT8 = 'int8'
+BACKEND_ONNX = 'onnx'
+BACKEND_ONNX_INT8 = 'onnx-int8'
+BACKENDS = (BACKEND_TORCH, BACKEND_INT8, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# Default parameters
+DEFAULT_BACKEND = BACKEND_TORCH  # Quantized backends are opt-in through INFERENCE_BACKEND
+DEFAULT_NUM_THREADS = 0  # Intra-op threads for inference (0 lets the runtime decide)
+ONNX_CACHE_DIR = os.getenv('ONNX_CACHE_DIR', 'onnx_cache')  # ONNX exports, one subdirectory per model weights digest
+ONNX_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model.int8.onnx'
+ONNX_OPSET = 14
+WEIGHT_SUFFIXES = ('.safetensors', '.bin')  # Checkpoint weight files hashed into the export key
+DEFAULT_PARITY_SAMPLE = 500  # Held-out texts used by the parity check
+DEFAULT_MIN_AGREEMENT = 0.99  # Top-1 agreement with fp32 a backend should reach
+
+
+def resident_memory_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class OnnxClassifier:
+    """
+    onnxruntime session that can be called like a HuggingFace model.
+
+    Args:
+        path: Path of the exported .onnx model
+        num_threads: Intra-op threads (0 lets onnxruntime decide)
+    """
+
+    def __init__(self, path, num_threads=DEFAULT_NUM_THREADS):
+        if onnxruntime is None:
+            raise ImportError("onnxruntime is required for the ONNX inference backends")
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def __call__(self, **inputs):
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names if name in inputs}
+        logits = self.session.run(['logits'], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+
+def quantize_int8(model):
+    """Quantize the model's Linear layers to int8 in place (weights int8, activations quantized on the fly)"""
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def export_onnx(model, path, opset=ONNX_OPSET):
+    """Export the classifier to ONNX with dynamic batch and sequence axes"""
+    model.eval()
+    dummy = {
+        'input_ids': torch.ones(1, 8, dtype=torch.long),
+        'attention_mask': torch.ones(1, 8, dtype=torch.long)
+    }
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in dummy}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    # Write to a temporary name first so a failed export doesn't leave a broken model behind
+    # (per process, since spawned inference workers may export at the same time)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.inference_mode():
+        torch.onnx.export(model, (dummy['input_ids'], dummy['attention_mask']), temp_path,
+                          input_names=list(dummy), output_names=['logits'], dynamic_axes=dynamic_axes,
+                          opset_version=opset, do_constant_folding=True)
+    os.replace(temp_path, path)
+    logger.info(f"Exported ONNX model to {path}")
+    return path
+
+
+def weights_digest(model_dir):
+    """
+    Digest of a model's weights, used to key its ONNX exports.
+
+    Bundles use the version fixed at export time (a digest of model.safetensors);
+    checkpoints hash their weight files' contents.
+    """
+    manifest = read_manifest(model_dir)
+    if manifest is not None:
+        return manifest['model_version']
+    digest = hashlib.blake2b(digest_size=8)
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith(WEIGHT_SUFFIXES):
+            digest.update(name.encode('utf-8'))
+            digest.update(file_digest(os.path.join(model_dir, name)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def ensure_onnx_model(model, model_dir, quantized=False, cache_dir=ONNX_CACHE_DIR):
+    """
+    Return the path of the model's ONNX export, exporting it if needed.
+
+    Args:
+        model: The fp32 HuggingFace model
+        model_dir: Model bundle or checkpoint directory the model was loaded from
+        quantized: Return the int8 quantized export
+        cache_dir: Directory the exports are cached in, outside model_dir
+
+    Returns:
+        str: Path of the .onnx file
+    """
+    export_dir = os.path.join(cache_dir, f"{weights_digest(model_dir)}-opset{ONNX_OPSET}")
+    os.makedirs(export_dir, exist_ok=True)
+    onnx_path = os.path.join(export_dir, ONNX_FILE)
+    if not os.path.exists(onnx_path):
+        export_onnx(model, onnx_path)
+    if not quantized:
+        return onnx_path
+
+    int8_path = os.path.join(export_dir, ONNX_INT8_FILE)
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        temp_path = f"{int8_path}.{os.getpid()}.tmp"
+        quantize_dynamic(onnx_path, temp_path, weight_type=QuantType.QInt8)
+        os.replace(temp_path, int8_path)
+        logger.info(f"Quantized ONNX model to {int8_path}")
+    return int8_path
+
+
+def load_backend(model, backend=DEFAULT_BACKEND, model_dir=None, num_threads=DEFAULT_NUM_THREADS):
+    """
+    Wrap a loaded fp32 model in the requested inference backend.
+
+    num_threads applies to the ONNX session only. For the PyTorch backends it
+    sets torch's intra-op thread count, which is process-wide: every model
+    in the process (and anything else using torch) shares it, so the last
+    model loaded with a nonzero num_threads wins. Inference workers run in
+    their own processes and set their own.
+
+    Args:
+        model: The fp32 HuggingFace model
+        backend: One of BACKENDS
+        model_dir: Directory the model was loaded from (required for the ONNX backends)
+        num_threads: Intra-op threads for inference (0 keeps the runtime default)
+
+    Returns:
+        Model-like callable returning an object with .logits
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if num_threads and backend in (BACKEND_TORCH, BACKEND_INT8) and torch.get_num_threads() != num_threads:
+        logger.info(f"Setting torch intra-op threads for this process to {num_threads}")
+        torch.set_num_threads(num_threads)
+
+    model.eval()
+    if backend == BACKEND_TORCH:
+        runner = model
+    elif backend == BACKEND_INT8:
+        runner = quantize_int8(model)
+    else:
+        if model_dir is None:
+            raise ValueError("model_dir is required for the ONNX inference backends")
+        path = ensure_onnx_model(model, model_dir, quantized=(backend == BACKEND_ONNX_INT8))
+        runner = OnnxClassifier(path, num_threads=num_threads)
+
+    logger.info(f"Using '{backend}' inference backend (peak memory {resident_memory_mb():.0f} MB)")
+    return runner
+
+
+def load_classifier(model_path, backend=DEFAULT_BACKEND, num_threads=DEFAULT_NUM_THREADS):
+    """
+    Load the tokenizer and fine-tuned classifier and wrap it in a backend.
+
+    Args:
+        model_path: Model bundle (see model_bundle.py) or fine-tuned checkpoint directory
+        backend: Inference backend name
+        num_threads: Intra-op threads for inference (0 lets the runtime decide)
+
+    Returns:
+        tuple: (tokenizer, model, id2label)
+    """
+    tokenizer, model, id2label = load_model_files(model_path)
+    model = load_backend(model, backend, model_dir=model_path, num_threads=num_threads)
+    return tokenizer, model, id2label
+
+
+def _predict(tokenizer, model, texts, batch_size):
+    """Return (top-1 indices, confidences, seconds) for texts"""
+    indices, confidences = [], []
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors="pt", truncation=True, padding=True,
+                           max_length=MAX_SEQ_LENGTH)
+        with torch.inference_mode():
+            probabilities = F.softmax(model(**inputs).logits, dim=-1)
+        batch_confidences, batch_indices = probabilities.max(dim=-1)
+        indices.extend(batch_indices.tolist())
+        confidences.extend(batch_confidences.tolist())
+    return indices, confidences, time.perf_counter() - started
+
+
+def parity_check(tokenizer, reference, candidate, texts, batch_size=32):
+    """
+    Compare a backend against the fp32 reference model.
+
+    Args:
+        tokenizer: The HuggingFace tokenizer
+        reference: The fp32 model
+        candidate: The backend under test
+        texts: Held-out cleaned texts
+        batch_size: Texts per forward pass
+
+    Returns:
+        dict: Top-1 agreement, confidence deltas and per-post latency of both
+    """
+    ref_indices, ref_confidences, ref_seconds = _predict(tokenizer, reference, texts, batch_size)
+    indices, confidences, seconds = _predict(tokenizer, candidate, texts, batch_size)
+
+    deltas = sorted(abs(a - b) for a, b in zip(ref_confidences, confidences))
+    count = max(1, len(texts))
+    return {
+        'texts': len(texts),
+        'top1_agreement': sum(a == b for a, b in zip(ref_indices, indices)) / count,
+        'mean_confidence_delta': sum(deltas) / count,
+        'p99_confidence_delta': deltas[min(len(deltas) - 1, int(0.99 * len(deltas)))] if deltas else 0.0,
+        'max_confidence_delta': deltas[-1] if deltas else 0.0,
+        'reference_ms_per_post': 1000 * ref_seconds / count,
+        'backend_ms_per_post': 1000 * seconds / count
+    }
+
+
+def load_sample_texts(path, limit=DEFAULT_PARITY_SAMPLE):
+    """Load texts from a JSON list of posts (or strings), or a JSONL file, and clean them"""
+    from text_cleaning import clean_texts
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+    texts = [record if isinstance(record, str) else record.get('text', '') for record in records]
+    return [text for text in clean_texts(texts) if text][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parity = subparsers.add_parser('parity', help="Compare a backend with the fp32 model on held-out texts")
+    parity.add_argument('model_path', help="Model bundle or fine-tuned checkpoint directory")
+    parity.add_argument('--backend', choices=BACKENDS[1:], default=BACKEND_INT8)
+    parity.add_argument('--sample', default='disaster_posts.json', help="JSON/JSONL file of held-out posts")
+    parity.add_argument('--limit', type=int, default=DEFAULT_PARITY_SAMPLE)
+    parity.add_argument('--batch-size', type=int, default=32)
+    parity.add_argument('--min-agreement', type=float, default=DEFAULT_MIN_AGREEMENT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    texts = load_sample_texts(args.sample, args.limit)
+    tokenizer, reference, _ = load_model_files(args.model_path)
+    # The int8 backend quantizes in place, so it gets its own copy of the weights
+    candidate = load_backend(load_model_files(args.model_path)[1], args.backend, model_dir=args.model_path)
+
+    report = parity_check(tokenizer, reference, candidate, texts, batch_size=args.batch_size)
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+    if report['top1_agreement'] < args.min_agreement:
+        print(f"FAIL: top-1 agreement below {args.min_agreement}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Inference Worker Pool
+
+Multi-process classification for hosts with many cores. The parent process
+loads the tokenizer and model once, then forks the worker processes, which
+inherit the weights copy-on-write: tensor storage is never written after
+loading, so its pages stay shared and N workers cost about one model's worth
+of memory. Each worker tokenizes and runs its own slice of the texts with
+its own GIL, and results are returned in the caller's order.
+
+Start the pool before starting any other threads (and before running any
+inference in the parent): only the forking thread survives in the children,
+and a lock or OpenMP thread pool held elsewhere would be inherited in its
+locked state. Where forking isn't safe (other threads are running, as on a
+hot model reload) or available (Windows), the workers are spawned instead
+and each loads the model from model_path itself. The parent then needs no
+copy of the model (see can_fork()), but the workers no longer share one:
+a spawned pool costs about N models' worth of memory.
+
+Spawned workers re-import the main module, so the main module must not do
+work with side effects (opening files, loading models) at import time.
+"""
+
+import os
+import gc
+import math
+import logging
+import threading
+import multiprocessing
+
+import torch
+
+from inference import predict_disaster_batch, DEFAULT_BATCH_SIZE
+from inference_backend import OnnxClassifier, load_classifier
+
+logger = logging.getLogger(__name__)
+
+# Default pool parameters
+DEFAULT_THREADS_PER_WORKER = 1  # Intra-op threads in each worker
+DEFAULT_LOAD_TIMEOUT = 600.0  # Seconds spawned workers get to load the model
+
+# Model state inherited by the forked workers
+_worker_model = None
+
+
+def _init_worker(threads):
+    """Runs in each worker after the fork"""
+    global _worker_model
+    torch.set_num_threads(threads)
+    tokenizer, model, id2label, batch_size = _worker_model
+    if isinstance(model, OnnxClassifier):
+        # onnxruntime sessions don't survive a fork; each worker opens its own
+        model = OnnxClassifier(model.path, num_threads=threads)
+    _worker_model = (tokenizer, model, id2label, batch_size)
+
+
+def _load_worker(model_path, backend, threads, batch_size):
+    """Runs in each spawned worker: load the model from disk"""
+    global _worker_model
+    torch.set_num_threads(threads)
+    tokenizer, model, id2label = load_classifier(model_path, backend, num_threads=threads)
+    _worker_model = (tokenizer, model, id2label, batch_size)
+
+
+def _worker_ready(_):
+    """Runs in a worker: report that its model is loaded"""
+    return _worker_model is not None
+
+
+def _classify_chunk(texts):
+    """Runs in a worker: classify one chunk of texts"""
+    tokenizer, model, id2label, batch_size = _worker_model
+    return predict_disaster_batch(tokenizer, model, id2label, texts, batch_size=batch_size)
+
+
+class InferencePool:
+    """
+    Fork-after-load pool of classification workers.
+
+    Args:
+        tokenizer: The HuggingFace tokenizer
+        model: The loaded model (any backend from inference_backend.py)
+        id2label: Mapping from class index to label
+        workers: Worker processes to fork
+        batch_size: Texts per forward pass (and per chunk sent to a worker)
+        threads_per_worker: Intra-op threads in each worker
+        model_path: Model directory spawned workers load from, if other threads are already running
+        backend: Inference backend spawned workers use
+    """
+
+    def __init__(self, tokenizer, model, id2label, workers, batch_size=DEFAULT_BATCH_SIZE,
+                 threads_per_worker=DEFAULT_THREADS_PER_WORKER, model_path=None, backend=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.id2label = id2label
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads_per_worker = threads_per_worker
+        self.model_path = model_path
+        self.backend = backend
+        self._pool = None
+        self._frozen = False  # Whether start() froze the collector for forked workers
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.texts_classified = 0
+        self.chunks = 0
+
+    @staticmethod
+    def can_fork():
+        """Whether start() will fork (True) or spawn the workers (False)"""
+        return threading.active_count() == 1 and 'fork' in multiprocessing.get_all_start_methods()
+
+    def start(self):
+        """Fork the workers (or spawn them, where forking isn't safe or available)"""
+        global _worker_model
+        if self._pool is not None:
+            return
+        if not self.can_fork():
+            self._spawn()
+            return
+
+        _worker_model = (self.tokenizer, self.model, self.id2label, self.batch_size)
+        # Fast tokenizers' own thread pool isn't fork-safe; the workers give the parallelism instead
+        os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+        # Move everything allocated so far out of the collector's reach, so collections
+        # in the workers don't write to (and un-share) the pages holding the model objects
+        gc.collect()
+        gc.freeze()
+        self._frozen = True
+        context = multiprocessing.get_context('fork')
+        self._pool = context.Pool(processes=self.workers, initializer=_init_worker,
+                                  initargs=(self.threads_per_worker,))
+        logger.info(f"Started {self.workers} inference workers ({self.threads_per_worker} threads each)")
+
+    def _spawn(self, timeout=DEFAULT_LOAD_TIMEOUT):
+        """Start fresh worker processes that each load the model from model_path"""
+        if not self.model_path:
+            if self.model is None:
+                raise RuntimeError("Can't fork the inference workers and no model path was given to spawn them")
+            logger.warning("Can't fork the inference workers and no model path was given; "
+                           "classifying in the calling process")
+            return
+        context = multiprocessing.get_context('spawn')
+        self._pool = context.Pool(processes=self.workers, initializer=_load_worker,
+                                  initargs=(self.model_path, self.backend, self.threads_per_worker, self.batch_size))
+        try:
+            # A worker that fails to load is replaced and fails again, so wait with a timeout
+            self._pool.map_async(_worker_ready, range(self.workers)).get(timeout)
+        except multiprocessing.TimeoutError:
+            self._pool.terminate()
+            self._pool = None
+            raise RuntimeError(f"Inference workers did not load {self.model_path} within {timeout:.0f}s")
+        except Exception:
+            self._pool.terminate()
+            self._pool = None
+            raise
+        logger.info(f"Spawned {self.workers} inference workers with {self.model_path} "
+                    f"({self.threads_per_worker} threads each)")
+
+    def predict(self, texts):
+        """
+        Classify texts across the workers.
+
+        Returns:
+            list: (label, confidence) tuples in the same order as texts
+        """
+        if not texts:
+            return []
+        # Spread even a single batch across the workers
+        chunk_size = max(1, min(self.batch_size, math.ceil(len(texts) / max(1, self.workers))))
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        if self._pool is None:
+            results = [predict_disaster_batch(self.tokenizer, self.model, self.id2label, chunk,
+                                              batch_size=self.batch_size) for chunk in chunks]
+        else:
+            results = self._pool.map(_classify_chunk, chunks)
+
+        with self._lock:
+            self.texts_classified += len(texts)
+            self.chunks += len(chunks)
+        return [prediction for chunk_results in results for prediction in chunk_results]
+
+    def stop(self):
+        """Stop the workers"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._frozen:
+            gc.unfreeze()
+            self._frozen = False
+
+    def stats(self):
+        """Return worker count and throughput counters"""
+        with self._lock:
+            return {
+                'workers': self.workers if self._pool is not None else 0,
+                'texts_classified': self.texts_classified,
+                'chunks': self.chunks
+            }
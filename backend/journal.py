@@ -0,0 +1,200 @@
+"""
+Post Journal
+
+Append-only JSON Lines journal for processed posts. Each post is written as
+one line, so the cost per post is a single small append instead of rewriting
+the whole posts file. The active segment is rotated by size and age, and
+rotated segments can be gzip-compressed.
+
+The "latest N posts" JSON view used by tools such as misc/posts_count.py is
+produced separately by compaction, which the ingestors run every
+JOURNAL_COMPACT_INTERVAL seconds while they have new posts and again on exit:
+
+    python journal.py compact disaster_posts.jsonl disaster_posts.json --limit 1000
+"""
+
+import os
+import glob
+import gzip
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from datetime import datetime
+
+from atomic_file import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Default rotation parameters
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # Rotate the active segment after 50 MB
+DEFAULT_MAX_AGE = 24 * 60 * 60  # Rotate the active segment after a day
+DEFAULT_COMPACT_LIMIT = 1000  # Posts kept in the compacted JSON view
+DEFAULT_COMPACT_INTERVAL = 60  # Seconds between refreshes of the compacted JSON view
+
+
+def _segment_base(path):
+    """Return the path without its .jsonl extension"""
+    return path[:-len('.jsonl')] if path.endswith('.jsonl') else path
+
+
+def rotated_segments(path):
+    """List rotated segments for a journal, oldest first"""
+    base = _segment_base(path)
+    segments = glob.glob(f"{glob.escape(base)}.*.jsonl") + glob.glob(f"{glob.escape(base)}.*.jsonl.gz")
+    # Segment names embed a sortable timestamp
+    return sorted(segments)
+
+
+class PostJournal:
+    """
+    Thread-safe append-only JSONL writer with rotation.
+
+    Args:
+        path: Active segment path (e.g. disaster_posts.jsonl)
+        max_bytes: Rotate once the active segment reaches this size
+        max_age: Rotate once the active segment is this many seconds old
+        compress: Gzip rotated segments
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, compress=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._file = None
+        self._opened_at = None
+        self.records = 0  # Records appended since the journal was opened
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._file.tell() > 0:
+            # Existing segment: age it from its last modification
+            self._opened_at = os.path.getmtime(self.path)
+        else:
+            self._opened_at = time.time()
+
+    def append(self, record):
+        """Append one record as a single JSON line"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append several records with one write"""
+        if not records:
+            return
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            self.records += len(records)
+            if self._should_rotate():
+                self._rotate()
+
+    def _should_rotate(self):
+        return self._file.tell() >= self.max_bytes or time.time() - self._opened_at >= self.max_age
+
+    def _rotate(self):
+        """Close the active segment, move it aside and start a new one"""
+        self._file.close()
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        rotated_path = f"{_segment_base(self.path)}.{stamp}.jsonl"
+        os.replace(self.path, rotated_path)
+
+        if self.compress:
+            with open(rotated_path, 'rb') as source, gzip.open(rotated_path + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated_path)
+            rotated_path += '.gz'
+
+        logger.info(f"Rotated post journal to {rotated_path}")
+        self._open()
+
+    def rotate(self):
+        """Force a rotation of the active segment"""
+        with self._lock:
+            if self._file.tell() > 0:
+                self._rotate()
+
+    def close(self):
+        """Flush and close the active segment"""
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._file.close()
+
+
+def _read_segment_lines(path):
+    """Read all lines of a (possibly gzipped) segment"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.readlines()
+
+
+def iter_latest_records(path):
+    """Yield journal records newest first, across the active and rotated segments"""
+    segments = rotated_segments(path)
+    if os.path.exists(path):
+        segments.append(path)
+
+    for segment in reversed(segments):
+        for line in reversed(_read_segment_lines(segment)):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a partial last line; skip it
+                logger.warning(f"Skipping malformed journal line in {segment}")
+
+
+def compact_journal(path, output_path, limit=DEFAULT_COMPACT_LIMIT):
+    """
+    Write the latest posts from the journal as a JSON array, newest first.
+
+    Args:
+        path: Active journal segment path
+        output_path: JSON file to write (e.g. disaster_posts.json)
+        limit: Maximum number of posts to keep
+
+    Returns:
+        int: Number of posts written
+    """
+    posts = []
+    seen_uris = set()
+    for record in iter_latest_records(path):
+        uri = record.get('uri')
+        if uri in seen_uris:
+            continue
+        seen_uris.add(uri)
+        posts.append(record)
+        if len(posts) >= limit:
+            break
+
+    atomic_write_json(output_path, posts, indent=4, ensure_ascii=False)
+    logger.info(f"Compacted {len(posts)} posts from {path} into {output_path}")
+    return len(posts)
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Post journal tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact_parser = subparsers.add_parser('compact', help='Write the latest N posts as a JSON array')
+    compact_parser.add_argument('journal', help='Active journal segment, e.g. disaster_posts.jsonl')
+    compact_parser.add_argument('output', help='Output JSON file, e.g. disaster_posts.json')
+    compact_parser.add_argument('--limit', type=int, default=DEFAULT_COMPACT_LIMIT, help='Posts to keep')
+
+    args = parser.parse_args()
+    if args.command == 'compact':
+        compact_journal(args.journal, args.output, args.limit)
+
+
+if __name__ == "__main__":
+    main()
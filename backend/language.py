@@ -0,0 +1,244 @@
+"""
+Language Identification
+
+Cheap English filter for post text. Most posts are decided by a script and
+stopword heuristic without running a model: text written mostly in a
+non-Latin script is rejected, and plain-ASCII text with enough English
+function words and none from another Latin-script language is accepted
+(code-mixed posts such as Taglish go to the model). Only the ambiguous
+remainder goes to an n-gram model: fastText's lid.176 model when
+FASTTEXT_MODEL points at it, otherwise langdetect.
+Decisions are cached by a hash of the text.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+try:
+    import fasttext
+except ImportError:
+    fasttext = None
+
+try:
+    from langdetect import detect, DetectorFactory
+    # Seed langdetect so results are consistent
+    DetectorFactory.seed = 0
+except ImportError:
+    detect = None
+
+logger = logging.getLogger(__name__)
+
+# Default parameters
+DEFAULT_CACHE_SIZE = 100000  # Cached decisions kept before the least recently used is evicted
+DEFAULT_MIN_STOPWORDS = 2  # English function words needed to accept without the model
+DEFAULT_MIN_STOPWORD_RATIO = 0.25  # Fraction of words that must be English function words
+DEFAULT_MAX_FOREIGN_SCRIPT = 0.3  # Fraction of non-Latin letters above which text is rejected
+DEFAULT_FASTTEXT_THRESHOLD = 0.5  # Minimum fastText probability for English
+
+# Results of the heuristic
+ENGLISH = True
+NOT_ENGLISH = False
+AMBIGUOUS = None
+
+# Parts of the text that carry no language signal
+NOISE_PATTERN = re.compile(r'http\S+|@\S+|#\w+')
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+ENGLISH_STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been before being but by can could did do does
+for from had has have he her here him his how i if in into is it its just me more my no not now of on
+only or our out over she so some than that the their them then there these they this those to up us was
+we were what when where which while who why will with would you your i'm it's don't can't there's we're
+they're you're that's isn't aren't wasn't
+""".split())
+
+# Common function words of other Latin-script languages that share few words with English
+FOREIGN_STOPWORDS = frozenset("""
+el la los las del por para con una uno que es y pero como muy esta este son
+le les des du et est une dans pour sur avec pas qui ce cette sont nous vous
+der die das und ist nicht ein eine mit auf den dem ich sie wir zu von
+il lo gli della che di non sono per una
+de het een van en niet op voor zijn dat ik je
+o os da do das dos em um uma não com por
+ang ng mga sa na ay si ni kay ko mo niya namin natin nila amin atin kami tayo sila ito yan yung naman lang din rin
+pa po ba kasi pero dahil wala
+yang dan di ke dari ini itu tidak ada dengan untuk akan sudah juga saya kita mereka
+""".split()) - ENGLISH_STOPWORDS
+
+
+def text_key(text):
+    """Hash text into a compact cache key"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def classify_script(text, min_stopwords=DEFAULT_MIN_STOPWORDS, min_stopword_ratio=DEFAULT_MIN_STOPWORD_RATIO,
+                    max_foreign_script=DEFAULT_MAX_FOREIGN_SCRIPT):
+    """
+    Decide the easy cases from the script and function words alone.
+
+    Returns:
+        ENGLISH, NOT_ENGLISH, or AMBIGUOUS when a model has to decide
+    """
+    text = NOISE_PATTERN.sub(' ', text)
+
+    letters = 0
+    non_ascii = 0
+    non_latin = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        if char.isascii():
+            continue
+        non_ascii += 1
+        if not unicodedata.name(char, '').startswith('LATIN'):
+            non_latin += 1
+
+    # Nothing to identify (langdetect fails on these too)
+    if letters == 0:
+        return NOT_ENGLISH
+
+    # Mostly another script: Cyrillic, CJK, Arabic, ...
+    if non_latin / letters > max_foreign_script:
+        return NOT_ENGLISH
+
+    # Accented Latin letters point at another language; let the model decide
+    if non_ascii:
+        return AMBIGUOUS
+
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    english_hits = sum(1 for word in words if word in ENGLISH_STOPWORDS)
+    foreign_hits = sum(1 for word in words if word in FOREIGN_STOPWORDS)
+
+    # Any function word of another language hints at code-mixed text, which
+    # can easily clear the English ratio ("I am in Manila, may bagyo na naman")
+    if english_hits >= min_stopwords and english_hits / len(words) >= min_stopword_ratio and not foreign_hits:
+        return ENGLISH
+
+    return AMBIGUOUS
+
+
+class LanguageIdentifier:
+    """
+    English detector with a heuristic fast path, a model fallback and an LRU cache.
+
+    Args:
+        cache_size: Cached decisions kept
+        fasttext_model_path: Path to a fastText language ID model (lid.176.ftz/.bin);
+            langdetect is used when it is not given or cannot be loaded
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, fasttext_model_path=None):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # text hash -> bool
+        self._lock = threading.Lock()
+
+        self._fasttext_model = None
+        if fasttext_model_path:
+            if fasttext is None:
+                logger.warning("FASTTEXT_MODEL is set but fasttext is not installed; using langdetect")
+            else:
+                try:
+                    self._fasttext_model = fasttext.load_model(fasttext_model_path)
+                    logger.info(f"Loaded fastText language model from {fasttext_model_path}")
+                except Exception as e:
+                    logger.error(f"Error loading fastText model {fasttext_model_path}: {e}; using langdetect")
+
+        if self._fasttext_model is None and detect is None:
+            logger.warning("No language model available; ambiguous posts will be treated as non-English")
+
+        # Statistics
+        self.cache_hits = 0
+        self.heuristic_decisions = 0
+        self.model_decisions = 0
+
+    def _model_is_english(self, texts):
+        """Run the n-gram model on ambiguous texts"""
+        if self._fasttext_model is not None:
+            # fastText rejects newlines
+            labels, probabilities = self._fasttext_model.predict([text.replace('\n', ' ') for text in texts])
+            return [bool(label) and label[0] == '__label__en' and probability[0] >= DEFAULT_FASTTEXT_THRESHOLD
+                    for label, probability in zip(labels, probabilities)]
+
+        results = []
+        for text in texts:
+            try:
+                results.append(detect is not None and detect(text) == 'en')
+            except Exception:
+                # If detection fails, assume it's not English
+                results.append(False)
+        return results
+
+    def is_english(self, text):
+        """Return True if text is English"""
+        return self.is_english_batch([text])[0]
+
+    def is_english_batch(self, texts):
+        """
+        Decide a batch of texts.
+
+        Args:
+            texts: List of post texts
+
+        Returns:
+            list: One bool per text, in input order
+        """
+        results = [None] * len(texts)
+        keys = [text_key(text) for text in texts]
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[index] = cached
+                    self.cache_hits += 1
+
+        ambiguous = []
+        heuristic_decisions = 0
+        for index, text in enumerate(texts):
+            if results[index] is not None:
+                continue
+            decision = classify_script(text)
+            if decision is AMBIGUOUS:
+                ambiguous.append(index)
+            else:
+                results[index] = decision
+                heuristic_decisions += 1
+
+        if ambiguous:
+            for index, decision in zip(ambiguous, self._model_is_english([texts[i] for i in ambiguous])):
+                results[index] = decision
+
+        with self._lock:
+            self.heuristic_decisions += heuristic_decisions
+            self.model_decisions += len(ambiguous)
+            for key, decision in zip(keys, results):
+                self._cache[key] = decision
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return results
+
+    def stats(self):
+        """Return how decisions were made"""
+        with self._lock:
+            decisions = self.cache_hits + self.heuristic_decisions + self.model_decisions
+            return {
+                'cache_size': len(self._cache),
+                'cache_hits': self.cache_hits,
+                'heuristic_decisions': self.heuristic_decisions,
+                'model_decisions': self.model_decisions,
+                'model_rate': round(self.model_decisions / decisions, 3) if decisions else 0.0
+            }
+
+
+def create_language_identifier(cache_size=DEFAULT_CACHE_SIZE):
+    """Build a LanguageIdentifier using FASTTEXT_MODEL from the environment if set"""
+    return LanguageIdentifier(cache_size=cache_size, fasttext_model_path=os.getenv('FASTTEXT_MODEL'))
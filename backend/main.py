@@ -1,23 +1,37 @@
 import boto3
 import time
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 import json
 import os
-import requests
 from atproto import Client
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, RobertaConfig
-import torch.nn.functional as F
 from dotenv import load_dotenv
 import re
 import logging
-import uuid
 from decimal import Decimal
 from botocore.exceptions import ClientError
-from langdetect import detect, DetectorFactory
 import threading
-
-# Set seed for langdetect to ensure consistent results
-DetectorFactory.seed = 0
+from collections import namedtuple
+from text_cleaning import clean_text
+from inference import predict_disaster_batch, DEFAULT_BATCH_SIZE
+from inference_backend import load_classifier, DEFAULT_BACKEND, DEFAULT_NUM_THREADS
+from inference_pool import InferencePool, DEFAULT_THREADS_PER_WORKER
+from classifier_client import ClassifierClient, ClassifierUnavailable
+from prefilter import create_prefilter, DEFAULT_RECALL_TARGET
+from prediction_cache import PredictionCache, DEFAULT_MAX_ENTRIES as DEFAULT_PREDICTION_CACHE_SIZE
+from model_manager import ModelManager, install_reload_signal, serve_admin, DEFAULT_WATCH_INTERVAL, DEFAULT_WARMUP_BATCHES
+from pipeline import Pipeline, Stage, DEFAULT_QUEUE_SIZE
+from batch_writer import DynamoBatchWriter, DEFAULT_FLUSH_INTERVAL
+from dedup import WindowedDedup, DEFAULT_WINDOW, DEFAULT_FALSE_POSITIVE_RATE
+from atomic_file import atomic_write_json
+from checkpoint import CheckpointStore, DEFAULT_FLUSH_INTERVAL as DEFAULT_CHECKPOINT_INTERVAL
+from language import create_language_identifier, DEFAULT_CACHE_SIZE as DEFAULT_LANGUAGE_CACHE_SIZE
+from query_planner import QueryPlanner, DEFAULT_GROUP_SIZE, DEFAULT_OPERATOR
+from scheduler import AdaptiveScheduler, DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL, DEFAULT_TARGET_POSTS
+from outbox import NotificationOutbox
+from notifier import NotificationDispatcher, DEFAULT_MAX_BATCH as DEFAULT_NOTIFY_BATCH, DEFAULT_MAX_WAIT as DEFAULT_NOTIFY_WAIT
+from journal import PostJournal, compact_journal, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE, DEFAULT_COMPACT_INTERVAL
+from rate_limiter import RateLimiter, install_client_hook, PRIORITY_HIGH, PRIORITY_NORMAL
+from user_cache import KnownUserCache, profile_fingerprint, USER_KNOWN, USER_CHANGED, DEFAULT_MAX_USERS, DEFAULT_TTL
 
 # Set up logging
 logging.basicConfig(
@@ -35,18 +49,75 @@ logger = logging.getLogger(__name__)
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:8000')
 NOTIFICATION_ENDPOINT = f"{API_BASE_URL}/api/notify-new-post"
 
-# Notification buffer and timer
-NOTIFICATION_BUFFER = []
-NOTIFICATION_MUTEX = threading.Lock()
-LAST_NOTIFICATION_TIME = time.time()
-NOTIFICATION_INTERVAL = 15 * 60  # 15 minutes in seconds
+# Notification delivery: a batch is sent when it is full or its oldest post has waited long enough
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', DEFAULT_NOTIFY_BATCH))  # Posts per request
+NOTIFICATION_MAX_WAIT = float(os.getenv('NOTIFICATION_MAX_WAIT', DEFAULT_NOTIFY_WAIT))  # Max seconds a post is buffered
+NOTIFICATION_OUTBOX_DIR = "notification_outbox"  # Pending notifications, kept on disk until the API accepts them
 
 # API Rate Limit Parameters
 MAX_REQUESTS_PER_WINDOW = 3000  # Maximum requests in a 5-minute window
 RATE_LIMIT_WINDOW = 300  # 5 minutes in seconds
-REQUEST_TOKENS = MAX_REQUESTS_PER_WINDOW  # Start with full tokens
-LAST_TOKEN_REFILL = time.time()  # Last time tokens were refilled
-TOKEN_MUTEX = threading.Lock()  # Mutex for thread-safe token updates
+RATE_LIMIT_RESERVE = int(os.getenv('RATE_LIMIT_RESERVE', 5))  # Server-reported requests left unused as a margin
+# Endpoints whose ratelimit headers describe the shared budget (createSession has its own, smaller one)
+RATE_LIMITED_ENDPOINTS = ('app.bsky.feed.searchPosts', 'app.bsky.actor.getProfile')
+rate_limiter = RateLimiter(MAX_REQUESTS_PER_WINDOW, RATE_LIMIT_WINDOW, reserve=RATE_LIMIT_RESERVE,
+                           endpoints=RATE_LIMITED_ENDPOINTS)
+
+# Classifier batching
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', DEFAULT_BATCH_SIZE))  # Posts per forward pass
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', DEFAULT_BACKEND)  # torch (default), or opt in to int8, onnx or onnx-int8
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', DEFAULT_NUM_THREADS))  # Intra-op threads (0 = runtime default)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 0))  # Forked inference processes sharing the model (0 = in-process)
+INFERENCE_WORKER_THREADS = int(os.getenv('INFERENCE_WORKER_THREADS', DEFAULT_THREADS_PER_WORKER))  # Threads per worker
+
+# Cache of predictions by cleaned text, so reposts and bot spam skip the model
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', DEFAULT_PREDICTION_CACHE_SIZE))  # Cached texts
+PREDICTION_CACHE_FILE = os.getenv('PREDICTION_CACHE_FILE', "prediction_cache.json")  # Empty to keep it in memory only
+prediction_cache = PredictionCache(max_entries=PREDICTION_CACHE_SIZE, path=PREDICTION_CACHE_FILE or None)
+
+# Shared classification service; when set, the model is not loaded in this process
+CLASSIFIER_URL = os.getenv('CLASSIFIER_URL', '')  # e.g. http://127.0.0.1:8765 (see classifier_service.py)
+CLASSIFY_RETRIES = int(os.getenv('CLASSIFY_RETRIES', 3))  # Retries of a batch while the service is unavailable
+CLASSIFY_RETRY_DELAY = float(os.getenv('CLASSIFY_RETRY_DELAY', 2.0))  # Seconds before the first retry, doubled each time
+
+# Hot model reload (model_manager.py): watch MODEL_PATH, SIGHUP, or POST /admin/reload
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL))  # Seconds between checks (0 = off)
+MODEL_WARMUP_BATCHES = int(os.getenv('MODEL_WARMUP_BATCHES', DEFAULT_WARMUP_BATCHES))  # Warm-up batches before a swap
+ADMIN_PORT = int(os.getenv('ADMIN_PORT', 0))  # Localhost port for the model admin endpoint (0 = off)
+
+# Cheap cascade that keeps implausible posts away from the transformer
+PREFILTER_MODEL = os.getenv('PREFILTER_MODEL', "prefilter_model.json")  # Written by train.py with TRAIN_MODE=prefilter
+PREFILTER_RECALL_TARGET = float(os.getenv('PREFILTER_RECALL_TARGET', DEFAULT_RECALL_TARGET))  # Disaster posts let through
+
+# Ingestion pipeline workers per stage
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 8))  # Concurrent Bluesky searches, all sharing the token bucket
+FILTER_WORKERS = int(os.getenv('FILTER_WORKERS', 2))  # Dedup, language detection and cleaning
+FILTER_BATCH_SIZE = int(os.getenv('FILTER_BATCH_SIZE', 32))  # Posts per language detection batch
+CLASSIFY_WORKERS = int(os.getenv('CLASSIFY_WORKERS', 1))  # Batched model inference
+STORE_WORKERS = int(os.getenv('STORE_WORKERS', 4))  # DynamoDB writes
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))  # Items buffered per stage
+WRITE_FLUSH_INTERVAL = float(os.getenv('WRITE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))  # Max seconds a DynamoDB write is buffered
+
+# Known-user cache
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', DEFAULT_MAX_USERS))  # Users remembered in memory
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', DEFAULT_TTL))  # Seconds before a cached user is re-checked
+
+# Search pagination
+SEARCH_PAGE_SIZE = 100  # Maximum page size allowed by app.bsky.feed.searchPosts
+SEARCH_MAX_PAGES = int(os.getenv('SEARCH_MAX_PAGES', 10))  # Page budget per query per cycle
+
+# Keyword query merging, opt-in: QUERY_GROUP_SIZE > 1 ORs that many keywords into one search (see query_planner.py)
+QUERY_GROUP_SIZE = int(os.getenv('QUERY_GROUP_SIZE', DEFAULT_GROUP_SIZE))  # Keywords combined into one search
+QUERY_OPERATOR = os.getenv('QUERY_OPERATOR', DEFAULT_OPERATOR)  # Boolean operator joining keywords in a query
+
+# Adaptive polling of query groups
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', DEFAULT_MIN_INTERVAL))  # Seconds between polls of a hot query
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', DEFAULT_MAX_INTERVAL))  # Seconds between polls of a cold query
+POLL_TARGET_POSTS = float(os.getenv('POLL_TARGET_POSTS', DEFAULT_TARGET_POSTS))  # New posts a poll should return
+POLL_BUDGET_SHARE = float(os.getenv('POLL_BUDGET_SHARE', 0.8))  # Share of the token refill rate searches may plan for
+
+# Posts collected from every page of a keyword search
+SearchResults = namedtuple('SearchResults', ['posts', 'pages', 'complete'])
 
 # Define disaster-related keywords for search
 DISASTER_KEYWORDS = [
@@ -57,56 +128,107 @@ DISASTER_KEYWORDS = [
     "collapsed", "destroyed", "devastation", "casualties"
 ]
 
+# Combined search queries covering DISASTER_KEYWORDS
+query_planner = QueryPlanner(DISASTER_KEYWORDS, group_size=QUERY_GROUP_SIZE, operator=QUERY_OPERATOR,
+                             page_size=SEARCH_PAGE_SIZE)
+
 # File to store last processed timestamp
 LAST_PROCESSED_FILE = "last_processed.json"
+SEARCH_GAPS_FILE = "search_gaps.json"  # Unfetched ranges left by searches that ran out of pages
+CHECKPOINT_FLUSH_INTERVAL = float(os.getenv('CHECKPOINT_FLUSH_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL))  # Seconds between checkpoint writes
+
+# Post dedup store
+DEDUP_SNAPSHOT_FILE = "processed_posts.dedup"
+DEDUP_WINDOW = int(os.getenv('DEDUP_WINDOW', DEFAULT_WINDOW))  # Seconds of indexed_at history remembered
+DEDUP_FALSE_POSITIVE_RATE = float(os.getenv('DEDUP_FALSE_POSITIVE_RATE', DEFAULT_FALSE_POSITIVE_RATE))
+
+# Post journal; disaster_posts.json is the compacted "latest posts" view of it
+POSTS_JOURNAL_FILE = "disaster_posts.jsonl"
+POSTS_JSON_FILE = "disaster_posts.json"
+JOURNAL_MAX_BYTES = int(os.getenv('JOURNAL_MAX_BYTES', DEFAULT_MAX_BYTES))  # Rotate the journal after this size
+JOURNAL_MAX_AGE = int(os.getenv('JOURNAL_MAX_AGE', DEFAULT_MAX_AGE))  # Rotate the journal after this many seconds
+JOURNAL_COMPRESS = os.getenv('JOURNAL_COMPRESS', 'true').lower() == 'true'  # Gzip rotated journal segments
+MAX_JSON_POSTS = 1000  # Posts kept in the compacted JSON view
+JOURNAL_COMPACT_INTERVAL = float(os.getenv('JOURNAL_COMPACT_INTERVAL', DEFAULT_COMPACT_INTERVAL))  # Seconds between JSON view refreshes
+
+
+# Load the unfetched search ranges left by earlier runs
+def load_search_gaps(path):
+    """
+    Load query group -> {'until': ISO time or None, 'newest': ISO time} gaps.
+
+    Returns:
+        dict: The saved gaps, or an empty dict if there are none
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            gaps = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable search gaps file {path}: {e}")
+        return {}
+    if gaps:
+        logger.info(f"Resuming {len(gaps)} search gaps from {path}")
+    return gaps
+
+
+# Save the unfetched search ranges
+def save_search_gaps(path, gaps):
+    """Atomically write the gaps (an empty dict clears the file)"""
+    atomic_write_json(path, gaps)
 
 
-# Initialize last processed timestamps for each keyword
+# Initialize last processed timestamps for each query group
 def init_last_processed_times():
-    """Initialize or load last processed timestamps"""
-    try:
-        with open(LAST_PROCESSED_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Create default with all keywords set to current time
-        now = datetime.now(timezone.utc).isoformat()
-        return {keyword: now for keyword in DISASTER_KEYWORDS}
-
-
-# Save last processed timestamps
-def save_last_processed_times(timestamp_dict):
-    """Save the last processed timestamps to file"""
-    with open(LAST_PROCESSED_FILE, 'w') as f:
-        json.dump(timestamp_dict, f)
-
-
-# Text cleaning
-def clean_text(text):
-    """Clean text by removing URLs, mentions, special chars, etc."""
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    # Remove mentions
-    text = re.sub(r'@\w+', '', text)
-    # Remove hashtags (keep the text after #)
-    text = re.sub(r'#(\w+)', r'\1', text)
-    # Remove special characters and numbers
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\d+', '', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Convert to lowercase
-    text = text.lower()
-    return text
+    """
+    Load last processed timestamps into a checkpoint store, one per query group.
+
+    A group without a checkpoint starts from the oldest checkpoint of its
+    keywords (so switching to grouped queries loses no backlog), or from the
+    current time if none of them has one.
+
+    Returns:
+        CheckpointStore: Started store that flushes updates in the background
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    checkpoints = CheckpointStore(LAST_PROCESSED_FILE, flush_interval=CHECKPOINT_FLUSH_INTERVAL)
+    existing = checkpoints.load()
+    for group in query_planner.groups:
+        if group.key in existing:
+            continue
+        member_times = [safe_parse_date(existing[keyword]) for keyword in group.keywords if keyword in existing]
+        checkpoints.set(group.key, min(member_times).isoformat() if member_times else now)
+    checkpoints.start()
+    return checkpoints
+
+
+# Language identification: script/stopword heuristic first, n-gram model only for ambiguous text
+LANGUAGE_CACHE_SIZE = int(os.getenv('LANGUAGE_CACHE_SIZE', DEFAULT_LANGUAGE_CACHE_SIZE))  # Cached language decisions
+
+# Process-wide services, created by init_services() when the ingestor starts rather than at import:
+# spawned inference workers re-import this module, and must not recover the notification outbox
+# or load the language and prefilter models again
+notification_dispatcher = None
+language_identifier = None
+prefilter = None
+
+
+# Create the process-wide services
+def init_services():
+    """Create the notification dispatcher, language identifier and prefilter"""
+    global notification_dispatcher, language_identifier, prefilter
+    notification_dispatcher = NotificationDispatcher(NOTIFICATION_ENDPOINT, max_batch=NOTIFICATION_BATCH_SIZE,
+                                                     max_wait=NOTIFICATION_MAX_WAIT,
+                                                     outbox=NotificationOutbox(NOTIFICATION_OUTBOX_DIR))
+    language_identifier = create_language_identifier(cache_size=LANGUAGE_CACHE_SIZE)
+    prefilter = create_prefilter(PREFILTER_MODEL, recall_target=PREFILTER_RECALL_TARGET)
 
 
 # Check if text is in English
 def is_english(text):
     """Detect if text is in English"""
-    try:
-        return detect(text) == 'en'
-    except:
-        # If detection fails, assume it's not English
-        return False
+    return language_identifier.is_english(text)
 
 
 # Safe date parsing function to handle problematic ISO formats
@@ -135,40 +257,30 @@ def safe_parse_date(date_string):
         return datetime.now()
 
 
-# Token bucket rate limiter function
-def consume_token():
+# Token bucket rate limiter functions
+def consume_token(priority=PRIORITY_NORMAL):
     """
     Consume a token from the rate limiter.
     Returns True if a token was consumed, False if we need to wait.
     """
-    global REQUEST_TOKENS, LAST_TOKEN_REFILL
-
-    with TOKEN_MUTEX:
-        # Refill tokens based on elapsed time
-        now = time.time()
-        elapsed = now - LAST_TOKEN_REFILL
-
-        if elapsed > 0:
-            # Calculate tokens to add: (elapsed seconds / window) * max tokens
-            new_tokens = int((elapsed / RATE_LIMIT_WINDOW) * MAX_REQUESTS_PER_WINDOW)
-
-            if new_tokens > 0:
-                REQUEST_TOKENS = min(REQUEST_TOKENS + new_tokens, MAX_REQUESTS_PER_WINDOW)
-                LAST_TOKEN_REFILL = now
-
-        # Try to consume a token
-        if REQUEST_TOKENS > 0:
-            REQUEST_TOKENS -= 1
-            remaining_percentage = (REQUEST_TOKENS / MAX_REQUESTS_PER_WINDOW) * 100
-            if remaining_percentage < 20:  # Log warning when tokens are running low
-                logger.warning(
-                    f"API rate limit tokens running low: {REQUEST_TOKENS}/{MAX_REQUESTS_PER_WINDOW} ({remaining_percentage:.1f}%)")
-            return True
-        else:
-            # Calculate time until next token will be available
-            time_to_next_token = RATE_LIMIT_WINDOW / MAX_REQUESTS_PER_WINDOW
-            logger.warning(f"Rate limit reached, need to wait {time_to_next_token:.2f} seconds")
-            return False
+    consumed = rate_limiter.try_acquire(priority)
+    if not consumed:
+        logger.warning("Rate limit reached, no token available right now")
+    return consumed
+
+
+def wait_for_token(timeout=None, priority=PRIORITY_NORMAL):
+    """
+    Block until a token is available and consume it.
+
+    Args:
+        timeout: Maximum number of seconds to wait, or None to wait indefinitely
+        priority: PRIORITY_HIGH for session checks and logins, PRIORITY_NORMAL for searches
+
+    Returns:
+        bool: True if a token was consumed, False if the timeout expired
+    """
+    return rate_limiter.acquire(priority=priority, timeout=timeout)
 
 
 # Load environment variables
@@ -206,37 +318,8 @@ def init_dynamodb():
 def init_model(model_path):
     """Initialize AI model with proper error handling"""
     try:
-        logger.info(f"Loading model from {model_path}")
-
-        # Load tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-
-        # Define label mappings
-        id2label = {
-            0: "avalanche", 1: "blizzard", 2: "bush_fire", 3: "cyclone",
-            4: "dust_storm", 5: "earthquake", 6: "flood", 7: "forest_fire",
-            8: "haze", 9: "hurricane", 10: "landslide", 11: "meteor",
-            12: "storm", 13: "tornado", 14: "tsunami", 15: "typhoon",
-            16: "unknown", 17: "volcano", 18: "wild_fire"
-        }
-
-        # Create the reversed mapping
-        label2id = {v: k for k, v in id2label.items()}
-
-        # Create configuration
-        config = RobertaConfig.from_pretrained(
-            "roberta-base",
-            num_labels=19,
-            id2label=id2label,
-            label2id=label2id
-        )
-
-        # Load model
-        model = AutoModelForSequenceClassification.from_pretrained(
-            model_path,
-            config=config,
-            ignore_mismatched_sizes=True
-        )
+        # Model bundles load offline from memory-mapped weights; plain checkpoints still work
+        tokenizer, model, id2label = load_classifier(model_path, INFERENCE_BACKEND, num_threads=INFERENCE_THREADS)
 
         logger.info("Model loaded successfully")
         return tokenizer, model, id2label
@@ -404,7 +487,7 @@ def list_tables(dynamodb):
 
 # Function to insert/update user in DynamoDB
 def put_user(dynamodb, user_data):
-    """Store user data in DynamoDB"""
+    """Store user data in DynamoDB (the ingestion pipeline uses put_user_cached)"""
     try:
         users_table = dynamodb.Table(USERS_TABLE)
 
@@ -414,15 +497,14 @@ def put_user(dynamodb, user_data):
 
             # If user doesn't exist or we want to update, put the item
             if 'Item' not in response or user_data.get('update_existing', False):
-                users_table.put_item(
-                    Item={
-                        'user_id': user_data['user_id'],
-                        'handle': user_data['handle'],
-                        'display_name': user_data.get('display_name', ''),
-                        'avatar_url': user_data.get('avatar_url', ''),
-                        'created_at': datetime.now().isoformat()
-                    }
-                )
+                item = {
+                    'user_id': user_data['user_id'],
+                    'handle': user_data['handle'],
+                    'display_name': user_data.get('display_name', ''),
+                    'avatar_url': user_data.get('avatar_url', ''),
+                    'created_at': datetime.now().isoformat()
+                }
+                users_table.put_item(Item=item)
                 logger.info(f"User stored: {user_data['handle']}")
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
@@ -439,136 +521,170 @@ def put_user(dynamodb, user_data):
         return None
 
 
-# Function to notify the Flask API about new posts (batched every 15 minutes)
-def notify_api_about_new_post(post):
-    """Add post to notification buffer, to be sent at 15-minute intervals"""
+# Function to store a user, skipping users we already know about
+def put_user_cached(dynamodb, user_data, user_cache):
+    """
+    Store user data in DynamoDB using an in-process cache of known users.
+
+    Cached users with an unchanged profile cost no DynamoDB calls. Unknown users are
+    written with a conditional put (one write instead of a read plus a write), and a
+    changed profile is updated in place so created_at is preserved.
+
+    Args:
+        dynamodb: DynamoDB resource
+        user_data: User fields to store
+        user_cache: KnownUserCache shared by the store workers
+
+    Returns:
+        The user_id, or None on error
+    """
     try:
-        with NOTIFICATION_MUTEX:
-            # Add post to buffer
-            NOTIFICATION_BUFFER.append(post)
-            logger.debug(
-                f"Added post {post['post_id']} to notification buffer (current size: {len(NOTIFICATION_BUFFER)})")
-    except Exception as e:
-        logger.error(f"Error adding post to notification buffer: {e}")
+        users_table = dynamodb.Table(USERS_TABLE)
+        status = user_cache.check(user_data)
 
+        if status == USER_KNOWN:
+            return user_data['user_id']
 
-# Function to send all buffered notifications
-def send_buffered_notifications():
-    """Send all buffered notifications to the API"""
-    global LAST_NOTIFICATION_TIME
+        profile_changed = status == USER_CHANGED
+        if not profile_changed:
+            try:
+                users_table.put_item(
+                    Item={
+                        'user_id': user_data['user_id'],
+                        'handle': user_data['handle'],
+                        'display_name': user_data.get('display_name', ''),
+                        'avatar_url': user_data.get('avatar_url', ''),
+                        'created_at': datetime.now().isoformat()
+                    },
+                    ConditionExpression='attribute_not_exists(user_id)',
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                )
+                logger.info(f"User stored: {user_data['handle']}")
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                # User already exists; compare against the stored profile if it came back
+                existing = e.response.get('Item')
+                if existing:
+                    existing = {key: value.get('S', '') for key, value in existing.items() if isinstance(value, dict)}
+                    profile_changed = profile_fingerprint(existing) != profile_fingerprint(user_data)
+
+        if profile_changed:
+            users_table.update_item(
+                Key={'user_id': user_data['user_id']},
+                UpdateExpression='SET handle = :handle, display_name = :display_name, avatar_url = :avatar_url',
+                ExpressionAttributeValues={
+                    ':handle': user_data['handle'],
+                    ':display_name': user_data.get('display_name', ''),
+                    ':avatar_url': user_data.get('avatar_url', '')
+                }
+            )
+            logger.info(f"User profile updated: {user_data['handle']}")
 
-    with NOTIFICATION_MUTEX:
-        if not NOTIFICATION_BUFFER:
-            return  # Nothing to send
+        user_cache.remember(user_data)
+        return user_data['user_id']
+
+    except Exception as e:
+        logger.error(f"Error storing user: {e}")
+        return None
 
-        posts_to_send = NOTIFICATION_BUFFER.copy()
-        NOTIFICATION_BUFFER.clear()
 
+# Function to notify the Flask API about new posts
+def notify_api_about_new_post(post):
+    """Queue a post for delivery to the API; it is sent within NOTIFICATION_MAX_WAIT seconds"""
     try:
-        # Create a serializable version of the posts
-        serializable_posts = []
-        for post in posts_to_send:
-            # Convert Decimal to float for JSON serialization
-            serializable_post = {}
-            for key, value in post.items():
-                if isinstance(value, Decimal):
-                    serializable_post[key] = float(value)
-                else:
-                    serializable_post[key] = value
-            serializable_posts.append(serializable_post)
+        notification_dispatcher.submit(post)
+    except Exception as e:
+        logger.error(f"Error queueing post notification: {e}")
 
-        # Send notification to Flask API
-        payload = {
-            'posts': serializable_posts
-        }
 
-        response = requests.post(
-            NOTIFICATION_ENDPOINT,
-            json=payload,
-            headers={'Content-Type': 'application/json'}
-        )
+# Build the DynamoDB item for a post
+def build_post_item(post_data):
+    """Convert post data into a DynamoDB item"""
+    # DynamoDB doesn't support native float type, convert to Decimal
+    confidence_score = Decimal(str(post_data.get('confidence_score', 0.0)))
 
-        if response.status_code == 200:
-            logger.info(f"Successfully notified API about {len(serializable_posts)} new posts")
-        else:
-            logger.warning(f"Failed to notify API: {response.status_code} - {response.text}")
+    # Format the created_at and indexed_at as ISO strings safely
+    if isinstance(post_data['created_at'], str):
+        created_at = post_data['created_at']
+    else:
+        created_at = post_data['created_at'].isoformat()
 
-        # Update last notification time
-        LAST_NOTIFICATION_TIME = time.time()
+    if isinstance(post_data['indexed_at'], str):
+        indexed_at = post_data['indexed_at']
+    else:
+        indexed_at = post_data['indexed_at'].isoformat()
+
+    # Get is_disaster value and convert to string for indexing
+    is_disaster = post_data.get('is_disaster', False)
+    is_disaster_str = 'true' if is_disaster else 'false'
+
+    # Build the item
+    item = {
+        'post_id': post_data['post_id'],
+        'indexed_at': indexed_at,  # Use as sort key
+        'user_id': post_data['user_id'],
+        'handle': post_data['handle'],
+        'display_name': post_data.get('display_name', ''),
+        'avatar_url': post_data.get('avatar_url', ''),
+        'original_text': post_data['original_text'],
+        'clean_text': post_data['clean_text'],
+        'created_at': created_at,
+        'location_name': post_data.get('location_name', ''),
+        'disaster_type': post_data.get('disaster_type', 'unknown'),
+        'confidence_score': confidence_score,
+        'is_disaster': is_disaster,
+        'is_disaster_str': is_disaster_str,  # Add string version for GSI
+        'language': post_data.get('language', 'en'),  # Store detected language
+        'model_version': post_data.get('model_version', '')  # Model that classified the post
+    }
+
+    # Add media_urls if present (and set has_media based on media_urls)
+    if 'media_urls' in post_data and post_data['media_urls']:
+        item['media_urls'] = post_data['media_urls']
+        item['has_media'] = True
+    else:
+        item['has_media'] = False
 
-    except Exception as e:
-        logger.error(f"Error sending notifications to API: {e}")
-        # Put the posts back in buffer
-        with NOTIFICATION_MUTEX:
-            NOTIFICATION_BUFFER.extend(posts_to_send)
-
-
-# Function to check if it's time to send notifications
-def check_notification_timer():
-    """Check if it's time to send notifications (15-minute interval)"""
-    current_time = time.time()
-    if current_time - LAST_NOTIFICATION_TIME >= NOTIFICATION_INTERVAL:
-        logger.info("Notification interval reached - sending buffered posts")
-        send_buffered_notifications()
-        return True
-    return False
+    return item
 
 
 # Function to insert post into DynamoDB
-def put_post(dynamodb, post_data):
-    """Store post data in DynamoDB"""
-    try:
-        posts_table = dynamodb.Table(POSTS_TABLE)
+def put_post(dynamodb, post_data, writer=None):
+    """
+    Store post data in DynamoDB
 
-        # DynamoDB doesn't support native float type, convert to Decimal
-        confidence_score = Decimal(str(post_data.get('confidence_score', 0.0)))
+    Args:
+        dynamodb: DynamoDB resource
+        post_data: Post fields to store
+        writer: Optional DynamoBatchWriter; when given the post is buffered instead of written immediately
 
-        # Format the created_at and indexed_at as ISO strings safely
-        if isinstance(post_data['created_at'], str):
-            created_at = post_data['created_at']
-        else:
-            created_at = post_data['created_at'].isoformat()
+    Returns:
+        The post_id (or a Future resolving when the buffered write finishes), or None on error
+    """
+    try:
+        item = build_post_item(post_data)
 
-        if isinstance(post_data['indexed_at'], str):
-            indexed_at = post_data['indexed_at']
-        else:
-            indexed_at = post_data['indexed_at'].isoformat()
-
-        # Get is_disaster value and convert to string for indexing
-        is_disaster = post_data.get('is_disaster', False)
-        is_disaster_str = 'true' if is_disaster else 'false'
-
-        # Build the item
-        item = {
-            'post_id': post_data['post_id'],
-            'indexed_at': indexed_at,  # Use as sort key
-            'user_id': post_data['user_id'],
-            'handle': post_data['handle'],
-            'display_name': post_data.get('display_name', ''),
-            'avatar_url': post_data.get('avatar_url', ''),
-            'original_text': post_data['original_text'],
-            'clean_text': post_data['clean_text'],
-            'created_at': created_at,
-            'location_name': post_data.get('location_name', ''),
-            'disaster_type': post_data.get('disaster_type', 'unknown'),
-            'confidence_score': confidence_score,
-            'is_disaster': is_disaster,
-            'is_disaster_str': is_disaster_str,  # Add string version for GSI
-            'language': post_data.get('language', 'en')  # Store detected language
-        }
+        if writer is not None:
+            # Buffer the write; the API is notified once the batch containing it succeeds
+            future = writer.submit(POSTS_TABLE, item)
 
-        # Add media_urls if present (and set has_media based on media_urls)
-        if 'media_urls' in post_data and post_data['media_urls']:
-            item['media_urls'] = post_data['media_urls']
-            item['has_media'] = True
-        else:
-            item['has_media'] = False
+            def on_written(done):
+                if done.exception() is None:
+                    logger.info(f"Post stored: {item['post_id']}")
+                    notify_api_about_new_post(item)
+                else:
+                    logger.error(f"Error storing post {item['post_id']}: {done.exception()}")
+
+            future.add_done_callback(on_written)
+            return future
 
         # Put the item in the table
+        posts_table = dynamodb.Table(POSTS_TABLE)
         posts_table.put_item(Item=item)
         logger.info(f"Post stored: {post_data['post_id']}")
 
-        # Add to notification buffer (will be sent at 15-minute intervals)
+        # Queue the API notification
         notify_api_about_new_post(item)
 
         return post_data['post_id']
@@ -578,21 +694,81 @@ def put_post(dynamodb, post_data):
         return None
 
 
+# Load the model (and its worker pool) for the model manager
+def load_inference_model(model_path):
+    """
+    Load a model for classification in this process or in worker processes.
+
+    Returns:
+        tuple: (tokenizer, model, id2label)
+    """
+    if INFERENCE_WORKERS > 0 and not InferencePool.can_fork():
+        # Hot reload (threads are running): spawned workers each load model_path, so this process keeps no copy
+        pool = InferencePool(None, None, None, INFERENCE_WORKERS, batch_size=INFERENCE_BATCH_SIZE,
+                             threads_per_worker=INFERENCE_WORKER_THREADS, model_path=model_path,
+                             backend=INFERENCE_BACKEND)
+        pool.start()
+        return None, pool, None
+
+    tokenizer, model, id2label = init_model(model_path)
+    if INFERENCE_WORKERS > 0:
+        # Forked while this is still the only thread, so the workers share this process's copy
+        model = InferencePool(tokenizer, model, id2label, INFERENCE_WORKERS, batch_size=INFERENCE_BATCH_SIZE,
+                              threads_per_worker=INFERENCE_WORKER_THREADS, model_path=model_path,
+                              backend=INFERENCE_BACKEND)
+        model.start()
+    return tokenizer, model, id2label
+
+
+# Run texts through a loaded model, bypassing the prediction cache
+def run_model(tokenizer, model, id2label, texts):
+    """Predict disaster types with the local model or the worker pool"""
+    if isinstance(model, InferencePool):
+        return model.predict(texts)
+    return predict_disaster_batch(tokenizer, model, id2label, texts, batch_size=INFERENCE_BATCH_SIZE)
+
+
+# Classify texts with the local model or the shared classification service
+def classify_batch(tokenizer, model, id2label, texts):
+    """
+    Predict disaster types for a list of cleaned texts.
+
+    Returns:
+        tuple: ((label, confidence) tuples in the same order as texts, version of the model that made them)
+
+    Raises:
+        ClassifierUnavailable: If the classification service could not classify the texts
+    """
+    if isinstance(model, ClassifierClient):
+        # The service batches and caches across every ingestor
+        return model.predict(texts)
+
+    if isinstance(model, ModelManager):
+        # The whole batch is classified by one model, even if a reload swaps it meanwhile
+        with model.use() as loaded:
+            predictions, _ = classify_batch(loaded.tokenizer, loaded.model, loaded.id2label, texts)
+        return predictions, loaded.version
+
+    # Only texts the cache hasn't seen go through the model (or the worker pool)
+    predictions = prediction_cache.predict(texts, lambda batch: run_model(tokenizer, model, id2label, batch))
+    return predictions, prediction_cache.model_version
+
+
+# Classify texts, without the model version
+def classify_texts(tokenizer, model, id2label, texts):
+    """
+    Predict disaster types for a list of cleaned texts.
+
+    Returns:
+        list: (label, confidence) tuples in the same order as texts
+    """
+    return classify_batch(tokenizer, model, id2label, texts)[0]
+
+
 # Predict disaster type from text
 def predict_disaster(tokenizer, model, id2label, text):
     """Predict disaster type from text"""
-    try:
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-        outputs = model(**inputs)
-        probabilities = F.softmax(outputs.logits, dim=-1)
-        predicted_index = probabilities.argmax().item()
-        predicted_label = id2label[predicted_index]
-        confidence_score = probabilities[0, predicted_index].item()
-
-        return predicted_label, confidence_score
-    except Exception as e:
-        logger.error(f"Error predicting disaster: {e}")
-        return "unknown", 0.0
+    return classify_texts(tokenizer, model, id2label, [text])[0]
 
 
 # Ensure Bluesky session is valid
@@ -612,11 +788,8 @@ def ensure_bluesky_session(client, max_retries=3):
             # Try a simple profile request to test if session is valid
             handle = os.getenv('API_HANDLE')
 
-            # Use token for this request
-            if not consume_token():
-                # Wait for token to become available
-                time.sleep(1)
-                continue
+            # Use token for this request, waiting for one if necessary
+            wait_for_token(priority=PRIORITY_HIGH)
 
             client.app.bsky.actor.get_profile({'actor': handle})
             logger.info("Bluesky session is valid")
@@ -628,11 +801,8 @@ def ensure_bluesky_session(client, max_retries=3):
             try:
                 logger.info("Attempting to refresh Bluesky session...")
 
-                # Use token for this request
-                if not consume_token():
-                    # Wait for token to become available
-                    time.sleep(1)
-                    continue
+                # Use token for this request, waiting for one if necessary
+                wait_for_token(priority=PRIORITY_HIGH)
 
                 client.login(os.getenv('API_HANDLE'), os.getenv('API_PW'))
                 logger.info("Successfully refreshed Bluesky session")
@@ -649,50 +819,43 @@ def ensure_bluesky_session(client, max_retries=3):
     return False
 
 
-# Search Bluesky for posts with keywords
-def search_bluesky_for_keywords(client, keyword, since_time, max_posts=10, max_retries=3):
+# Format a datetime or ISO string the way the search API expects
+def format_api_time(value):
+    """Return value as an ISO timestamp without microseconds and with a Z suffix"""
+    if isinstance(value, datetime):
+        value = value.replace(microsecond=0).isoformat()
+    if value.endswith('+00:00'):
+        value = value.replace('+00:00', 'Z')
+    return value
+
+
+# Search Bluesky for one page of posts with a keyword
+def search_bluesky_page(client, keyword, since_str, cursor=None, limit=SEARCH_PAGE_SIZE, max_retries=3, until_str=None):
     """
-    Search Bluesky for posts containing a keyword since a specific time
+    Fetch a single page of search results, retrying on failure
 
     Args:
         client: The Bluesky client
         keyword: Keyword to search for
-        since_time: ISO-formatted time string to search from
-        max_posts: Maximum number of posts to return
+        since_str: API-formatted time string to search from
+        cursor: Cursor returned by the previous page, or None for the first page
+        limit: Page size
         max_retries: Maximum number of retry attempts
+        until_str: Optional API-formatted time string to search up to
 
     Returns:
         Response object or None if failed
     """
     for attempt in range(1, max_retries + 1):
         try:
-            # Check if we have a token available
-            if not consume_token():
-                # If no token available, wait a bit before continuing
-                token_wait = RATE_LIMIT_WINDOW / MAX_REQUESTS_PER_WINDOW
-                logger.warning(f"Rate limit reached, waiting {token_wait:.2f}s for next token")
-                time.sleep(token_wait + 0.1)  # Add a small buffer
-                continue
-
-            # Format the since_time correctly for the API
-            if isinstance(since_time, datetime):
-                since_str = since_time.replace(microsecond=0).isoformat()
-                if since_str.endswith('+00:00'):
-                    since_str = since_str.replace('+00:00', 'Z')
-            else:
-                # If it's already a string, ensure it's in the correct format
-                since_str = since_time
-                if since_str.endswith('+00:00'):
-                    since_str = since_str.replace('+00:00', 'Z')
-
-            logger.info(f"Searching for '{keyword}' since {since_str}")
+            # Block until the shared token bucket allows another request
+            wait_for_token()
 
             # Make the API request with rate limiting
-            response = client.app.bsky.feed.search_posts(
-                params={'q': keyword, 'limit': max_posts, 'cursor': None, 'since': since_str}
-            )
-
-            return response
+            params = {'q': keyword, 'limit': limit, 'cursor': cursor, 'since': since_str, 'sort': 'latest'}
+            if until_str:
+                params['until'] = until_str
+            return client.app.bsky.feed.search_posts(params=params)
 
         except Exception as e:
             error_msg = str(e)
@@ -700,8 +863,9 @@ def search_bluesky_for_keywords(client, keyword, since_time, max_posts=10, max_r
 
             # Check if this looks like a rate limit error
             if "rate limit" in error_msg.lower() or "429" in error_msg:
-                logger.warning(f"Rate limit detected. Waiting longer for retry.")
-                time.sleep(30)  # Wait longer for rate limit errors
+                # Pause every caller until the server's reset time (the next wait_for_token blocks)
+                logger.warning(f"Rate limit detected. Waiting for the rate limit window to reset.")
+                rate_limiter.rate_limited()
             elif attempt < max_retries:
                 # For other errors, use exponential backoff
                 wait_time = min(30, 2 ** attempt)
@@ -718,211 +882,483 @@ def search_bluesky_for_keywords(client, keyword, since_time, max_posts=10, max_r
     return None
 
 
+# Search Bluesky for posts with keywords
+def search_bluesky_for_keywords(client, keyword, since_time, max_posts=SEARCH_PAGE_SIZE, max_pages=SEARCH_MAX_PAGES,
+                                max_retries=3, until_time=None):
+    """
+    Search Bluesky for posts containing a keyword since a specific time,
+    following the result cursor until since_time is reached or the page budget runs out
+
+    Args:
+        client: The Bluesky client
+        keyword: Keyword to search for
+        since_time: Datetime or ISO-formatted time string to search from
+        max_posts: Page size for each request
+        max_pages: Maximum number of pages to fetch for this keyword
+        max_retries: Maximum number of retry attempts per page
+        until_time: Optional datetime or ISO-formatted time string to search up to
+
+    Returns:
+        SearchResults with the posts from every page (newest first), or None if the first page failed.
+        SearchResults.complete is False when the page budget ran out before reaching since_time.
+    """
+    # Format the times correctly for the API
+    since_str = format_api_time(since_time)
+    since_dt = since_time if isinstance(since_time, datetime) else safe_parse_date(since_str)
+    until_str = format_api_time(until_time) if until_time else None
+
+    if until_str:
+        logger.info(f"Searching for '{keyword}' between {since_str} and {until_str}")
+    else:
+        logger.info(f"Searching for '{keyword}' since {since_str}")
+
+    posts = []
+    cursor = None
+    pages = 0
+    complete = False
+
+    while pages < max_pages:
+        response = search_bluesky_page(client, keyword, since_str, cursor=cursor, limit=max_posts,
+                                       max_retries=max_retries, until_str=until_str)
+        if response is None:
+            if pages == 0:
+                return None
+            # Keep what we already have; the caller will not advance past it
+            break
+
+        pages += 1
+        page_posts = list(getattr(response, 'posts', None) or [])
+        posts.extend(page_posts)
+        cursor = getattr(response, 'cursor', None)
+
+        # Stop when there are no more pages or we've paged back past the checkpoint
+        if not cursor or len(page_posts) < max_posts:
+            complete = True
+            break
+        if safe_parse_date(page_posts[-1].indexed_at) <= since_dt:
+            complete = True
+            break
+
+    if not complete:
+        logger.warning(f"Stopped paging '{keyword}' after {pages} pages ({len(posts)} posts); "
+                       f"the older posts are left as a gap for the next poll")
+
+    return SearchResults(posts=posts, pages=pages, complete=complete)
+
+
 # Process new posts with rate limiting
 def process_keyword_feed(dynamodb, tokenizer, model, id2label, client):
     """
-    Process posts containing keywords with proper rate limiting
+    Process posts containing keywords with proper rate limiting.
+
+    Each cycle runs the keywords through a staged pipeline:
+    fetch (search) -> filter (dedup, language, cleaning) -> classify (batched) -> store.
     """
-    json_file_path = "disaster_posts.json"
-    processed_ids = set()  # Track processed post IDs to avoid duplicates
+    state_mutex = threading.Lock()  # Guards state shared between pipeline workers
 
     # Load or initialize last processed timestamps
     last_processed_times = init_last_processed_times()
 
-    # Load existing posts data if file exists
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as json_file:
-            posts_data = json.load(json_file)
-            # Add existing post IDs to processed set
-            for post in posts_data:
-                processed_ids.add(post.get("uri", ""))
-    except (FileNotFoundError, json.JSONDecodeError):
-        posts_data = []
+    # Processed posts are appended to the journal, one line each
+    journal = PostJournal(POSTS_JOURNAL_FILE, max_bytes=JOURNAL_MAX_BYTES, max_age=JOURNAL_MAX_AGE,
+                          compress=JOURNAL_COMPRESS)
 
-    initial_post_count = len(posts_data)
-    logger.info(f"Loaded {initial_post_count} existing posts from JSON file")
+    # Track processed post IDs to avoid duplicates, restored from the last snapshot
+    seed_dedup = not os.path.exists(DEDUP_SNAPSHOT_FILE)
+    processed_ids = WindowedDedup.load(DEDUP_SNAPSHOT_FILE, window=DEDUP_WINDOW,
+                                       false_positive_rate=DEDUP_FALSE_POSITIVE_RATE)
+    if seed_dedup:
+        # First run with the dedup store: seed it from the posts we already saved
+        try:
+            with open(POSTS_JSON_FILE, "r", encoding="utf-8") as json_file:
+                saved_posts = json.load(json_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            saved_posts = []
+        logger.info(f"Seeding dedup store from {len(saved_posts)} saved posts")
+        for post in saved_posts:
+            if post.get("uri") and post.get("timestamp"):
+                processed_ids.add(post["uri"], safe_parse_date(post["timestamp"]).timestamp())
+
+    # Ranges between a group's checkpoint and the oldest post fetched before its page budget ran out.
+    # While a group has a gap its checkpoint stays put and each poll drains the gap (searching
+    # until its upper bound) before any newer posts are fetched; once drained, the checkpoint
+    # jumps to the newest post seen when the gap was opened.
+    search_gaps = load_search_gaps(SEARCH_GAPS_FILE)
+
+    # Per-cycle bookkeeping, filled in by the store stage
+    newest_times = {}
+    new_post_counts = {}
+    closed_gaps = {}  # Query groups whose gap was drained this cycle -> checkpoint to resume from
+    in_flight = set()  # Posts passed by the filter stage and not stored yet
+    failed_groups = set()  # Query groups with a post that failed to classify or store this cycle
+
+    # Stage 1: search Bluesky for a query group
+    def fetch_stage(group):
+        try:
+            # Get the last processed time for this group
+            since_time = last_processed_times.get(group.key)
+
+            # Convert string to datetime if needed
+            if isinstance(since_time, str):
+                since_time = datetime.fromisoformat(since_time.replace('Z', '+00:00'))
+
+            # Older posts left unfetched by an earlier poll come first
+            with state_mutex:
+                gap = search_gaps.get(group.key)
+
+            # One search covers every keyword in the group
+            response = search_bluesky_for_keywords(client, group.query, since_time,
+                                                   until_time=gap['until'] if gap else None)
+            if response is None:
+                logger.info(f"Search failed for query: {group.query}")
+                poll_scheduler.record(group.key, 0)
+                return []
+
+            with state_mutex:
+                if response.complete and gap:
+                    # Everything between the checkpoint and the gap is fetched now
+                    del search_gaps[group.key]
+                    closed_gaps[group.key] = safe_parse_date(gap['newest'])
+                    logger.info(f"Drained search gap for query: {group.query}")
+                elif not response.complete:
+                    # Hold the checkpoint and resume below the oldest post fetched so far
+                    oldest_time = min(safe_parse_date(post.indexed_at) for post in response.posts)
+                    newest_time = max(safe_parse_date(post.indexed_at) for post in response.posts)
+                    search_gaps[group.key] = {
+                        'until': oldest_time.isoformat(),
+                        'newest': gap['newest'] if gap else newest_time.isoformat()
+                    }
 
-    try:
-        # Round-robin through keywords
-        while True:
-            for keyword in DISASTER_KEYWORDS:
-                try:
-                    # Get the last processed time for this keyword
-                    since_time = last_processed_times.get(keyword)
+            if not response.posts:
+                logger.info(f"No new posts found for query: {group.query}")
+                poll_scheduler.record(group.key, 0, pages=response.pages)
+                return []
 
-                    # Convert string to datetime if needed
-                    if isinstance(since_time, str):
-                        since_time = datetime.fromisoformat(since_time.replace('Z', '+00:00'))
+            # Feed the yield back into the polling schedule
+            poll_scheduler.record(group.key, len(response.posts), pages=response.pages,
+                                  exhausted=not response.complete)
 
-                    # Search for posts with this keyword
-                    response = search_bluesky_for_keywords(client, keyword, since_time)
+            logger.info(f"Found {len(response.posts)} posts for query: {group.query} ({response.pages} pages)")
 
-                    if not response or not hasattr(response, 'posts') or not response.posts:
-                        logger.info(f"No new posts found for keyword: {keyword}")
-                        continue
+            # Attribute each post to the keywords it actually mentions
+            items = [{'group': group.key, 'keywords': query_planner.attribute(group, post.record.text), 'post': post}
+                     for post in response.posts]
+            query_planner.record_fetch(group, [item['keywords'] for item in items], response.pages)
+            return items
+
+        except Exception as e:
+            error_text = str(e)
+            logger.error(f"Error in keyword search for '{group.query}': {error_text}")
+            poll_scheduler.record(group.key, 0)
+
+            # Check if this is an authentication/session error
+            if 'auth' in error_text.lower() or 'session' in error_text.lower():
+                ensure_bluesky_session(client)
+            return []
+
+    # Stage 2: drop duplicates and non-English posts, clean the text
+    def filter_stage(items):
+        # Skip posts we've already processed or that are on their way through the pipeline.
+        # A post is only recorded as processed once it is stored, so a post that fails in a
+        # later stage is picked up again by the next poll.
+        new_items = []
+        with state_mutex:
+            for item in items:
+                uri = item['post'].uri
+                if uri not in in_flight and not processed_ids.seen(uri):
+                    in_flight.add(uri)
+                    new_items.append(item)
+
+        # Check which posts are in English, one batch at a time
+        english = language_identifier.is_english_batch([item['post'].record.text for item in new_items])
+
+        kept = []
+        for item, is_english_post in zip(new_items, english):
+            if not is_english_post:
+                logger.info(f"Skipping non-English post: {item['post'].uri}")
+                mark_processed(item)
+                continue
+            item['clean_text'] = clean_text(item['post'].record.text)
+            kept.append(item)
+        return kept
+
+    # Record a post as done, so later polls skip it
+    def mark_processed(item):
+        post = item['post']
+        with state_mutex:
+            processed_ids.add(post.uri, safe_parse_date(post.indexed_at).timestamp())
+            in_flight.discard(post.uri)
+
+    # Hold the checkpoint of every group in a batch that failed, so its posts are fetched again
+    def hold_failed(stage_func):
+        def run(argument):
+            try:
+                return stage_func(argument)
+            except Exception:
+                items = argument if isinstance(argument, list) else [argument]
+                with state_mutex:
+                    failed_groups.update(item['group'] for item in items)
+                raise
+        return run
+
+    # Stage 3: classify a batch of posts in one forward pass
+    def classify_stage(items):
+        # Posts the prefilter rules out skip the transformer and count as non-disaster
+        keep = prefilter.screen([item['clean_text'] for item in items])
+        candidates = [item for item, passed in zip(items, keep) if passed]
+        for item, passed in zip(items, keep):
+            if not passed:
+                item['predicted_label'] = "unknown"
+                item['confidence_score'] = 0.0
+
+        texts = [item['clean_text'] for item in candidates]
+        for attempt in range(CLASSIFY_RETRIES + 1):
+            try:
+                predictions, version = classify_batch(tokenizer, model, id2label, texts)
+                break
+            except ClassifierUnavailable as e:
+                if attempt == CLASSIFY_RETRIES:
+                    # Raised to the pipeline: the posts aren't stored and their groups' checkpoints hold
+                    raise
+                delay = CLASSIFY_RETRY_DELAY * 2 ** attempt
+                logger.warning(f"{e}; retrying {len(texts)} posts in {delay:.0f}s")
+                time.sleep(delay)
+        for item, (predicted_label, confidence_score) in zip(candidates, predictions):
+            item['predicted_label'] = predicted_label
+            item['confidence_score'] = confidence_score
+        for item in items:
+            item['model_version'] = version or ''
+        return items
+
+    # Stage 4: store the post and record it for the JSON file
+    def store_stage(item):
+        post = item['post']
+        cleaned_text = item['clean_text']
+        predicted_label = item['predicted_label']
+        confidence_score = item['confidence_score']
+        classified_by = item['model_version']
+
+        uri = post.uri
+        text = post.record.text
+
+        # Extract other fields
+        did = post.author.did
+        handle = post.author.handle
+        display_name = post.author.display_name or ''
+        avatar_url = post.author.avatar or ''
+        created_at = safe_parse_date(post.record.created_at)
+        indexed_at = safe_parse_date(post.indexed_at)
+
+        # Check for media
+        media_urls = []
+        if hasattr(post.record, 'embed') and hasattr(post.record.embed, 'images'):
+            for image in post.record.embed.images:
+                if hasattr(image, 'image') and hasattr(image.image, 'ref') and hasattr(
+                        image.image.ref, 'link'):
+                    image_url = f"https://cdn.bsky.app/img/feed_fullsize/{image.image.ref.link}"
+                    media_urls.append(image_url)
+
+        # Two different thresholds
+        threshold = 0.1  # Lower threshold for JSON/logging
+        db_threshold = 0.95  # Higher threshold for database
+
+        # Determine disaster status
+        is_disaster = confidence_score >= threshold
+        is_disaster_db = confidence_score >= db_threshold
+
+        # Store user
+        if is_disaster_db:
+            user_data = {
+                'user_id': did,
+                'handle': handle,
+                'display_name': display_name,
+                'avatar_url': avatar_url
+            }
+            if put_user_cached(dynamodb, user_data, user_cache) is None:
+                # Raised to the pipeline, which holds the group's checkpoint so the post is fetched again
+                raise RuntimeError(f"Could not store user {did} for post {uri}")
+        else:
+            logger.info(f"Skipping adding user")
+
+        # Store post
+        if is_disaster_db:
+            post_data = {
+                'post_id': uri,
+                'user_id': did,
+                'handle': handle,
+                'display_name': display_name,
+                'avatar_url': avatar_url,
+                'original_text': text,
+                'clean_text': cleaned_text,
+                'created_at': created_at,
+                'indexed_at': indexed_at,
+                'location_name': "",
+                'media_urls': media_urls,
+                'disaster_type': predicted_label,
+                'confidence_score': confidence_score,
+                'is_disaster': is_disaster_db,
+                'language': 'en',
+                'model_version': classified_by
+            }
+            write = put_post(dynamodb, post_data, writer=writer)
+            if write is None:
+                raise RuntimeError(f"Could not queue post {uri} for storage")
+        else:
+            write = None
+            logger.info(f"Skipping non-disaster post (confidence: {confidence_score}): {uri}")
+
+        # Prepare post data for JSON
+        json_post_data = {
+            "uri": uri,
+            "handle": handle,
+            "display_name": display_name,
+            "text": text,
+            "clean_text": cleaned_text,
+            "timestamp": created_at.isoformat(),
+            "avatar": avatar_url,
+            "media": media_urls,
+            "predicted_disaster_type": predicted_label,
+            "confidence_score": confidence_score,
+            "is_disaster": is_disaster,
+            "location": "",
+            "model_version": classified_by
+        }
+
+        # Constant-size append instead of rewriting the whole posts file
+        journal.append(json_post_data)
+
+        if write is None:
+            mark_processed(item)
+        else:
+            # Done once the buffered write lands; the cycle flushes the writer before updating checkpoints
+            def on_written(done):
+                if done.exception() is None:
+                    mark_processed(item)
+                else:
+                    with state_mutex:
+                        failed_groups.add(item['group'])
+            write.add_done_callback(on_written)
+
+        with state_mutex:
+            for keyword in item['keywords']:
+                new_post_counts[keyword] = new_post_counts.get(keyword, 0) + 1
+
+            # Track newest post time to update the group's checkpoint
+            group_key = item['group']
+            if group_key not in newest_times or indexed_at > newest_times[group_key]:
+                newest_times[group_key] = indexed_at
+
+        logger.info(f"Processed new post: {uri}")
+
+    # Users already stored in DynamoDB, so most posts skip the users table entirely
+    user_cache = KnownUserCache(max_users=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+    # Buffered DynamoDB post writes so the store stage never waits on a round trip. Users go through
+    # put_user_cached instead: its conditional put can't be expressed in a BatchWriteItem request.
+    writer = DynamoBatchWriter(dynamodb, {
+        POSTS_TABLE: ['post_id', 'indexed_at']
+    }, flush_interval=WRITE_FLUSH_INTERVAL)
+    writer.start()
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch_stage, workers=FETCH_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage('filter', filter_stage, workers=FILTER_WORKERS, queue_size=PIPELINE_QUEUE_SIZE,
+              batch_size=FILTER_BATCH_SIZE),
+        Stage('classify', hold_failed(classify_stage), workers=CLASSIFY_WORKERS, queue_size=PIPELINE_QUEUE_SIZE,
+              batch_size=INFERENCE_BATCH_SIZE),
+        Stage('store', hold_failed(store_stage), workers=STORE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE)
+    ])
+    pipeline.start()
+
+    # Poll each query group as often as its recent yield warrants, within the token budget
+    groups_by_key = {group.key: group for group in query_planner.groups}
+    poll_scheduler = AdaptiveScheduler(
+        groups_by_key.keys(),
+        budget_per_second=POLL_BUDGET_SHARE * MAX_REQUESTS_PER_WINDOW / RATE_LIMIT_WINDOW,
+        min_interval=POLL_MIN_INTERVAL,
+        max_interval=POLL_MAX_INTERVAL,
+        target_posts=POLL_TARGET_POSTS
+    )
+
+    # Posts in the journal when the JSON view was last refreshed
+    compacted_records = 0
+    last_compacted = time.monotonic()
 
-                    logger.info(f"Found {len(response.posts)} posts for keyword: {keyword}")
-
-                    # Track newest post time to update last_processed_times
-                    newest_time = since_time
-                    new_post_count = 0
-
-                    # Process each post
-                    for post in response.posts:
-                        try:
-                            uri = post.uri
-
-                            # Skip if we've already processed this post
-                            if uri in processed_ids:
-                                continue
-
-                            # Extract post data
-                            text = post.record.text
-
-                            # Check if post is in English
-                            if not is_english(text):
-                                logger.info(f"Skipping non-English post: {uri}")
-                                continue
-
-                            # Add to processed set to avoid duplication
-                            processed_ids.add(uri)
-
-                            # Extract other fields
-                            did = post.author.did
-                            handle = post.author.handle
-                            display_name = post.author.display_name or ''
-                            avatar_url = post.author.avatar or ''
-                            cleaned_text = clean_text(text)
-                            created_at = safe_parse_date(post.record.created_at)
-                            indexed_at = safe_parse_date(post.indexed_at)
-
-                            # Update newest time if needed
-                            if indexed_at > newest_time:
-                                newest_time = indexed_at
-
-                            # Check for media
-                            media_urls = []
-                            if hasattr(post.record, 'embed') and hasattr(post.record.embed, 'images'):
-                                for image in post.record.embed.images:
-                                    if hasattr(image, 'image') and hasattr(image.image, 'ref') and hasattr(
-                                            image.image.ref, 'link'):
-                                        image_url = f"https://cdn.bsky.app/img/feed_fullsize/{image.image.ref.link}"
-                                        media_urls.append(image_url)
-
-                            # Predict disaster type
-                            predicted_label, confidence_score = predict_disaster(tokenizer, model, id2label, cleaned_text)
-
-                            # Two different thresholds
-                            threshold = 0.1  # Lower threshold for JSON/logging
-                            db_threshold = 0.95  # Higher threshold for database
-
-                            # Determine disaster status
-                            is_disaster = confidence_score >= threshold
-                            is_disaster_db = confidence_score >= db_threshold
-
-                            # Store user
-                            if is_disaster_db:
-                                user_data = {
-                                    'user_id': did,
-                                    'handle': handle,
-                                    'display_name': display_name,
-                                    'avatar_url': avatar_url
-                                }
-                                put_user(dynamodb, user_data)
-                            else:
-                                logger.info(f"Skipping adding user")
-
-                            # Store post
-                            if is_disaster_db:
-                                post_data = {
-                                    'post_id': uri,
-                                    'user_id': did,
-                                    'handle': handle,
-                                    'display_name': display_name,
-                                    'avatar_url': avatar_url,
-                                    'original_text': text,
-                                    'clean_text': cleaned_text,
-                                    'created_at': created_at,
-                                    'indexed_at': indexed_at,
-                                    'location_name': "",
-                                    'media_urls': media_urls,
-                                    'disaster_type': predicted_label,
-                                    'confidence_score': confidence_score,
-                                    'is_disaster': is_disaster_db,
-                                    'language': 'en'
-                                }
-                                put_post(dynamodb, post_data)
-                            else:
-                                logger.info(f"Skipping non-disaster post (confidence: {confidence_score}): {uri}")
-
-                            # Prepare post data for JSON
-                            json_post_data = {
-                                "uri": uri,
-                                "handle": handle,
-                                "display_name": display_name,
-                                "text": text,
-                                "clean_text": cleaned_text,
-                                "timestamp": created_at.isoformat(),
-                                "avatar": avatar_url,
-                                "media": media_urls,
-                                "predicted_disaster_type": predicted_label,
-                                "confidence_score": confidence_score,
-                                "is_disaster": is_disaster,
-                                "location": ""
-                            }
-
-                            # Add to posts data (at the beginning for newest first)
-                            posts_data.insert(0, json_post_data)
-                            new_post_count += 1
-
-                            logger.info(f"Processed new post: {uri}")
-
-                        except Exception as e:
-                            logger.error(f"Error processing individual post: {e}")
-                            continue
-
-                    # Update last processed time for this keyword
-                    if newest_time > since_time:
-                        last_processed_times[keyword] = newest_time.isoformat()
-                        save_last_processed_times(last_processed_times)
-                        logger.info(f"Updated last processed time for '{keyword}' to {newest_time.isoformat()}")
-
-                    # Report on new posts
-                    if new_post_count > 0:
-                        logger.info(f"Processed {new_post_count} new posts for keyword: {keyword}")
-
-                        # Limit the number of posts we keep in the JSON file
-                        max_json_posts = 1000
-                        if len(posts_data) > max_json_posts:
-                            posts_data = posts_data[:max_json_posts]
-
-                        # Save posts to JSON
-                        with open(json_file_path, "w", encoding="utf-8") as json_file:
-                            json.dump(posts_data, json_file, indent=4, ensure_ascii=False)
-
-                        logger.info(f"Saved {len(posts_data)} posts to JSON")
-
-                except Exception as e:
-                    error_text = str(e)
-                    logger.error(f"Error in keyword search for '{keyword}': {error_text}")
-
-                    # Check if this is an authentication/session error
-                    if 'auth' in error_text.lower() or 'session' in error_text.lower():
-                        ensure_bluesky_session(client)
-
-                    continue  # Move to next keyword
-
-                # Brief delay between keywords to help with rate limiting
-                time.sleep(1)
-
-            # Check if it's time to send notifications
-            check_notification_timer()
-
-            # After processing all keywords, wait before next round
-            # This time is adjustable based on how aggressive you want to be
-            wait_time = 60  # 1 minute between full cycles
-            logger.info(f"Completed full keyword cycle. Waiting {wait_time} seconds until next cycle...")
-            time.sleep(wait_time)
+    try:
+        while True:
+            cycle_started = time.monotonic()
+            due_keys = poll_scheduler.due()
+            for key in due_keys:
+                pipeline.submit(groups_by_key[key])
+
+            # Wait for every post of this cycle to be stored; a failed DynamoDB write holds its group's checkpoint
+            pipeline.join()
+            writer.flush()
+            logger.info(f"Pipeline stats: {pipeline.stats()}")
+            logger.info(f"DynamoDB writer stats: {writer.stats()}")
+            logger.info(f"User cache stats: {user_cache.stats()}")
+            logger.info(f"Language ID stats: {language_identifier.stats()}")
+            logger.info(f"Query grouping stats: {query_planner.report()}")
+            logger.info(f"Poll scheduler stats: {poll_scheduler.stats()}")
+            logger.info(f"Notification stats: {notification_dispatcher.stats()}")
+            logger.info(f"Rate limiter stats: {rate_limiter.stats()}")
+            logger.info(f"Prediction cache stats: {prediction_cache.stats()}")
+            logger.info(f"Prefilter stats: {prefilter.stats()}")
+            if isinstance(model, ModelManager):
+                logger.info(f"Model stats: {model.stats()}")
+                if isinstance(model.current.model, InferencePool):
+                    logger.info(f"Inference pool stats: {model.current.model.stats()}")
+
+            # Update last processed time for each query group that yielded posts or drained its gap
+            with state_mutex:
+                for group_key in set(newest_times) | set(closed_gaps):
+                    if group_key in search_gaps:
+                        # Older posts are still unfetched; the checkpoint waits for the gap to drain
+                        continue
+                    if group_key in failed_groups:
+                        # Posts that failed are fetched again next poll; stored ones are skipped by dedup
+                        logger.warning(f"Holding last processed time for '{group_key}' after failed posts")
+                        if group_key in closed_gaps:
+                            # Reopen the drained gap as the range above the held checkpoint
+                            search_gaps[group_key] = {'until': None, 'newest': closed_gaps[group_key].isoformat()}
+                        continue
+                    candidate_times = [newest_times.get(group_key), closed_gaps.get(group_key)]
+                    newest_time = max(value for value in candidate_times if value is not None)
+                    since_time = last_processed_times.get(group_key)
+                    if isinstance(since_time, str):
+                        since_time = datetime.fromisoformat(since_time.replace('Z', '+00:00'))
+                    if since_time is None or newest_time > since_time:
+                        last_processed_times.set(group_key, newest_time.isoformat())
+                        logger.info(f"Updated last processed time for '{group_key}' to {newest_time.isoformat()}")
+
+                for keyword, count in new_post_counts.items():
+                    logger.info(f"Processed {count} new posts for keyword: {keyword}")
+
+                newest_times.clear()
+                new_post_counts.clear()
+                closed_gaps.clear()
+                failed_groups.clear()
+                in_flight.clear()  # Whatever is left failed, and is fetched again next poll
+                save_search_gaps(SEARCH_GAPS_FILE, search_gaps)
+
+            # Snapshot the dedup store so a restart doesn't re-classify this cycle's posts
+            processed_ids.save(DEDUP_SNAPSHOT_FILE)
+            logger.info(f"Dedup stats: {processed_ids.stats()}")
+
+            # Refresh the JSON view of the journal for the tools that read it
+            if journal.records != compacted_records and time.monotonic() - last_compacted >= JOURNAL_COMPACT_INTERVAL:
+                try:
+                    compact_journal(POSTS_JOURNAL_FILE, POSTS_JSON_FILE, limit=MAX_JSON_POSTS)
+                    compacted_records = journal.records
+                except OSError as e:
+                    logger.error(f"Error compacting post journal: {e}")
+                last_compacted = time.monotonic()
+
+            # Sleep until the next query group is due
+            next_poll = poll_scheduler.seconds_until_next()
+            logger.info(f"Polled {len(due_keys)} queries in {time.monotonic() - cycle_started:.1f}s. "
+                        f"Next poll in {next_poll:.1f} seconds")
+            time.sleep(next_poll)
 
     except KeyboardInterrupt:
         logger.info("Post monitoring interrupted by user")
@@ -931,37 +1367,41 @@ def process_keyword_feed(dynamodb, tokenizer, model, id2label, client):
         logger.error(f"Fatal error in post monitoring: {e}")
 
     finally:
+        # Let posts already in the pipeline finish, then stop its workers
+        try:
+            pipeline.stop()
+        except Exception as e:
+            logger.error(f"Error stopping pipeline: {e}")
+
+        # Stop the model reload thread and any inference workers
+        if isinstance(model, ModelManager):
+            model.stop()
+
+        # Write anything still buffered for DynamoDB
+        writer.stop()
+
         # Send any remaining notifications
-        if NOTIFICATION_BUFFER:
-            logger.info(f"Sending {len(NOTIFICATION_BUFFER)} buffered notifications before exit")
-            send_buffered_notifications()
+        notification_dispatcher.stop()
 
         # Always save the latest data before exiting
         try:
-            with open(json_file_path, "w", encoding="utf-8") as json_file:
-                json.dump(posts_data, json_file, indent=4, ensure_ascii=False)
-            logger.info("Saved posts data before exit")
+            journal.close()
+            compact_journal(POSTS_JOURNAL_FILE, POSTS_JSON_FILE, limit=MAX_JSON_POSTS)
+            logger.info("Compacted post journal before exit")
 
-            # Save last processed times
-            save_last_processed_times(last_processed_times)
+            # Write any checkpoint updates not flushed yet
+            last_processed_times.stop()
+            save_search_gaps(SEARCH_GAPS_FILE, search_gaps)
             logger.info("Saved last processed times before exit")
-        except Exception as e:
-            logger.error(f"Error saving final data: {e}")
 
+            # Save the dedup store
+            processed_ids.save(DEDUP_SNAPSHOT_FILE)
+            logger.info("Saved dedup snapshot before exit")
 
-# Notification thread function
-def notification_thread_func():
-    """Background thread to send notifications at regular intervals"""
-    while True:
-        try:
-            # Sleep for a shorter time to check more frequently
-            time.sleep(60)  # Check every minute
-
-            # Check if it's time to send notifications
-            if check_notification_timer():
-                logger.info("Notification interval reached (checked from notification thread)")
+            # Keep cached predictions for the next run
+            prediction_cache.save()
         except Exception as e:
-            logger.error(f"Error in notification thread: {e}")
+            logger.error(f"Error saving final data: {e}")
 
 
 # Session monitoring thread
@@ -973,7 +1413,7 @@ def session_monitor_thread(client):
             logger.info("Performing session health check")
 
             # Check if we have a token available
-            if consume_token():
+            if consume_token(priority=PRIORITY_HIGH):
                 handle = os.getenv('API_HANDLE')
                 client.app.bsky.actor.get_profile({'actor': handle})
                 logger.info("Session is still valid")
@@ -982,7 +1422,7 @@ def session_monitor_thread(client):
         except Exception as e:
             logger.warning(f"Session error in monitor thread: {e}")
             try:
-                if consume_token():
+                if consume_token(priority=PRIORITY_HIGH):
                     logger.info("Refreshing session from background thread")
                     client.login(os.getenv('API_HANDLE'), os.getenv('API_PW'))
                     logger.info("Session refreshed successfully")
@@ -1003,8 +1443,30 @@ def main(force_recreate_tables=False):
         dynamodb = init_dynamodb()
 
         # Initialize AI model
-        MODEL_PATH = os.getenv('MODEL_PATH', 'checkpoint-1800')  # Get from env var or use default
-        tokenizer, model, id2label = init_model(MODEL_PATH)
+        MODEL_PATH = os.getenv('MODEL_PATH', 'checkpoint-1800')  # Model bundle or checkpoint; from env var or default
+        if CLASSIFIER_URL:
+            logger.info(f"Using classification service at {CLASSIFIER_URL}")
+            tokenizer, model, id2label = None, ClassifierClient(CLASSIFIER_URL), None
+            model.health()
+        else:
+            # Loaded (and any workers forked) now, while this is still the only thread
+            tokenizer, id2label = None, None
+            model = ModelManager(MODEL_PATH, load_inference_model, run_model, backend=INFERENCE_BACKEND,
+                                 cache=prediction_cache, watch_interval=MODEL_WATCH_INTERVAL,
+                                 warmup_batches=MODEL_WARMUP_BATCHES, warmup_batch_size=INFERENCE_BATCH_SIZE)
+            model.load()
+
+            # Reuse cached predictions only if they came from this model
+            prediction_cache.load()
+
+            # New models are loaded in the background and swapped in between batches
+            model.start()
+            install_reload_signal(model)
+            if ADMIN_PORT:
+                serve_admin(model, port=ADMIN_PORT)
+
+        # Created after any workers are forked (and never by a spawned worker importing this module)
+        init_services()
 
         # Create tables if needed
         logger.info("Ensuring tables exist and are active...")
@@ -1015,6 +1477,7 @@ def main(force_recreate_tables=False):
         # Set up Bluesky client
         logger.info("Setting up Bluesky client...")
         client = Client()
+        install_client_hook(client, rate_limiter)  # Let the rate limiter follow the server's ratelimit headers
         client.login(os.getenv('API_HANDLE'), os.getenv('API_PW'))
 
         # Start session monitoring thread
@@ -1022,10 +1485,8 @@ def main(force_recreate_tables=False):
         session_thread.start()
         logger.info("Started session monitoring thread")
 
-        # Start notification thread
-        notification_thread = threading.Thread(target=notification_thread_func, daemon=True)
-        notification_thread.start()
-        logger.info("Started notification thread (15-minute intervals)")
+        # Start notification delivery
+        notification_dispatcher.start()
 
         # Process posts with keywords
         logger.info("Starting keyword-based post monitoring...")
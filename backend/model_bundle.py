@@ -0,0 +1,203 @@
+"""
+Model Bundle
+
+Self-contained, offline model package for the ingestors. A bundle is a
+directory holding everything needed to classify posts:
+
+- bundle.json: format version, model version, label map and max sequence length
+- config.json: the model architecture and label map
+- model.safetensors: the weights, memory-mapped on load
+- the tokenizer files
+
+Loading a bundle never touches the network (no "roberta-base" config
+download, no hub lookups) and does not initialize random weights only to
+overwrite them: safetensors are mapped straight from the page cache, so a
+restarted ingestor is classifying again within seconds. The bundle's model
+version is fixed at export time and tags cached predictions.
+
+Plain fine-tuned checkpoint directories still load, through the slower
+legacy path. Convert one to a bundle with:
+
+    python model_bundle.py export checkpoint-1800 model_bundle
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+
+from atomic_file import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Bundle layout
+BUNDLE_FILE = 'bundle.json'
+WEIGHTS_FILE = 'model.safetensors'
+BUNDLE_FORMAT_VERSION = 1
+
+# Labels of the fine-tuned checkpoints, by class index
+DISASTER_ID2LABEL = {
+    0: "avalanche", 1: "blizzard", 2: "bush_fire", 3: "cyclone",
+    4: "dust_storm", 5: "earthquake", 6: "flood", 7: "forest_fire",
+    8: "haze", 9: "hurricane", 10: "landslide", 11: "meteor",
+    12: "storm", 13: "tornado", 14: "tsunami", 15: "typhoon",
+    16: "unknown", 17: "volcano", 18: "wild_fire"
+}
+
+
+def is_bundle(path):
+    """True if path is a model bundle directory"""
+    return bool(path) and os.path.isfile(os.path.join(path, BUNDLE_FILE))
+
+
+def read_manifest(path):
+    """Read a bundle's bundle.json, or return None if path is not a bundle"""
+    if not is_bundle(path):
+        return None
+    with open(os.path.join(path, BUNDLE_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """blake2b digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_bundle(model, tokenizer, output_dir, id2label=None, metadata=None):
+    """
+    Write a fine-tuned model and its tokenizer as a bundle.
+
+    Args:
+        model: Fine-tuned HuggingFace sequence classification model
+        tokenizer: Its tokenizer
+        output_dir: Bundle directory (created if missing)
+        id2label: Label map (defaults to the model config's)
+        metadata: Extra JSON-serializable details stored in bundle.json
+
+    Returns:
+        dict: The bundle manifest
+    """
+    from inference import MAX_SEQ_LENGTH
+
+    os.makedirs(output_dir, exist_ok=True)
+    id2label = {int(index): label for index, label in (id2label or model.config.id2label).items()}
+    model.config.id2label = id2label
+    model.config.label2id = {label: index for index, label in id2label.items()}
+
+    model.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+
+    # Written last, so a directory only counts as a bundle once the weights are complete
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': file_digest(os.path.join(output_dir, WEIGHTS_FILE)),
+        'architecture': model.config.architectures[0] if model.config.architectures else type(model).__name__,
+        'id2label': {str(index): label for index, label in id2label.items()},
+        'max_seq_length': MAX_SEQ_LENGTH,
+        'weights': WEIGHTS_FILE,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'metadata': metadata or {}
+    }
+    atomic_write_json(os.path.join(output_dir, BUNDLE_FILE), manifest, indent=2)
+    logger.info(f"Exported model bundle to {output_dir} (version {manifest['model_version']})")
+    return manifest
+
+
+def checkpoint_id2label(config):
+    """
+    Label map of a fine-tuned checkpoint.
+
+    Uses the checkpoint config's labels when it has real ones. Checkpoints
+    saved without labels (LABEL_0, LABEL_1, ...) get DISASTER_ID2LABEL, but
+    only if they have that many classes.
+
+    Raises:
+        ValueError: If the checkpoint has placeholder labels and a different number of classes
+    """
+    id2label = {int(index): label for index, label in (config.id2label or {}).items()}
+    if id2label and any(label != f"LABEL_{index}" for index, label in id2label.items()):
+        return id2label
+    if config.num_labels != len(DISASTER_ID2LABEL):
+        raise ValueError(f"Checkpoint has {config.num_labels} unnamed classes; "
+                         f"expected the {len(DISASTER_ID2LABEL)} disaster labels")
+    return dict(DISASTER_ID2LABEL)
+
+
+def load_model_files(model_path):
+    """
+    Load the tokenizer, fp32 model and label map from a bundle or a checkpoint.
+
+    Returns:
+        tuple: (tokenizer, model, id2label)
+    """
+    from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+    started = time.perf_counter()
+    manifest = read_manifest(model_path)
+    if manifest is not None:
+        if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Model bundle {model_path} has unsupported format {manifest['format_version']}")
+        id2label = {int(index): label for index, label in manifest['id2label'].items()}
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        config = AutoConfig.from_pretrained(model_path, local_files_only=True)
+        # Weights are mapped from model.safetensors instead of being randomly initialized first
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_path,
+            config=config,
+            local_files_only=True,
+            use_safetensors=True,
+            low_cpu_mem_usage=True
+        )
+        logger.info(f"Loaded model bundle {manifest['model_version']} from {model_path} "
+                    f"in {time.perf_counter() - started:.1f}s")
+    else:
+        # Legacy checkpoint: architecture and labels from the checkpoint, so distilled students load too
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        config = AutoConfig.from_pretrained(model_path)
+        id2label = checkpoint_id2label(config)
+        config.id2label = id2label
+        config.label2id = {label: index for index, label in id2label.items()}
+        # A head that doesn't match the checkpoint is an error, not something to initialize randomly
+        model = AutoModelForSequenceClassification.from_pretrained(model_path, config=config)
+        logger.info(f"Loaded checkpoint from {model_path} in {time.perf_counter() - started:.1f}s "
+                    f"(export it with 'python model_bundle.py export' for faster offline starts)")
+    return tokenizer, model.eval(), id2label
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model bundle tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help="Convert a fine-tuned checkpoint into a bundle")
+    export.add_argument('model_path', help="Fine-tuned checkpoint directory")
+    export.add_argument('output_dir', help="Bundle directory to write")
+
+    verify = subparsers.add_parser('verify', help="Load a bundle offline and print its manifest")
+    verify.add_argument('bundle_dir', help="Bundle directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'export':
+        tokenizer, model, id2label = load_model_files(args.model_path)
+        export_bundle(model, tokenizer, args.output_dir, id2label, metadata={'source': os.path.abspath(args.model_path)})
+    else:
+        if not is_bundle(args.bundle_dir):
+            print(f"{args.bundle_dir} is not a model bundle (no {BUNDLE_FILE})")
+            sys.exit(1)
+        load_model_files(args.bundle_dir)
+        for key, value in read_manifest(args.bundle_dir).items():
+            if key != 'id2label':
+                print(f"{key}: {value}")
+        print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""
+Model Manager
+
+Hot reload of the disaster classifier in a running process. The manager owns
+the loaded model and lends it out one batch at a time. A new model is loaded
+and warmed up in the background and then swapped in between batches, so an
+ingestor keeps its dedup state, notification buffer and Bluesky session
+through a model rollout.
+
+A reload is triggered by:
+
+- a change of the model at the watched path (a new bundle.json, or changed
+  checkpoint files), checked every watch interval; the new fingerprint must
+  hold for two checks, so a checkpoint that is still being copied is not
+  loaded half-written
+- SIGHUP (install_reload_signal)
+- POST /admin/reload on the admin endpoint (serve_admin), optionally with
+  {"model_path": "..."} to switch to another bundle
+
+A model_path can point at a pickled checkpoint, and loading one runs code,
+so the admin endpoint only ever listens on the loopback interface.
+
+During a swap, batches already in flight finish on the old model and new
+batches wait for the new one. Every post is therefore classified once, by
+one model, and tagged with that model's version. If the new model fails to
+load or warm up, the current model keeps serving.
+"""
+
+import json
+import time
+import signal
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prediction_cache import model_version
+
+logger = logging.getLogger(__name__)
+
+# Default parameters
+DEFAULT_WATCH_INTERVAL = 30.0  # Seconds between checks of the model path (0 = don't watch)
+DEFAULT_WARMUP_BATCHES = 3  # Batches run through a new model before it is swapped in
+DEFAULT_WARMUP_BATCH_SIZE = 16  # Texts per warm-up batch
+ADMIN_HOST = '127.0.0.1'  # Loopback only: the admin endpoint loads models from arbitrary paths
+MAX_ADMIN_BODY_BYTES = 64 * 1024  # Larger admin request bodies are rejected
+
+# Texts of mixed length for warming up a new model
+WARMUP_TEXTS = (
+    "earthquake magnitude 6 hits the coast buildings damaged",
+    "flash flood warning issued for the valley tonight move to higher ground now",
+    "wildfire forces evacuations near the highway",
+    "hurricane makes landfall with strong winds and storm surge power out across the county roads closed",
+    "great coffee with friends this morning",
+    "tornado warning take shelter",
+    "snow all day and the roads are a mess schools closed again tomorrow after the blizzard",
+    "volcano erupts ash cloud grounds flights"
+)
+
+
+class LoadedModel:
+    """
+    A loaded model and the version that tags its predictions.
+
+    Args:
+        tokenizer: The HuggingFace tokenizer
+        model: The model (any backend, an InferencePool or an InferenceBatcher)
+        id2label: Mapping from class index to label
+        version: Model version (see prediction_cache.model_version)
+        path: Directory the model was loaded from
+    """
+
+    def __init__(self, tokenizer, model, id2label, version, path):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.id2label = id2label
+        self.version = version
+        self.path = path
+
+
+class ModelManager:
+    """
+    Loads, hot-reloads and lends out the classifier.
+
+    Args:
+        model_path: Model bundle or checkpoint directory
+        loader: Function mapping a model path to (tokenizer, model, id2label)
+        predict_fn: Function (tokenizer, model, id2label, texts) -> predictions, used for warm-up
+        backend: Inference backend name (part of the model version)
+        cache: Optional PredictionCache switched to each new model's version
+        watch_interval: Seconds between checks of model_path (0 = don't watch)
+        warmup_batches: Batches run through a new model before it is swapped in
+        warmup_batch_size: Texts per warm-up batch
+    """
+
+    def __init__(self, model_path, loader, predict_fn, backend='', cache=None,
+                 watch_interval=DEFAULT_WATCH_INTERVAL, warmup_batches=DEFAULT_WARMUP_BATCHES,
+                 warmup_batch_size=DEFAULT_WARMUP_BATCH_SIZE):
+        self.model_path = model_path
+        self.loader = loader
+        self.predict_fn = predict_fn
+        self.backend = backend
+        self.cache = cache
+        self.watch_interval = watch_interval
+        self.warmup_batches = warmup_batches
+        self.warmup_batch_size = warmup_batch_size
+
+        self.current = None
+        self._condition = threading.Condition()  # Guards current, _active and _swapping
+        self._active = 0  # Batches using the current model
+        self._swapping = False
+        self._reload_lock = threading.Lock()  # One reload at a time
+        self._requested_path = None
+        self._reload_requested = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Statistics
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_reload_seconds = 0.0
+        self.last_swap_pause = 0.0
+        self.last_error = None
+
+    @property
+    def version(self):
+        """Version of the model currently serving"""
+        return self.current.version if self.current else None
+
+    def load(self):
+        """Load the initial model in the calling thread"""
+        self.current = self._load(self.model_path)
+        if self.cache is not None:
+            self.cache.set_model_version(self.current.version)
+        logger.info(f"Serving model version {self.current.version} from {self.model_path}")
+        return self.current
+
+    def _load(self, path):
+        version = model_version(path, self.backend)
+        tokenizer, model, id2label = self.loader(path)
+        return LoadedModel(tokenizer, model, id2label, version, path)
+
+    @contextmanager
+    def use(self):
+        """
+        Borrow the current model for one batch.
+
+        The model yielded stays in place until the block exits, so the whole
+        batch is classified, cached and tagged by the same model.
+        """
+        with self._condition:
+            while self._swapping:
+                self._condition.wait()
+            self._active += 1
+            loaded = self.current
+        try:
+            yield loaded
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def reload(self, model_path=None):
+        """
+        Load and warm up a model, then swap it in between batches.
+
+        Args:
+            model_path: Directory to load (defaults to the current model path)
+
+        Returns:
+            bool: True if the new model is now serving
+        """
+        path = model_path or self.model_path
+        with self._reload_lock:
+            started = time.perf_counter()
+            logger.info(f"Loading new model from {path} (serving version {self.version})")
+            candidate = None
+            try:
+                candidate = self._load(path)
+                self._warm_up(candidate)
+            except Exception as e:
+                self._release(candidate)
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error(f"Failed to load model from {path}; still serving version {self.version}: {e}")
+                return False
+
+            old = self._swap(candidate)
+            self.model_path = path
+            self.reloads += 1
+            self.last_reload_seconds = time.perf_counter() - started
+            self.last_error = None
+            logger.info(f"Swapped in model version {candidate.version} from {path} "
+                        f"(loaded in {self.last_reload_seconds:.1f}s, batches paused {1000 * self.last_swap_pause:.0f} ms)")
+            self._release(old)
+            return True
+
+    def _warm_up(self, loaded):
+        """Run a few batches so the first real batch doesn't pay for lazy initialization"""
+        texts = [WARMUP_TEXTS[index % len(WARMUP_TEXTS)] for index in range(self.warmup_batch_size)]
+        for _ in range(self.warmup_batches):
+            self.predict_fn(loaded.tokenizer, loaded.model, loaded.id2label, texts)
+
+    def _swap(self, candidate):
+        """Wait for batches in flight, hold new ones back and swap the model; returns the old one"""
+        with self._condition:
+            self._swapping = True
+            paused = time.perf_counter()
+            while self._active:
+                self._condition.wait()
+            old, self.current = self.current, candidate
+            if self.cache is not None:
+                self.cache.set_model_version(candidate.version)
+            self._swapping = False
+            self.last_swap_pause = time.perf_counter() - paused
+            self._condition.notify_all()
+        return old
+
+    def _release(self, loaded):
+        """Stop a retired model's workers or batcher, if it has any"""
+        stop = getattr(loaded.model, 'stop', None) if loaded else None
+        if callable(stop):
+            try:
+                stop()
+            except Exception as e:
+                logger.warning(f"Error stopping retired model {loaded.version}: {e}")
+
+    def request_reload(self, model_path=None):
+        """Ask the background thread to reload (safe to call from a signal handler)"""
+        self._requested_path = model_path
+        self._reload_requested.set()
+
+    def start(self):
+        """Start the background thread that watches the model path and serves reload requests"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='model-reload', daemon=True)
+        self._thread.start()
+        if self.watch_interval:
+            logger.info(f"Watching {self.model_path} for new models every {self.watch_interval:g}s")
+
+    def stop(self):
+        """Stop the background thread and release the current model"""
+        self._stop_event.set()
+        self._reload_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._release(self.current)
+
+    def _run(self):
+        pending = None  # Fingerprint seen once, loaded if it is still there on the next check
+        failed = None  # Fingerprint that failed to load, not retried until it changes
+        while not self._stop_event.is_set():
+            requested = self._reload_requested.wait(self.watch_interval or None)
+            if self._stop_event.is_set():
+                break
+            if requested:
+                self._reload_requested.clear()
+                path, self._requested_path = self._requested_path, None
+                self.reload(path)
+                pending = None
+                continue
+
+            try:
+                fingerprint = model_version(self.model_path, self.backend)
+            except OSError as e:
+                logger.warning(f"Could not check {self.model_path} for a new model: {e}")
+                continue
+            if fingerprint in (self.version, failed):
+                pending = None
+                continue
+            if fingerprint != pending:
+                pending = fingerprint
+                continue
+
+            logger.info(f"Model at {self.model_path} changed")
+            if not self.reload():
+                failed = fingerprint
+            pending = None
+
+    def stats(self):
+        """Return the serving version and reload counters"""
+        return {
+            'model_path': self.model_path,
+            'model_version': self.version,
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'last_reload_seconds': round(self.last_reload_seconds, 2),
+            'last_swap_pause_ms': round(1000 * self.last_swap_pause, 1),
+            'last_error': self.last_error
+        }
+
+
+def install_reload_signal(manager):
+    """Reload the model on SIGHUP (call from the main thread; not available on Windows)"""
+    if not hasattr(signal, 'SIGHUP'):
+        logger.info("SIGHUP is not available on this platform; use the admin endpoint to reload the model")
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: manager.request_reload())
+    logger.info("Send SIGHUP to reload the model")
+    return True
+
+
+def handle_admin_request(manager, method, path, body):
+    """
+    Serve a model admin request.
+
+    Returns:
+        tuple: (status, payload), or None if the path is not an admin endpoint
+    """
+    if path == '/admin/model' and method == 'GET':
+        return 200, manager.stats()
+    if path == '/admin/reload' and method == 'POST':
+        try:
+            model_path = json.loads(body).get('model_path') if body else None
+        except (ValueError, AttributeError) as e:
+            return 400, {'error': f"Invalid request: {e}"}
+        manager.request_reload(model_path)
+        return 202, {'status': 'reload requested', 'model_path': model_path or manager.model_path}
+    return None
+
+
+def serve_admin(manager, port=0):
+    """
+    Serve GET /admin/model and POST /admin/reload on localhost in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it)
+    """
+
+    class AdminRequestHandler(BaseHTTPRequestHandler):
+
+        def _handle(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_ADMIN_BODY_BYTES:
+                status, payload = 413, {'error': 'Request too large'}
+            else:
+                body = self.rfile.read(length) if length > 0 else b''
+                status, payload = handle_admin_request(manager, method, self.path, body) or (404, {'error': 'Not found'})
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} - {format % args}")
+
+    server = ThreadingHTTPServer((ADMIN_HOST, port), AdminRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='model-admin', daemon=True).start()
+    logger.info(f"Model admin endpoint listening on http://{ADMIN_HOST}:{server.server_address[1]}")
+    return server
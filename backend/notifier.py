@@ -0,0 +1,337 @@
+"""
+Notification Dispatcher
+
+Delivers new-post notifications to the Flask API (/api/notify-new-post),
+which broadcasts them to websocket clients. Posts are buffered and sent as a
+batch as soon as max_batch posts are waiting or the oldest has waited
+max_wait seconds, whichever comes first. Requests reuse one pooled
+keep-alive requests.Session with explicit timeouts, and larger payloads are
+gzip-compressed.
+
+With an outbox (see outbox.py) every notification is written to disk before
+it is buffered and acknowledged by post_id once the API has accepted it, so
+pending notifications survive restarts. Only max_buffer of them are held in
+the send buffer; the rest wait in the outbox and are read back as the buffer
+drains, so a long API outage never discards an undelivered notification.
+Failed sends are retried with exponential backoff, and after several consecutive failures a circuit
+breaker pauses delivery for a while instead of hammering an API that is down.
+"""
+
+import json
+import gzip
+import time
+import logging
+import threading
+from collections import deque
+from decimal import Decimal
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Default delivery parameters
+DEFAULT_MAX_BATCH = 50  # Posts per request
+DEFAULT_MAX_WAIT = 0.25  # Seconds the oldest buffered post may wait before a flush
+DEFAULT_CONNECT_TIMEOUT = 2.0  # Seconds to establish a connection
+DEFAULT_READ_TIMEOUT = 5.0  # Seconds to wait for the API's response
+DEFAULT_COMPRESS_MIN_BYTES = 2048  # Payloads at least this large are gzip-compressed
+DEFAULT_MAX_BUFFER = 10000  # Posts buffered in memory; beyond this they wait in the outbox (or, without one, the oldest are dropped)
+DEFAULT_RETRY_BACKOFF = 1.0  # Seconds before retrying a failed send, doubled up to MAX_RETRY_BACKOFF
+MAX_RETRY_BACKOFF = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5  # Consecutive failed sends that open the circuit breaker
+DEFAULT_RESET_TIMEOUT = 60.0  # Seconds the circuit stays open before a trial send
+
+# Outcomes of a send
+SEND_OK = 'ok'
+SEND_REJECTED = 'rejected'  # The API refused the batch; retrying won't help
+SEND_RETRY = 'retry'
+
+
+def to_serializable(post):
+    """Convert Decimal values so the post can be JSON-encoded"""
+    return {key: float(value) if isinstance(value, Decimal) else value for key, value in post.items()}
+
+
+class NotificationDispatcher:
+    """
+    Size- or time-triggered batching notifier.
+
+    Args:
+        endpoint: URL of the notify-new-post endpoint
+        max_batch: Posts per request
+        max_wait: Seconds the oldest post may wait before its batch is sent
+        timeout: (connect, read) timeout in seconds for each request
+        compress_min_bytes: Gzip payloads at least this large (None disables compression)
+        max_buffer: Maximum posts buffered while deliveries fail
+        outbox: Optional NotificationOutbox making pending notifications durable
+        failure_threshold: Consecutive failures that open the circuit breaker
+        reset_timeout: Seconds the circuit stays open before a trial send
+    """
+
+    def __init__(self, endpoint, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES, max_buffer=DEFAULT_MAX_BUFFER, outbox=None,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.compress_min_bytes = compress_min_bytes
+        self.max_buffer = max_buffer
+        self.outbox = outbox
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        # One pooled keep-alive session for every request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._buffer = deque()  # (post, enqueued_at)
+        self._in_flight_ids = set()  # post_ids of the batch being sent
+        self._spilled = False  # Pending posts are in the outbox but not in the buffer
+        self._condition = threading.Condition()
+        self._flush_requested = False
+        self._sending = 0
+        self._retry_at = 0.0
+        self._backoff = DEFAULT_RETRY_BACKOFF
+        self._consecutive_failures = 0
+        self._circuit_open = False
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.sent = 0
+        self.requests_sent = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_latency = 0.0  # Seconds from enqueue to delivery of the last batch's oldest post
+
+    def start(self):
+        """Start the background delivery thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+            # Resend whatever the outbox still holds from a previous run
+            if self.outbox is not None:
+                self._refill_from_outbox()
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Started notification dispatcher (batch {self.max_batch}, max wait {self.max_wait}s)")
+
+    def stop(self, timeout=10.0):
+        """Try to deliver what is buffered, then stop the delivery thread"""
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.session.close()
+        if self.outbox is not None:
+            self.outbox.close()
+
+    def submit(self, post):
+        """Buffer a post for delivery (recording it in the outbox first, if there is one)"""
+        post = to_serializable(post)
+        if self.outbox is not None:
+            self.outbox.append(post['post_id'], post)
+        with self._condition:
+            if self._spilled:
+                # Older notifications are waiting in the outbox; this one is read back after them
+                return
+            self._buffer.append((post, time.monotonic()))
+            self._trim_buffer()
+            if len(self._buffer) == 1 or len(self._buffer) >= self.max_batch:
+                self._condition.notify_all()
+
+    def _trim_buffer(self):
+        """Keep at most max_buffer posts in memory (call with the condition held)"""
+        if len(self._buffer) <= self.max_buffer:
+            return
+        if self.outbox is not None:
+            # The newest posts stay in the outbox only, and are read back once the buffer drains
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.pop()
+            if not self._spilled:
+                logger.warning(f"Notification buffer full; holding further notifications in the outbox")
+            self._spilled = True
+            return
+
+        dropped = 0
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            dropped += 1
+        self.dropped += dropped
+        logger.warning(f"Notification buffer full; dropped {dropped} oldest notifications")
+
+    def _refill_from_outbox(self):
+        """Buffer the oldest outbox notifications not buffered or being sent (call with the condition held)"""
+        buffered = {post['post_id'] for post, _ in self._buffer} | self._in_flight_ids
+        now = time.monotonic()
+        self._spilled = False
+        for post_id, post in self.outbox.pending():
+            if post_id in buffered:
+                continue
+            if len(self._buffer) >= self.max_buffer:
+                self._spilled = True
+                break
+            self._buffer.append((post, now))
+
+    def _acknowledge(self, posts):
+        """Remove finished posts from the outbox"""
+        if self.outbox is not None:
+            self.outbox.ack([post['post_id'] for post in posts])
+
+    def flush(self, timeout=None):
+        """Send everything buffered now and wait for it to be delivered"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._retry_at = 0.0
+            self._condition.notify_all()
+            while self._running and (self._buffer or self._sending):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            self._flush_requested = False
+            return not self._buffer
+
+    def oldest_age(self):
+        """Seconds the oldest buffered notification has been waiting (0 if none)"""
+        with self._condition:
+            return time.monotonic() - self._buffer[0][1] if self._buffer else 0.0
+
+    def stats(self):
+        """Return delivery counters and the oldest buffered notification's age"""
+        with self._condition:
+            return {
+                'buffered': len(self._buffer),
+                'oldest_age': round(time.monotonic() - self._buffer[0][1], 3) if self._buffer else 0.0,
+                'sent': self.sent,
+                'requests_sent': self.requests_sent,
+                'failures': self.failures,
+                'dropped': self.dropped,
+                'held_in_outbox': self._spilled,
+                'last_latency': round(self.last_latency, 3),
+                'circuit_open': self._circuit_open
+            }
+
+    def _next_batch(self):
+        """Wait until a batch is full, old enough, or a flush was requested"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if not self._running and not self._buffer:
+                    return None
+                if self._buffer and now >= self._retry_at:
+                    oldest_age = now - self._buffer[0][1]
+                    if (len(self._buffer) >= self.max_batch or oldest_age >= self.max_wait
+                            or self._flush_requested or not self._running):
+                        break
+                    wait = self.max_wait - oldest_age
+                elif self._buffer:
+                    if not self._running:
+                        return None
+                    wait = self._retry_at - now
+                else:
+                    wait = None
+                self._condition.wait(wait)
+
+            batch = [self._buffer.popleft() for _ in range(min(self.max_batch, len(self._buffer)))]
+            self._in_flight_ids = {post['post_id'] for post, _ in batch if 'post_id' in post}
+            self._sending += 1
+            return batch
+
+    def _run(self):
+        """Background loop that sends batches as they become ready"""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            posts = [post for post, _ in batch]
+            try:
+                outcome = self._send(posts)
+            except Exception as e:
+                logger.error(f"Unexpected error sending notifications: {e}")
+                outcome = SEND_RETRY
+
+            if outcome != SEND_RETRY:
+                try:
+                    self._acknowledge(posts)
+                except Exception as e:
+                    logger.error(f"Error acknowledging notifications in the outbox: {e}")
+
+            with self._condition:
+                self._sending -= 1
+                self._in_flight_ids = set()
+                if outcome == SEND_RETRY:
+                    self._record_failure(batch)
+                else:
+                    if self._spilled and len(self._buffer) <= self.max_buffer // 2:
+                        try:
+                            self._refill_from_outbox()
+                        except Exception as e:
+                            logger.error(f"Error reading notifications back from the outbox: {e}")
+                    if self._circuit_open:
+                        logger.info("Notification API is reachable again; closing circuit")
+                    self._circuit_open = False
+                    self._consecutive_failures = 0
+                    self._backoff = DEFAULT_RETRY_BACKOFF
+                    if outcome == SEND_OK:
+                        self.sent += len(batch)
+                        self.last_latency = time.monotonic() - batch[0][1]
+                    else:
+                        self.failures += 1
+                        self.dropped += len(batch)
+                self._condition.notify_all()
+
+    def _record_failure(self, batch):
+        """Requeue a failed batch and schedule the retry (call with the condition held)"""
+        # Put the posts back in front, in order
+        self.failures += 1
+        self._consecutive_failures += 1
+        self._buffer.extendleft(reversed(batch))
+        self._trim_buffer()
+
+        if self._consecutive_failures >= self.failure_threshold:
+            # Circuit breaker: stop sending for a while, then try a single batch
+            if not self._circuit_open:
+                logger.warning(f"Notification API failed {self._consecutive_failures} times in a row; "
+                               f"pausing delivery for {self.reset_timeout:.0f}s")
+            self._circuit_open = True
+            self._retry_at = time.monotonic() + self.reset_timeout
+        else:
+            self._retry_at = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, MAX_RETRY_BACKOFF)
+
+    def _send(self, posts):
+        """POST one batch; returns SEND_OK, SEND_REJECTED or SEND_RETRY"""
+        body = json.dumps({'posts': posts}).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.compress_min_bytes is not None and len(body) >= self.compress_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        with self._condition:
+            self.requests_sent += 1
+
+        try:
+            response = self.session.post(self.endpoint, data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"Error sending notifications to API: {e}")
+            return SEND_RETRY
+
+        if response.status_code == 200:
+            logger.info(f"Successfully notified API about {len(posts)} new posts")
+            return SEND_OK
+
+        logger.warning(f"Failed to notify API: {response.status_code} - {response.text}")
+        # Client errors won't succeed on retry
+        return SEND_REJECTED if 400 <= response.status_code < 500 and response.status_code != 429 else SEND_RETRY
@@ -0,0 +1,187 @@
+"""
+Notification Outbox
+
+Disk-backed log of notifications that have not been delivered yet, so
+pending broadcasts survive a crash or restart (at-least-once delivery).
+
+Notifications are appended as JSON lines to numbered segment files in the
+outbox directory, and acknowledgements (by post_id) are appended to the same
+log. On startup every segment is replayed to rebuild the pending set.
+Rotated segments are deleted oldest first once every notification in them
+has been acknowledged; deleting only from the front keeps the ack records for
+any older, still-pending notifications on disk.
+
+Only one process may use an outbox directory at a time: a second instance
+would replay the log and delete segments the first is still appending to,
+so the directory is locked while an outbox is open (where fcntl exists).
+"""
+
+import os
+import json
+import glob
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Default outbox parameters
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024  # Rotate the active segment after 4 MB
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+LOCK_FILE = 'outbox.lock'
+
+
+class NotificationOutbox:
+    """
+    Segment-log outbox keyed by post_id.
+
+    Args:
+        directory: Directory holding the segment files
+        segment_bytes: Rotate the active segment once it reaches this size
+        fsync: fsync after every write (survives power loss, not just process crashes)
+    """
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_directory_lock()
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # post_id -> (segment number, post)
+        self._segment_counts = {}  # segment number -> pending notifications in it
+        self._active_number = 0
+        self._active_file = None
+
+        self._recover()
+
+    def _acquire_directory_lock(self):
+        """Lock the directory against other processes, or raise if one already has it"""
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"Notification outbox {self.directory} is already open in another process")
+        return lock_file
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self):
+        numbers = []
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+            name = os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            if name.isdigit():
+                numbers.append(int(name))
+        return sorted(numbers)
+
+    def _recover(self):
+        """Replay every segment to rebuild the pending set"""
+        numbers = self._segment_numbers()
+        for number in numbers:
+            self._segment_counts.setdefault(number, 0)
+            with open(self._segment_path(number), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a partial last line; skip it
+                        logger.warning(f"Skipping malformed outbox record in segment {number}")
+                        continue
+                    if 'post' in record:
+                        self._track(record['id'], number, record['post'])
+                    else:
+                        for post_id in record.get('ack', []):
+                            self._untrack(post_id)
+
+        # Keep appending after the newest segment, and drop what is fully acknowledged
+        self._active_number = (numbers[-1] + 1) if numbers else 1
+        self._segment_counts[self._active_number] = 0
+        self._active_file = open(self._segment_path(self._active_number), 'a', encoding='utf-8')
+        self._remove_acknowledged_segments()
+
+        if self._pending:
+            logger.info(f"Recovered {len(self._pending)} pending notifications from {self.directory}")
+
+    def _track(self, post_id, number, post):
+        self._untrack(post_id)
+        self._pending[post_id] = (number, post)
+        self._segment_counts[number] = self._segment_counts.get(number, 0) + 1
+
+    def _untrack(self, post_id):
+        entry = self._pending.pop(post_id, None)
+        if entry is not None:
+            self._segment_counts[entry[0]] -= 1
+        return entry
+
+    def _remove_acknowledged_segments(self):
+        """Delete the oldest rotated segments while they have nothing pending"""
+        for number in sorted(self._segment_counts):
+            if number == self._active_number or self._segment_counts[number] > 0:
+                break
+            del self._segment_counts[number]
+            try:
+                os.remove(self._segment_path(number))
+            except FileNotFoundError:
+                pass
+
+    def _write(self, record):
+        self._active_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._active_file.flush()
+        if self.fsync:
+            os.fsync(self._active_file.fileno())
+
+    def _maybe_rotate(self):
+        if self._active_file.tell() < self.segment_bytes:
+            return
+        self._active_file.close()
+        self._active_number += 1
+        self._segment_counts[self._active_number] = 0
+        self._active_file = open(self._segment_path(self._active_number), 'a', encoding='utf-8')
+        self._remove_acknowledged_segments()
+
+    def append(self, post_id, post):
+        """Durably record a notification before it is sent"""
+        with self._lock:
+            self._write({'id': post_id, 'post': post})
+            self._track(post_id, self._active_number, post)
+            self._maybe_rotate()
+
+    def ack(self, post_ids):
+        """Record that notifications were delivered (or given up on)"""
+        with self._lock:
+            post_ids = [post_id for post_id in post_ids if post_id in self._pending]
+            if not post_ids:
+                return
+            self._write({'ack': post_ids})
+            for post_id in post_ids:
+                self._untrack(post_id)
+            self._remove_acknowledged_segments()
+            self._maybe_rotate()
+
+    def pending(self):
+        """Return pending notifications, oldest first, as (post_id, post)"""
+        with self._lock:
+            return [(post_id, post) for post_id, (_, post) in self._pending.items()]
+
+    def stats(self):
+        """Return pending count and segments on disk"""
+        with self._lock:
+            return {'pending': len(self._pending), 'segments': len(self._segment_counts)}
+
+    def close(self):
+        """Close the active segment and release the directory"""
+        with self._lock:
+            if self._active_file and not self._active_file.closed:
+                self._active_file.close()
+            if not self._lock_file.closed:
+                self._lock_file.close()
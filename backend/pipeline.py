@@ -0,0 +1,161 @@
+"""
+Staged Ingestion Pipeline
+
+Small thread-based pipeline used by the ingestors. Each stage has its own
+bounded input queue and worker threads, so fetching, classification and
+storage overlap. When a stage falls behind its queue fills up and the
+stages feeding it block on put(), which pushes backpressure upstream.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default pipeline parameters
+DEFAULT_QUEUE_SIZE = 200  # Items buffered in front of each stage
+DEFAULT_BATCH_TIMEOUT = 0.05  # Seconds a batched stage waits to fill a batch
+
+# Sentinel placed on a queue to stop one worker
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    func is called with a single item, or with a list of up to batch_size
+    items when batch_size > 1. It returns an iterable of items to pass to the
+    next stage (or None to pass nothing on).
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=DEFAULT_QUEUE_SIZE, batch_size=1,
+                 batch_timeout=DEFAULT_BATCH_TIMEOUT):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        # Statistics
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    def stats(self):
+        """Return a snapshot of this stage's counters"""
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'queued': self.queue.qsize(),
+                'processed': self.processed,
+                'errors': self.errors,
+                'busy_seconds': round(self.busy_time, 2)
+            }
+
+
+class Pipeline:
+    """A chain of stages connected by bounded queues"""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self._threads = []
+
+    def start(self):
+        """Start worker threads for every stage"""
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, next_stage),
+                    name=f"{stage.name}-{worker}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        logger.info("Started pipeline: " + " -> ".join(f"{s.name}({s.workers})" for s in self.stages))
+
+    def submit(self, item):
+        """Feed an item to the first stage, blocking while that stage is full"""
+        self.stages[0].queue.put(item)
+
+    def join(self):
+        """Block until every submitted item has passed through all stages"""
+        # Stages forward their output before marking input done, so joining
+        # the queues in order waits for the whole pipeline to drain
+        for stage in self.stages:
+            stage.queue.join()
+
+    def stop(self):
+        """Drain the pipeline and stop all worker threads"""
+        self.join()
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """Return counters for every stage, keyed by stage name"""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def _collect_batch(self, stage, first):
+        """Gather up to batch_size items, waiting at most batch_timeout after the first"""
+        batch = [first]
+        deadline = time.monotonic() + stage.batch_timeout
+        while len(batch) < stage.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = stage.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Put it back for this worker's next loop and finish the batch
+                stage.queue.task_done()
+                stage.queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self, stage, next_stage):
+        """Worker loop: take items, run the stage function, forward results"""
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                stage.queue.task_done()
+                return
+
+            if stage.batch_size > 1:
+                items = self._collect_batch(stage, item)
+                argument = items
+            else:
+                items = [item]
+                argument = item
+
+            started = time.monotonic()
+            try:
+                outputs = stage.func(argument)
+                if outputs and next_stage is not None:
+                    for output in outputs:
+                        next_stage.queue.put(output)
+                failed = False
+            except Exception as e:
+                logger.error(f"Error in pipeline stage '{stage.name}': {e}")
+                failed = True
+
+            with stage._stats_lock:
+                stage.busy_time += time.monotonic() - started
+                stage.processed += len(items)
+                if failed:
+                    stage.errors += 1
+
+            for _ in items:
+                stage.queue.task_done()
@@ -0,0 +1,203 @@
+"""
+Prediction Cache
+
+Bounded LRU cache of classifier results keyed by a hash of the cleaned post
+text. Reposts, quote-posts and bot accounts produce many posts with the same
+clean_text, and each cache hit skips a RoBERTa forward pass.
+
+Every entry is tagged with the model version that produced it; after the
+model changes (set_model_version), entries from the old model no longer hit
+and are replaced as texts come in again. The cache can be saved to and
+loaded from a JSON file so it survives restarts.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from atomic_file import atomic_write_json
+from model_bundle import read_manifest
+
+logger = logging.getLogger(__name__)
+
+# Default cache parameters
+DEFAULT_MAX_ENTRIES = 100000  # Cached predictions kept before the least recently used is evicted
+DERIVED_SUFFIXES = ('.onnx', '.tmp')  # Files in a checkpoint directory that don't change the model
+
+
+def text_key(text):
+    """Hash of the normalized text used as the cache key"""
+    normalized = ' '.join((text or '').split()).lower()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def model_version(model_path, backend=''):
+    """
+    Fingerprint a model checkpoint directory.
+
+    Hashes the names, sizes and modification times of the checkpoint's
+    files, plus the inference backend, so retraining or replacing the
+    checkpoint gives a new version. Files derived from the weights (ONNX
+    exports, temporary files) are left out, so writing one doesn't look
+    like a new model. Model bundles use the version fixed
+    at export time instead, so copying a bundle keeps its cache valid.
+    """
+    digest = hashlib.blake2b(backend.encode('utf-8'), digest_size=8)
+    manifest = read_manifest(model_path)
+    if manifest is not None:
+        digest.update(manifest['model_version'].encode('utf-8'))
+    elif os.path.isdir(model_path):
+        for name in sorted(os.listdir(model_path)):
+            path = os.path.join(model_path, name)
+            if not os.path.isfile(path) or name.endswith(DERIVED_SUFFIXES):
+                continue
+            stat = os.stat(path)
+            digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}".encode('utf-8'))
+    else:
+        digest.update(model_path.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of text hash -> (label, confidence), tagged with the model version.
+
+    Args:
+        model_version: Version of the model whose predictions are cached
+        max_entries: Entries kept before the least recently used is evicted
+        path: Optional JSON file used by load() and save()
+    """
+
+    def __init__(self, model_version='', max_entries=DEFAULT_MAX_ENTRIES, path=None):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # key -> (label, confidence, model_version)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def set_model_version(self, version):
+        """Switch to a new model; entries from other versions stop hitting"""
+        with self._lock:
+            if version != self.model_version:
+                logger.info(f"Prediction cache now serving model version {version}")
+            self.model_version = version
+
+    def get(self, text):
+        """Return the cached (label, confidence) for text, or None"""
+        key = text_key(text)
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[2] != self.model_version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, text, result):
+        """Cache the (label, confidence) predicted for text"""
+        with self._lock:
+            self._put(text_key(text), result)
+
+    def _put(self, key, result):
+        label, confidence = result
+        # ("unknown", 0.0) is what a failed prediction returns; don't keep it
+        if confidence <= 0.0:
+            return
+        self._entries[key] = (label, confidence, self.model_version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def predict(self, texts, predict_fn):
+        """
+        Classify texts, running predict_fn only on texts not in the cache.
+
+        Identical texts in the same call are classified once.
+
+        Args:
+            texts: List of cleaned texts
+            predict_fn: Function mapping a list of texts to (label, confidence) tuples
+
+        Returns:
+            list: (label, confidence) tuples in the same order as texts
+        """
+        keys = [text_key(text) for text in texts]
+        results = [None] * len(texts)
+        missing = OrderedDict()  # key -> indices of texts with that key
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key in missing:
+                    # Same text earlier in this call; it rides along with that prediction
+                    missing[key].append(index)
+                    self.hits += 1
+                    continue
+                cached = self._get(key)
+                if cached is None:
+                    missing[key] = [index]
+                else:
+                    results[index] = cached
+
+        if missing:
+            predictions = predict_fn([texts[indices[0]] for indices in missing.values()])
+            with self._lock:
+                for (key, indices), prediction in zip(missing.items(), predictions):
+                    self._put(key, prediction)
+                    for index in indices:
+                        results[index] = prediction
+        return results
+
+    def load(self):
+        """Load entries for the current model version from path (missing or stale files are ignored)"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load prediction cache from {self.path}: {e}")
+            return 0
+
+        loaded = 0
+        with self._lock:
+            for key, label, confidence, version in data.get('entries', []):
+                if version == self.model_version:
+                    self._entries[key] = (label, confidence, version)
+                    loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {loaded} cached predictions from {self.path}")
+        return loaded
+
+    def save(self):
+        """Write the current model version's entries to path, least recently used first"""
+        if not self.path or not self._entries:
+            return
+        with self._lock:
+            entries = [[key, label, confidence, version]
+                       for key, (label, confidence, version) in self._entries.items()
+                       if version == self.model_version]
+        atomic_write_json(self.path, {'model_version': self.model_version, 'entries': entries})
+        logger.info(f"Saved {len(entries)} cached predictions to {self.path}")
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
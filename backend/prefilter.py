@@ -0,0 +1,260 @@
+"""
+Prefilter Cascade
+
+Cheap screening stage in front of the RoBERTa classifier. Most posts that
+reach classification score far below the database threshold and are thrown
+away, so a post only goes on to the transformer if:
+
+- an Aho-Corasick matcher finds one of the high-signal alert phrases in its
+  cleaned text ("evacuation order", "death toll", ...), or
+- a hashed word n-gram logistic regression (trained by train.py with
+  TRAIN_MODE=prefilter) scores it at or above the threshold for the
+  configured recall target.
+
+Everything else is rejected without running the transformer. The model file
+stores quantiles of the scores of disaster posts in the validation set, so the
+threshold for any recall target can be picked at load time. Without a model
+file only the phrase matcher runs and no post is rejected.
+"""
+
+import os
+import json
+import math
+import zlib
+import logging
+import threading
+from collections import deque
+
+from atomic_file import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Default parameters
+DEFAULT_N_FEATURES = 2 ** 18  # Hash buckets for n-gram features
+DEFAULT_NGRAM = 2  # Word n-grams up to this length
+DEFAULT_RECALL_TARGET = 0.99  # Fraction of disaster posts the model must let through
+QUANTILE_STEP = 0.001  # Spacing of the stored positive-score quantiles
+MAX_QUANTILE = 0.2  # Stored quantiles cover recall targets from 0.8 to 1.0
+
+# Phrases that always send a post on to the classifier (matched on clean_text, whole words)
+DEFAULT_ALERT_PHRASES = (
+    "evacuation order", "evacuation warning", "evacuate now", "shelter in place", "state of emergency",
+    "death toll", "confirmed dead", "magnitude", "aftershock", "epicenter", "tsunami warning",
+    "tornado warning", "tornado emergency", "hurricane warning", "flash flood", "flood warning",
+    "storm surge", "landfall", "red flag warning", "lava flow", "volcanic ash", "mudslide",
+    "search and rescue", "trapped under rubble", "avalanche warning", "blizzard warning",
+    "dust storm", "bushfire", "forest fire", "wildfire"
+)
+
+
+class AhoCorasickMatcher:
+    """
+    Multi-phrase matcher that scans a text once regardless of the number of phrases.
+
+    Args:
+        phrases: Lowercase phrases to find (matched on whole-word boundaries)
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for phrase in phrases:
+            phrase = phrase.lower()
+            state = 0
+            for char in phrase:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(phrase)
+
+        # Breadth-first pass to build the failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return the phrases that occur in text as whole words"""
+        found = set()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for phrase in self._output[state]:
+                start = position - len(phrase) + 1
+                end = position + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    found.add(phrase)
+        return found
+
+
+def hashed_features(text, n_features=DEFAULT_N_FEATURES, ngram=DEFAULT_NGRAM):
+    """
+    Map a cleaned text to the set of hash buckets of its word n-grams.
+
+    Uses crc32 rather than hash() so training and serving agree across processes.
+    """
+    tokens = text.split()
+    features = set()
+    for size in range(1, ngram + 1):
+        for start in range(len(tokens) - size + 1):
+            gram = ' '.join(tokens[start:start + size])
+            features.add(zlib.crc32(gram.encode('utf-8')) % n_features)
+    return features
+
+
+class HashedNgramModel:
+    """
+    Logistic regression over hashed binary n-gram features.
+
+    Args:
+        weights: Mapping of feature index -> weight (zero weights omitted)
+        bias: Intercept
+        n_features: Hash buckets
+        ngram: Longest word n-gram
+        quantiles: Scores of validation disaster posts at fractions 0, QUANTILE_STEP, ... MAX_QUANTILE
+    """
+
+    def __init__(self, weights, bias, n_features=DEFAULT_N_FEATURES, ngram=DEFAULT_NGRAM, quantiles=None):
+        self.weights = weights
+        self.bias = bias
+        self.n_features = n_features
+        self.ngram = ngram
+        self.quantiles = quantiles or []
+
+    def score(self, text):
+        """Probability that the text is a disaster post"""
+        logit = self.bias + sum(self.weights.get(index, 0.0)
+                                for index in hashed_features(text, self.n_features, self.ngram))
+        if logit < -35:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-logit))
+
+    def threshold_for_recall(self, recall_target):
+        """Highest score threshold that keeps recall_target of validation disaster posts"""
+        if not self.quantiles:
+            return 0.0
+        index = int(round((1.0 - recall_target) / QUANTILE_STEP))
+        return self.quantiles[max(0, min(index, len(self.quantiles) - 1))]
+
+    def save(self, path, metadata=None):
+        """Write the model to a JSON file"""
+        atomic_write_json(path, {
+            'n_features': self.n_features,
+            'ngram': self.ngram,
+            'bias': self.bias,
+            'weights': {str(index): round(weight, 6) for index, weight in self.weights.items()},
+            'quantile_step': QUANTILE_STEP,
+            'positive_score_quantiles': self.quantiles,
+            'metadata': metadata or {}
+        })
+
+    @classmethod
+    def load(cls, path):
+        """Load a model written by save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            weights={int(index): weight for index, weight in data['weights'].items()},
+            bias=data['bias'],
+            n_features=data['n_features'],
+            ngram=data['ngram'],
+            quantiles=data.get('positive_score_quantiles')
+        )
+
+
+def positive_score_quantiles(scores):
+    """Quantiles of disaster-post scores at fractions 0, QUANTILE_STEP, ... MAX_QUANTILE"""
+    scores = sorted(scores)
+    if not scores:
+        return []
+    steps = int(round(MAX_QUANTILE / QUANTILE_STEP))
+    return [scores[min(len(scores) - 1, int(step * QUANTILE_STEP * len(scores)))] for step in range(steps + 1)]
+
+
+class PrefilterCascade:
+    """
+    Decides which posts are worth a transformer forward pass.
+
+    Args:
+        model: HashedNgramModel, or None to run only the phrase matcher
+        phrases: Alert phrases that always pass
+        recall_target: Fraction of disaster posts the model must let through
+    """
+
+    def __init__(self, model=None, phrases=DEFAULT_ALERT_PHRASES, recall_target=DEFAULT_RECALL_TARGET):
+        self.model = model
+        self.matcher = AhoCorasickMatcher(phrases)
+        self.recall_target = recall_target
+        self.threshold = model.threshold_for_recall(recall_target) if model else 0.0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.screened = 0
+        self.passed_by_phrase = 0
+        self.passed_by_model = 0
+        self.rejected = 0
+
+    def screen(self, texts):
+        """
+        Screen cleaned texts.
+
+        Returns:
+            list: True for each text that should go on to the classifier
+        """
+        decisions = []
+        by_phrase = by_model = rejected = 0
+        for text in texts:
+            if self.matcher.find(text):
+                by_phrase += 1
+                decisions.append(True)
+            elif self.model is None or self.model.score(text) >= self.threshold:
+                by_model += 1
+                decisions.append(True)
+            else:
+                rejected += 1
+                decisions.append(False)
+
+        with self._lock:
+            self.screened += len(texts)
+            self.passed_by_phrase += by_phrase
+            self.passed_by_model += by_model
+            self.rejected += rejected
+        return decisions
+
+    def stats(self):
+        """Return how many posts were screened, passed and kept away from the transformer"""
+        with self._lock:
+            return {
+                'screened': self.screened,
+                'passed_by_phrase': self.passed_by_phrase,
+                'passed_by_model': self.passed_by_model,
+                'rejected': self.rejected,
+                'transformer_calls_saved': round(self.rejected / self.screened, 3) if self.screened else 0.0,
+                'recall_target': self.recall_target,
+                'threshold': round(self.threshold, 4)
+            }
+
+
+def create_prefilter(model_path, recall_target=DEFAULT_RECALL_TARGET):
+    """Build the cascade, loading the n-gram model from model_path if it exists"""
+    model = None
+    if model_path and os.path.exists(model_path):
+        model = HashedNgramModel.load(model_path)
+        logger.info(f"Loaded prefilter model from {model_path} "
+                    f"(threshold {model.threshold_for_recall(recall_target):.4f} for recall {recall_target})")
+    else:
+        logger.info("No prefilter model found; only alert phrases are matched and no posts are rejected")
+    return PrefilterCascade(model, recall_target=recall_target)
@@ -0,0 +1,167 @@
+"""
+Search Query Planner
+
+Combines the disaster keywords into a few OR queries so one search request
+covers several keywords. Keywords that overlap (one contains the other, like
+"fire" and "wildfire") are placed in the same group, since their result sets
+overlap the most. Posts returned by a group query are attributed back to the
+individual keywords by matching the text locally.
+
+The planner also counts how many keyword hits each group fetched once that
+separate per-keyword queries would have fetched again, and how many requests
+that would have cost.
+
+Grouping is opt-in (QUERY_GROUP_SIZE > 1): it relies on the search endpoint
+treating the operator as a boolean OR. If it matched the operator literally
+or as an implicit AND, every grouped keyword would silently lose recall, so
+check that a grouped query returns the union of its keywords' results
+before turning it on.
+"""
+
+import re
+import math
+import threading
+from collections import namedtuple
+
+# Default planning parameters
+DEFAULT_GROUP_SIZE = 1  # Keywords combined into one search query (1 = one query per keyword)
+DEFAULT_OPERATOR = 'OR'  # Boolean operator understood by the search endpoint
+
+# One search query covering several keywords; key names the group's checkpoint
+QueryGroup = namedtuple('QueryGroup', ['key', 'query', 'keywords'])
+
+
+def _overlap_clusters(keywords):
+    """Cluster keywords where one contains the other, keeping first-seen order"""
+    clusters = []
+    for keyword in keywords:
+        lowered = keyword.lower()
+        for cluster in clusters:
+            if any(lowered in other.lower() or other.lower() in lowered for other in cluster):
+                cluster.append(keyword)
+                break
+        else:
+            clusters.append([keyword])
+    return clusters
+
+
+def plan_query_groups(keywords, group_size=DEFAULT_GROUP_SIZE, operator=DEFAULT_OPERATOR):
+    """
+    Group keywords into combined queries.
+
+    Overlapping keywords are kept together, and clusters are packed first-fit
+    into groups of at most group_size keywords. A group of one keyword uses the
+    keyword itself as its query and key, so group_size=1 reproduces one query
+    per keyword.
+
+    Returns:
+        list: QueryGroup for each combined query
+    """
+    group_size = max(1, group_size)
+    packed = []
+    for cluster in _overlap_clusters(keywords):
+        # Clusters larger than a group are split
+        for start in range(0, len(cluster), group_size):
+            chunk = cluster[start:start + group_size]
+            for group in packed:
+                if len(group) + len(chunk) <= group_size:
+                    group.extend(chunk)
+                    break
+            else:
+                packed.append(list(chunk))
+
+    groups = []
+    for group_keywords in packed:
+        query = f" {operator} ".join(group_keywords)
+        groups.append(QueryGroup(key=query, query=query, keywords=tuple(group_keywords)))
+    return groups
+
+
+class QueryPlanner:
+    """
+    Query groups plus local keyword attribution and savings accounting.
+
+    Args:
+        keywords: Keywords to search for
+        group_size: Maximum keywords per query
+        operator: Boolean operator joining keywords in a query
+        page_size: Results per search page, used to estimate per-keyword requests
+    """
+
+    def __init__(self, keywords, group_size=DEFAULT_GROUP_SIZE, operator=DEFAULT_OPERATOR, page_size=100):
+        self.keywords = list(keywords)
+        self.page_size = page_size
+        self.groups = plan_query_groups(self.keywords, group_size, operator)
+
+        # Whole-word prefix match, so "flood" also attributes "flooding" and "floods"
+        self._patterns = {
+            group.key: [(keyword, re.compile(r'\b' + re.escape(keyword.lower()) + r'\w*')) for keyword in group.keywords]
+            for group in self.groups
+        }
+
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.requests = 0
+        self.posts_fetched = 0
+        self.keyword_hits = 0
+        self.estimated_keyword_requests = 0
+
+    def attribute(self, group, text):
+        """
+        Find which of a group's keywords a post matches.
+
+        Returns:
+            list: Matching keywords, or [group.key] if none matches locally
+            (the search backend also matches on stems and alt text)
+        """
+        lowered = (text or '').lower()
+        matched = [keyword for keyword, pattern in self._patterns[group.key] if pattern.search(lowered)]
+        return matched or [group.key]
+
+    def record_fetch(self, group, keyword_lists, pages):
+        """
+        Account for one group search.
+
+        Args:
+            group: QueryGroup that was searched
+            keyword_lists: Attributed keywords for each fetched post
+            pages: Requests the search took
+        """
+        per_keyword = {}
+        for keywords in keyword_lists:
+            for keyword in keywords:
+                per_keyword[keyword] = per_keyword.get(keyword, 0) + 1
+
+        # Separate queries would take at least one request per keyword, plus paging
+        estimated = sum(max(1, math.ceil(per_keyword.get(keyword, 0) / self.page_size))
+                        for keyword in group.keywords)
+
+        with self._lock:
+            self.requests += pages
+            self.posts_fetched += len(keyword_lists)
+            self.keyword_hits += sum(per_keyword.values())
+            self.estimated_keyword_requests += estimated
+
+    def report(self, reset=True):
+        """
+        Summarize what grouping saved since the last report.
+
+        Returns:
+            dict: Requests made vs. estimated for per-keyword queries, and the
+            keyword hits that would have been fetched more than once
+        """
+        with self._lock:
+            summary = {
+                'groups': len(self.groups),
+                'keywords': len(self.keywords),
+                'requests': self.requests,
+                'estimated_keyword_requests': self.estimated_keyword_requests,
+                'requests_saved': max(0, self.estimated_keyword_requests - self.requests),
+                'posts_fetched': self.posts_fetched,
+                'duplicate_hits_saved': max(0, self.keyword_hits - self.posts_fetched)
+            }
+            if reset:
+                self._reset_counters()
+            return summary
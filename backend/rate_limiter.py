@@ -0,0 +1,321 @@
+"""
+Rate Limiter
+
+Token bucket shared by every Bluesky API call (search, session checks,
+profile lookups). Tokens refill continuously at limit / window per second,
+and callers can block until a token is available. Waiting callers are served
+in priority order (then first come, first served), so a session check is
+never starved by a backlog of searches.
+
+The bucket follows the server: the ratelimit-limit / ratelimit-policy
+headers set the budget, ratelimit-remaining caps the local token count (less
+a small reserve), and when the server says the window is used up, or answers
+429, nobody is let through until ratelimit-reset. This lets the ingestors use
+nearly the whole budget without tripping 429s.
+
+Only responses from the endpoints that share the bucket's budget adjust it.
+Other endpoints carry their own, much smaller policies (createSession allows
+30 calls per 5 minutes); their headers are kept per endpoint for the stats
+and never shrink the shared bucket.
+"""
+
+import re
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Caller priorities (lower is served first)
+PRIORITY_HIGH = 0  # Session checks and logins
+PRIORITY_NORMAL = 1  # Searches
+PRIORITY_LOW = 2  # Hydration and other background calls
+
+# Default parameters
+DEFAULT_RESERVE = 5  # Requests of the server's remaining budget never used
+DEFAULT_RATE_LIMITED_WAIT = 30.0  # Seconds to pause after a 429 that carried no reset time
+LOW_TOKENS_WARNING = 0.2  # Warn when the bucket drops below this fraction
+
+
+def _header_value(headers, name):
+    """Case-insensitive header lookup that tolerates missing or odd header containers"""
+    if not headers:
+        return None
+    try:
+        items = headers.items()
+    except AttributeError:
+        return None
+    for key, value in items:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _header_number(headers, name):
+    value = _header_value(headers, name)
+    if value is None:
+        return None
+    try:
+        return float(str(value).split(';')[0].strip())
+    except ValueError:
+        return None
+
+
+def _policy_window(headers):
+    """Window in seconds from a ratelimit-policy header such as '3000;w=300', or None"""
+    policy = _header_value(headers, 'ratelimit-policy')
+    match = re.search(r'w=(\d+)', str(policy)) if policy else None
+    return float(match.group(1)) if match else None
+
+
+def endpoint_from_url(url):
+    """XRPC method name (e.g. app.bsky.feed.searchPosts) from a request URL, or None"""
+    if not url:
+        return None
+    match = re.search(r'/xrpc/([^/?#]+)', str(url))
+    return match.group(1) if match else None
+
+
+class RateLimiter:
+    """
+    Continuously refilling, priority-fair token bucket that learns from response headers.
+
+    Args:
+        limit: Requests allowed per window
+        window: Window length in seconds
+        reserve: Requests of the server's remaining budget kept unused
+        endpoints: XRPC methods whose ratelimit headers describe this bucket's budget
+            (None to follow every response)
+    """
+
+    def __init__(self, limit, window, reserve=DEFAULT_RESERVE, endpoints=None):
+        self.limit = float(limit)
+        self.window = float(window)
+        self.reserve = reserve
+        self.endpoints = frozenset(endpoints) if endpoints is not None else None
+        self.endpoint_limits = {}  # Latest headers of endpoints with their own policies
+
+        self._tokens = float(limit)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0  # Monotonic time before which nothing is let through
+        self._waiters = []  # Heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+        # Statistics
+        self.acquired = 0
+        self.waited = 0.0
+        self.rate_limited_responses = 0
+
+    @property
+    def rate(self):
+        """Tokens added per second"""
+        return self.limit / self.window
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.limit, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def _wait_time(self, now):
+        """Seconds until a token could be available"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _take(self):
+        self._tokens -= 1
+        self.acquired += 1
+        if self._tokens < self.limit * LOW_TOKENS_WARNING and self.acquired % 50 == 0:
+            logger.warning(f"API rate limit tokens running low: {int(self._tokens)}/{int(self.limit)}")
+
+    def try_acquire(self, priority=PRIORITY_NORMAL):
+        """
+        Take a token without waiting.
+
+        Returns:
+            bool: True if a token was taken
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            # Don't jump ahead of callers already waiting with the same or higher priority
+            if self._waiters and self._waiters[0][0] <= priority:
+                return False
+            if self._wait_time(now) > 0:
+                return False
+            self._take()
+            return True
+
+    def acquire(self, priority=PRIORITY_NORMAL, timeout=None):
+        """
+        Block until a token is available and take it.
+
+        Args:
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if a token was taken, False if the timeout expired
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        entry = (priority, next(self._sequence))
+
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(now)
+                    if self._waiters[0] == entry and wait <= 0:
+                        self._take()
+                        self.waited += now - started
+                        return True
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining) if wait > 0 else remaining
+                    # Not at the head: wait to be notified (or re-check after the refill interval)
+                    self._condition.wait(wait if wait > 0 else None)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def _governs(self, endpoint, limit, window):
+        """Whether headers from endpoint, with the given policy, describe this bucket"""
+        if self.endpoints is None:
+            return True
+        if endpoint is not None:
+            return endpoint in self.endpoints
+        # Endpoint unknown: only trust headers that carry this bucket's own policy
+        return (limit is None or limit == self.limit) and (window is None or window == self.window)
+
+    def observe(self, headers, status_code=None, endpoint=None):
+        """
+        Adjust the bucket from a response's ratelimit-* headers.
+
+        Args:
+            headers: Response headers (any mapping)
+            status_code: HTTP status of the response, if known
+            endpoint: XRPC method the response came from, if known
+        """
+        limit = _header_number(headers, 'ratelimit-limit')
+        remaining = _header_number(headers, 'ratelimit-remaining')
+        reset = _header_number(headers, 'ratelimit-reset')
+        window = _policy_window(headers)
+
+        with self._condition:
+            if not self._governs(endpoint, limit, window):
+                # A separate budget (e.g. createSession); record it, leave the shared bucket alone
+                if limit is not None or remaining is not None:
+                    self.endpoint_limits[endpoint or 'unknown'] = {
+                        'limit': limit, 'window': window, 'remaining': remaining, 'status': status_code
+                    }
+                return
+
+            now = time.monotonic()
+            self._refill(now)
+
+            if limit:
+                self.limit = limit
+            if window:
+                self.window = window
+
+            # ratelimit-reset is an epoch timestamp
+            reset_in = max(0.0, reset - time.time()) if reset is not None else None
+
+            if remaining is not None:
+                usable = max(0.0, remaining - self.reserve)
+                self._tokens = min(self._tokens, usable)
+                if usable < 1 and reset_in is not None:
+                    self._blocked_until = max(self._blocked_until, now + reset_in)
+
+            if status_code == 429:
+                self.rate_limited_responses += 1
+                self._tokens = 0.0
+                wait = reset_in if reset_in is not None else DEFAULT_RATE_LIMITED_WAIT
+                self._blocked_until = max(self._blocked_until, now + wait)
+                logger.warning(f"Rate limited by server; pausing API calls for {wait:.1f}s")
+
+            self._condition.notify_all()
+
+    def rate_limited(self, retry_after=None):
+        """
+        Record a rate-limit error whose headers were not seen.
+
+        Pauses every caller for retry_after seconds (or a default), unless a
+        pause learned from the server's headers is already in effect.
+        """
+        with self._condition:
+            now = time.monotonic()
+            if retry_after is None and self._blocked_until > now:
+                return
+            wait = retry_after if retry_after is not None else DEFAULT_RATE_LIMITED_WAIT
+            self._tokens = 0.0
+            self._blocked_until = max(self._blocked_until, now + wait)
+            self.rate_limited_responses += 1
+            logger.warning(f"Rate limit reported; pausing API calls for {wait:.1f}s")
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return the bucket's state and counters"""
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'tokens': round(self._tokens, 1),
+                'limit': self.limit,
+                'window': self.window,
+                'waiting': len(self._waiters),
+                'blocked_for': round(max(0.0, self._blocked_until - now), 1),
+                'acquired': self.acquired,
+                'seconds_waited': round(self.waited, 1),
+                'rate_limited_responses': self.rate_limited_responses,
+                'other_endpoints': dict(self.endpoint_limits)
+            }
+
+
+def install_client_hook(client, limiter):
+    """
+    Feed every response of an atproto Client into the limiter.
+
+    Wraps the client's internal _invoke so the ratelimit headers of each
+    response (and of failed responses carried on exceptions) reach
+    limiter.observe(), tagged with the XRPC method taken from the request
+    URL. Tokens are still taken explicitly by callers.
+
+    Returns:
+        bool: True if the hook was installed
+    """
+    original = getattr(client, '_invoke', None)
+    if original is None:
+        logger.warning("Bluesky client has no _invoke method; rate limiter won't see response headers")
+        return False
+
+    def observe(response, endpoint):
+        if response is not None:
+            limiter.observe(getattr(response, 'headers', None), getattr(response, 'status_code', None),
+                            endpoint=endpoint)
+
+    def invoke_with_feedback(*args, **kwargs):
+        endpoint = endpoint_from_url(kwargs.get('url'))
+        try:
+            response = original(*args, **kwargs)
+        except Exception as e:
+            observe(getattr(e, 'response', None), endpoint)
+            raise
+        observe(response, endpoint)
+        return response
+
+    client._invoke = invoke_with_feedback
+    return True
@@ -0,0 +1,134 @@
+"""
+Adaptive Poll Scheduler
+
+Decides when each search query is polled next. Every key keeps an
+exponentially weighted moving average (EWMA) of its yield in posts per
+second, and its next poll is scheduled so that a poll is expected to return
+about target_posts posts: hot keys are polled every few seconds, cold keys
+back off to max_interval. A poll that returns far more than expected (or
+that ran out of page budget) makes the key due again immediately.
+
+The total request rate implied by the schedule is kept within a request
+budget (the token bucket's refill rate) by stretching every interval
+proportionally when the hot keys would exceed it.
+"""
+
+import time
+import threading
+
+# Default scheduling parameters
+DEFAULT_MIN_INTERVAL = 5.0  # Seconds between polls of the hottest key
+DEFAULT_MAX_INTERVAL = 300.0  # Seconds between polls of a cold key
+DEFAULT_TARGET_POSTS = 25.0  # New posts a poll should return on average
+DEFAULT_ALPHA = 0.3  # Weight of the latest observation in the EWMA
+DEFAULT_SPIKE_FACTOR = 3.0  # Observed/expected ratio treated as a spike
+DEFAULT_SPIKE_MIN_POSTS = 10  # Posts a poll must return before it can count as a spike
+
+
+class AdaptiveScheduler:
+    """
+    EWMA-driven poll scheduler.
+
+    Args:
+        keys: Keys to schedule (all are due immediately at start)
+        budget_per_second: Requests per second the schedule may use
+        min_interval: Shortest interval between polls of one key
+        max_interval: Longest interval between polls of one key
+        target_posts: Posts a poll should return on average
+        alpha: EWMA weight of the latest observation
+        spike_factor: A poll returning this many times the expected posts is a spike
+        spike_min_posts: Minimum posts for a poll to count as a spike
+    """
+
+    def __init__(self, keys, budget_per_second, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 target_posts=DEFAULT_TARGET_POSTS, alpha=DEFAULT_ALPHA, spike_factor=DEFAULT_SPIKE_FACTOR,
+                 spike_min_posts=DEFAULT_SPIKE_MIN_POSTS):
+        self.budget_per_second = budget_per_second
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_posts = target_posts
+        self.alpha = alpha
+        self.spike_factor = spike_factor
+        self.spike_min_posts = spike_min_posts
+
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self._rates = {key: 0.0 for key in keys}  # EWMA posts per second
+        self._pages = {key: 1.0 for key in keys}  # EWMA requests per poll
+        self._last_polled = {key: None for key in keys}
+        self._next_due = {key: now for key in keys}
+        self._urgent = set()  # Keys that spiked and are polled immediately
+
+        # Statistics
+        self.polls = 0
+        self.spikes = 0
+
+    def due(self, now=None):
+        """Return the keys due for a poll, most urgent first"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due_keys = [key for key, due_at in self._next_due.items() if due_at <= now]
+            return sorted(due_keys, key=lambda key: (key not in self._urgent, self._next_due[key]))
+
+    def seconds_until_next(self, now=None):
+        """Return seconds until the next key is due (0 if one is due already)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return max(0.0, min(self._next_due.values()) - now)
+
+    def record(self, key, posts, pages=1, exhausted=False, now=None):
+        """
+        Record the outcome of a poll and schedule the key's next poll.
+
+        Args:
+            key: Key that was polled
+            posts: New posts the poll returned
+            pages: Requests the poll used
+            exhausted: The poll hit its page budget, so more posts are waiting
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.polls += 1
+            last_polled = self._last_polled[key]
+            self._last_polled[key] = now
+            self._pages[key] += self.alpha * (max(1, pages) - self._pages[key])
+            self._urgent.discard(key)
+
+            if last_polled is not None:
+                elapsed = max(now - last_polled, 1e-3)
+                expected = self._rates[key] * elapsed
+                self._rates[key] += self.alpha * (posts / elapsed - self._rates[key])
+
+                if exhausted or (posts >= self.spike_min_posts and posts > self.spike_factor * expected):
+                    # Spike: poll again right away and let the EWMA catch up
+                    self.spikes += 1
+                    self._urgent.add(key)
+                    self._next_due[key] = now
+                    return
+                self._next_due[key] = now + self._interval(key)
+            else:
+                # First poll only covers the backlog; poll again soon to measure the live rate
+                self._next_due[key] = now + self.min_interval
+
+    def _interval(self, key):
+        """Interval for key, stretched to keep the whole schedule within budget"""
+        raw = {name: self._raw_interval(name) for name in self._rates}
+        demand = sum(self._pages[name] / interval for name, interval in raw.items())
+        scale = max(1.0, demand / self.budget_per_second) if self.budget_per_second > 0 else 1.0
+        return min(self.max_interval, raw[key] * scale)
+
+    def _raw_interval(self, key):
+        rate = self._rates[key]
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_posts / rate))
+
+    def stats(self):
+        """Return per-key rates and intervals"""
+        with self._lock:
+            return {
+                'polls': self.polls,
+                'spikes': self.spikes,
+                'intervals': {key: round(self._raw_interval(key), 1) for key in self._rates},
+                'posts_per_minute': {key: round(rate * 60, 1) for key, rate in self._rates.items()}
+            }
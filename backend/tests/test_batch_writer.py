@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+botocore_exceptions = pytest.importorskip('botocore.exceptions')
+
+from batch_writer import DynamoBatchWriter, BatchWriteError
+
+KEY_FIELDS = {'posts': ['post_id']}
+
+
+class FakeDynamoDB:
+    """Answers batch_write_item from a script of outcomes, one per request"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems):
+        with self.lock:
+            post_ids = [request['PutRequest']['Item']['post_id'] for request in RequestItems.get('posts', [])]
+            self.requests.append(post_ids)
+            outcome = self.outcomes.pop(0) if self.outcomes else 'ok'
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == 'ok':
+            return {'UnprocessedItems': {}}
+        # A list of post_ids to hand back unprocessed
+        return {'UnprocessedItems': {'posts': [{'PutRequest': {'Item': {'post_id': post_id}}}
+                                               for post_id in outcome if post_id in post_ids]}}
+
+
+def client_error(code):
+    return botocore_exceptions.ClientError({'Error': {'Code': code, 'Message': code}}, 'BatchWriteItem')
+
+
+@pytest.fixture
+def writer_for():
+    writers = []
+
+    def build(dynamodb, **kwargs):
+        writer = DynamoBatchWriter(dynamodb, KEY_FIELDS, flush_interval=60, base_backoff=0.001, **kwargs)
+        writer.start()
+        writers.append(writer)
+        return writer
+
+    yield build
+    for writer in writers:
+        writer.stop()
+
+
+def test_unprocessed_items_are_retried_until_written(writer_for):
+    dynamodb = FakeDynamoDB([['p2'], ['p2'], 'ok'])
+    writer = writer_for(dynamodb)
+    futures = [writer.submit('posts', {'post_id': f"p{index}"}) for index in range(3)]
+    assert writer.flush(timeout=5)
+
+    assert [future.result(timeout=0) for future in futures] == [True, True, True]
+    assert dynamodb.requests == [['p0', 'p1', 'p2'], ['p2'], ['p2']]
+    stats = writer.stats()
+    assert (stats['requests_sent'], stats['retries'], stats['items_written'], stats['items_failed']) == (3, 2, 3, 0)
+
+
+def test_items_still_unprocessed_after_the_last_attempt_fail(writer_for):
+    dynamodb = FakeDynamoDB([['p1']] * 3)
+    writer = writer_for(dynamodb, max_retries=3)
+    written = writer.submit('posts', {'post_id': 'p0'})
+    stuck = writer.submit('posts', {'post_id': 'p1'})
+    assert writer.flush(timeout=5)
+
+    assert written.result(timeout=0) is True
+    with pytest.raises(BatchWriteError):
+        stuck.result(timeout=0)
+    assert len(dynamodb.requests) == 3
+    assert writer.stats()['items_failed'] == 1
+
+
+def test_throttling_is_retried_but_other_client_errors_are_not(writer_for):
+    throttled = FakeDynamoDB([client_error('ProvisionedThroughputExceededException'), 'ok'])
+    writer = writer_for(throttled)
+    future = writer.submit('posts', {'post_id': 'p0'})
+    assert writer.flush(timeout=5)
+    assert future.result(timeout=0) is True
+    assert len(throttled.requests) == 2
+
+    rejected = FakeDynamoDB([client_error('ValidationException')])
+    writer = writer_for(rejected)
+    future = writer.submit('posts', {'post_id': 'p0'})
+    assert writer.flush(timeout=5)
+    with pytest.raises(BatchWriteError):
+        future.result(timeout=0)
+    assert len(rejected.requests) == 1
+
+
+def test_duplicate_keys_in_a_batch_are_sent_once(writer_for):
+    dynamodb = FakeDynamoDB([])
+    writer = writer_for(dynamodb)
+    first = writer.submit('posts', {'post_id': 'p0', 'text': 'old'})
+    second = writer.submit('posts', {'post_id': 'p0', 'text': 'new'})
+    assert writer.flush(timeout=5)
+
+    assert first.result(timeout=0) is True and second.result(timeout=0) is True
+    assert dynamodb.requests == [['p0']]
@@ -0,0 +1,65 @@
+import json
+
+from checkpoint import CheckpointStore
+
+EARLY = '2025-01-01T00:00:00+00:00'
+LATER = '2025-01-02T00:00:00+00:00'
+LATEST = '2025-01-03T00:00:00Z'
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_updates_are_coalesced_until_flush(tmp_path):
+    path = str(tmp_path / 'last_processed.json')
+    store = CheckpointStore(path)
+    store.load()
+    store.flush()
+
+    store.set('flood', EARLY)
+    store.set('flood', LATER)
+    store.set('flood', LATER)
+    assert store.updates == 2
+    assert read(path) == {}
+
+    assert store.flush()
+    assert read(path) == {'flood': LATER}
+    assert not store.flush()
+
+
+def test_defaults_fill_keys_missing_from_the_checkpoint(tmp_path):
+    path = str(tmp_path / 'last_processed.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'flood': LATER}, f)
+
+    store = CheckpointStore(path)
+    values = store.load(defaults={'flood': EARLY, 'storm': EARLY})
+    assert values == {'flood': LATER, 'storm': EARLY}
+    assert store.stats()['dirty']
+
+
+def test_corrupt_checkpoint_falls_back_to_the_previous_version(tmp_path):
+    path = str(tmp_path / 'last_processed.json')
+    store = CheckpointStore(path, history=2)
+    store.load()
+    for value in (EARLY, LATER, LATEST):
+        store.set('flood', value)
+        store.flush()
+    assert read(path + '.1') == {'flood': LATER}
+    assert read(path + '.2') == {'flood': EARLY}
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"flood": "not a time"}')
+    assert CheckpointStore(path, history=2).load() == {'flood': LATER}
+
+
+def test_stop_writes_pending_updates(tmp_path):
+    path = str(tmp_path / 'last_processed.json')
+    store = CheckpointStore(path, flush_interval=3600)
+    store.load()
+    store.start()
+    store.set('storm', LATEST)
+    store.stop()
+    assert read(path) == {'storm': LATEST}
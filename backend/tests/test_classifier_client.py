@@ -0,0 +1,63 @@
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from classifier_client import ClassifierClient, ClassifierUnavailable
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, url, json=None, timeout=None):
+        self.requests.append(json['texts'])
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def client_with(responses, max_texts=256):
+    client = ClassifierClient('http://127.0.0.1:8765/', max_texts=max_texts)
+    client.session = FakeSession(responses)
+    return client
+
+
+def test_predict_returns_predictions_and_the_version_that_made_them():
+    client = client_with([FakeResponse({'predictions': [['flood', 0.97], ['unknown', 0.2]], 'model_version': 'v1'})])
+    assert client.predict(['river over the bridge', 'lunch']) == ([('flood', 0.97), ('unknown', 0.2)], 'v1')
+
+
+def test_unreachable_service_raises_instead_of_guessing():
+    client = client_with([requests.ConnectionError("refused")])
+    with pytest.raises(ClassifierUnavailable):
+        client.predict(['river over the bridge'])
+
+
+def test_error_status_and_short_responses_raise():
+    with pytest.raises(ClassifierUnavailable):
+        client_with([FakeResponse({}, status_code=503)]).predict(['a'])
+    with pytest.raises(ClassifierUnavailable):
+        client_with([FakeResponse({'predictions': [['flood', 0.9]], 'model_version': 'v1'})]).predict(['a', 'b'])
+
+
+def test_a_model_swap_between_requests_raises():
+    client = client_with([FakeResponse({'predictions': [['flood', 0.9]], 'model_version': 'v1'}),
+                          FakeResponse({'predictions': [['storm', 0.9]], 'model_version': 'v2'})], max_texts=1)
+    with pytest.raises(ClassifierUnavailable):
+        client.predict(['a', 'b'])
+    assert client.session.requests == [['a'], ['b']]
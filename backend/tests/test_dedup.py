@@ -0,0 +1,69 @@
+from dedup import BloomFilter, WindowedDedup, SNAPSHOT_MAGIC
+
+HOUR = 60 * 60
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    keys = [f"at://did:plc:user/app.bsky.feed.post/{index}" for index in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"unseen-{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+def test_check_and_add_reports_seen_keys():
+    dedup = WindowedDedup(window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    assert not dedup.check_and_add('post-1', 10 * HOUR)
+    assert dedup.check_and_add('post-1', 10 * HOUR)
+    assert dedup.seen('post-1')
+    assert not dedup.seen('post-2')
+
+
+def test_seen_does_not_record():
+    dedup = WindowedDedup(window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    assert not dedup.seen('post-1')
+    assert not dedup.seen('post-1')
+    dedup.add('post-1', 10 * HOUR)
+    assert dedup.seen('post-1')
+
+
+def test_buckets_past_the_window_are_forgotten():
+    dedup = WindowedDedup(window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    dedup.add('old', 10 * HOUR)
+    dedup.add('new', 13 * HOUR)
+    assert dedup.seen('old')
+
+    dedup.add('newer', 14 * HOUR)
+    assert not dedup.seen('old')
+    assert dedup.seen('new')
+    assert dedup.stats()['buckets'] <= dedup.num_buckets
+
+    # Posts older than the window aren't recorded at all
+    dedup.add('ancient', 1 * HOUR)
+    assert not dedup.seen('ancient')
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'processed.dedup')
+    dedup = WindowedDedup(window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    dedup.add('post-1', 10 * HOUR)
+    dedup.add('post-2', 11 * HOUR)
+    dedup.save(path)
+
+    restored = WindowedDedup.load(path, window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    assert restored.seen('post-1') and restored.seen('post-2')
+    assert restored.stats() == dedup.stats()
+
+
+def test_snapshot_with_other_parameters_or_corrupt_data_starts_empty(tmp_path):
+    path = str(tmp_path / 'processed.dedup')
+    dedup = WindowedDedup(window=4 * HOUR, bucket=HOUR, bucket_capacity=100)
+    dedup.add('post-1', 10 * HOUR)
+    dedup.save(path)
+    assert not WindowedDedup.load(path, window=4 * HOUR, bucket=HOUR, bucket_capacity=5000).seen('post-1')
+
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + b'\xff')
+    assert not WindowedDedup.load(path, window=4 * HOUR, bucket=HOUR, bucket_capacity=100).seen('post-1')
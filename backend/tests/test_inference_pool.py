@@ -0,0 +1,86 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from inference_pool import InferencePool
+
+ID2LABEL = {0: 'not_disaster', 1: 'flood'}
+
+
+class FakeTokenizer:
+    """One token per word; fails on any text containing 'boom'"""
+
+    def __call__(self, texts, truncation=True, max_length=None):
+        if any('boom' in text for text in texts):
+            raise ValueError("tokenizer failed")
+        return {'input_ids': [[1] * len(text.split()) for text in texts]}
+
+    def pad(self, encoded, return_tensors=None):
+        width = max(len(ids) for ids in encoded['input_ids'])
+        return {'input_ids': torch.tensor([ids + [0] * (width - len(ids)) for ids in encoded['input_ids']])}
+
+
+class FakeModel:
+    """Calls texts of more than four words floods"""
+
+    def __call__(self, input_ids):
+        lengths = input_ids.sum(dim=-1).float()
+        return SimpleNamespace(logits=torch.stack([4 - lengths, lengths - 4], dim=-1))
+
+
+TEXTS = ['river over the banks and rising fast', 'nice day', 'flood water in every street downtown', 'hello']
+
+
+@pytest.fixture
+def pool():
+    pools = []
+
+    def build(**kwargs):
+        kwargs.setdefault('model', FakeModel())
+        instance = InferencePool(FakeTokenizer(), id2label=ID2LABEL, workers=2, batch_size=2, **kwargs)
+        instance.start()
+        pools.append(instance)
+        return instance
+
+    yield build
+    for instance in pools:
+        instance.stop()
+
+
+@pytest.mark.skipif(not InferencePool.can_fork(), reason="needs fork and a single-threaded test process")
+def test_forked_workers_return_predictions_in_input_order(pool):
+    workers = pool()
+    labels = [label for label, _ in workers.predict(TEXTS)]
+    assert labels == ['flood', 'not_disaster', 'flood', 'not_disaster']
+    assert workers.stats() == {'workers': 2, 'texts_classified': 4, 'chunks': 2}
+
+
+@pytest.mark.skipif(not InferencePool.can_fork(), reason="needs fork and a single-threaded test process")
+def test_a_failing_worker_raises_instead_of_answering_unknown(pool):
+    workers = pool()
+    with pytest.raises(ValueError):
+        workers.predict(['nice day', 'boom'])
+    # The workers keep serving afterwards
+    assert [label for label, _ in workers.predict(TEXTS)][0] == 'flood'
+
+
+def test_without_fork_or_a_model_path_it_classifies_in_process(pool):
+    release = threading.Event()
+    other = threading.Thread(target=release.wait)
+    other.start()  # Forking is no longer safe
+    try:
+        assert not InferencePool.can_fork()
+        workers = pool()
+        assert workers.stats()['workers'] == 0
+        assert [label for label, _ in workers.predict(TEXTS)] == ['flood', 'not_disaster', 'flood', 'not_disaster']
+        with pytest.raises(ValueError):
+            workers.predict(['boom'])
+
+        with pytest.raises(RuntimeError):
+            pool(model=None)
+    finally:
+        release.set()
+        other.join()
@@ -0,0 +1,37 @@
+import json
+
+from journal import PostJournal, compact_journal, rotated_segments
+
+
+def test_records_count_appends(tmp_path):
+    journal = PostJournal(str(tmp_path / 'posts.jsonl'))
+    journal.append({'uri': 'a'})
+    journal.append_many([{'uri': 'b'}, {'uri': 'c'}])
+    journal.append_many([])
+    assert journal.records == 3
+    journal.close()
+
+
+def test_compaction_reads_rotated_segments_newest_first(tmp_path):
+    path = str(tmp_path / 'posts.jsonl')
+    output = str(tmp_path / 'posts.json')
+    journal = PostJournal(path, compress=True)
+    journal.append_many([{'uri': 'a', 'n': 1}, {'uri': 'b', 'n': 1}])
+    journal.rotate()
+    journal.append_many([{'uri': 'c', 'n': 1}, {'uri': 'a', 'n': 2}])
+    assert len(rotated_segments(path)) == 1
+
+    # Compacting while the journal is open (as the ingestors do each interval) sees every flushed post
+    assert compact_journal(path, output, limit=10) == 3
+    with open(output, encoding='utf-8') as f:
+        posts = json.load(f)
+    assert [(post['uri'], post['n']) for post in posts] == [('a', 2), ('c', 1), ('b', 1)]
+
+    assert compact_journal(path, output, limit=2) == 2
+    journal.close()
+
+
+def test_compaction_skips_a_partial_last_line(tmp_path):
+    path = tmp_path / 'posts.jsonl'
+    path.write_text('{"uri": "a"}\n{"uri": "b', encoding='utf-8')
+    assert compact_journal(str(path), str(tmp_path / 'posts.json')) == 1
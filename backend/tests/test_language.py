@@ -0,0 +1,60 @@
+from language import LanguageIdentifier, classify_script, ENGLISH, NOT_ENGLISH, AMBIGUOUS
+
+
+def test_plain_english_is_accepted_without_the_model():
+    assert classify_script("There is a flood in the city and we need help now") is ENGLISH
+    assert classify_script("Is anyone else without power after the storm? @user https://t.co/x") is ENGLISH
+
+
+def test_other_scripts_and_empty_text_are_rejected():
+    assert classify_script("Землетрясение в городе, все на улице") is NOT_ENGLISH
+    assert classify_script("東京で地震がありました") is NOT_ENGLISH
+    assert classify_script("🔥🔥 https://t.co/x 123") is NOT_ENGLISH
+
+
+def test_code_mixed_and_accented_text_go_to_the_model():
+    assert classify_script("I am in Manila, may bagyo na naman at baha sa amin") is AMBIGUOUS
+    assert classify_script("Banjir di Jakarta and it is getting worse, tidak ada listrik") is AMBIGUOUS
+    assert classify_script("Hay un incendio cerca de la casa, que miedo") is AMBIGUOUS
+    assert classify_script("Évacuation immédiate du quartier") is AMBIGUOUS
+    # Too few function words to be sure
+    assert classify_script("Flash flood warning for Harris County") is AMBIGUOUS
+
+
+class CountingIdentifier(LanguageIdentifier):
+    """Stands in for the n-gram model: everything it sees is English"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.model_calls = []
+
+    def _model_is_english(self, texts):
+        self.model_calls.append(list(texts))
+        return [True] * len(texts)
+
+
+def test_decisions_are_cached_and_counted():
+    identifier = CountingIdentifier()
+    texts = ["There is a flood in the city and we need help now", "Flash flood warning for Harris County",
+             "東京で地震がありました"]
+    assert identifier.is_english_batch(texts) == [True, True, False]
+    assert identifier.model_calls == [["Flash flood warning for Harris County"]]
+
+    assert identifier.is_english_batch(texts) == [True, True, False]
+    assert len(identifier.model_calls) == 1
+    stats = identifier.stats()
+    assert (stats['cache_hits'], stats['heuristic_decisions'], stats['model_decisions']) == (3, 2, 1)
+
+
+def test_the_least_recently_used_decision_is_evicted():
+    identifier = CountingIdentifier(cache_size=2)
+    identifier.is_english("Flood warning Harris County")
+    identifier.is_english("Storm warning Galveston")
+    identifier.is_english("Flood warning Harris County")  # Now the most recently used
+    identifier.is_english("Tornado warning Tulsa")
+    assert identifier.stats()['cache_size'] == 2
+
+    identifier.is_english("Flood warning Harris County")
+    identifier.is_english("Storm warning Galveston")
+    assert identifier.model_calls == [["Flood warning Harris County"], ["Storm warning Galveston"],
+                                      ["Tornado warning Tulsa"], ["Storm warning Galveston"]]
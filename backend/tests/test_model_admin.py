@@ -0,0 +1,56 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from model_manager import serve_admin, MAX_ADMIN_BODY_BYTES
+
+
+class StubManager:
+    model_path = 'model_bundle'
+
+    def __init__(self):
+        self.requested = []
+
+    def request_reload(self, model_path=None):
+        self.requested.append(model_path)
+
+    def stats(self):
+        return {'model_version': 'v1'}
+
+
+@pytest.fixture
+def admin():
+    manager = StubManager()
+    server = serve_admin(manager)
+    yield manager, server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body):
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/admin/reload", data=body,
+                                     method='POST')
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_admin_endpoint_only_listens_on_loopback(admin):
+    _, server = admin
+    assert server.server_address[0] == '127.0.0.1'
+
+
+def test_reload_request_is_passed_to_the_manager(admin):
+    manager, server = admin
+    status, payload = post(server, json.dumps({'model_path': 'new_bundle'}).encode('utf-8'))
+    assert (status, payload['model_path']) == (202, 'new_bundle')
+    assert manager.requested == ['new_bundle']
+
+
+def test_oversized_admin_request_is_rejected(admin):
+    manager, server = admin
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(server, b' ' * (MAX_ADMIN_BODY_BYTES + 1))
+    assert error.value.code == 413
+    assert manager.requested == []
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+import pytest
+
+from model_bundle import checkpoint_id2label, DISASTER_ID2LABEL
+
+
+def config(id2label):
+    return SimpleNamespace(id2label=id2label, num_labels=len(id2label))
+
+
+def test_real_labels_in_the_checkpoint_config_win():
+    labels = {'0': 'flood', '1': 'not_disaster'}
+    assert checkpoint_id2label(config(labels)) == {0: 'flood', 1: 'not_disaster'}
+
+
+def test_placeholder_labels_fall_back_to_the_disaster_labels():
+    placeholders = {index: f"LABEL_{index}" for index in range(len(DISASTER_ID2LABEL))}
+    assert checkpoint_id2label(config(placeholders)) == DISASTER_ID2LABEL
+
+
+def test_placeholder_labels_with_another_class_count_fail_loudly():
+    with pytest.raises(ValueError):
+        checkpoint_id2label(config({0: 'LABEL_0', 1: 'LABEL_1'}))
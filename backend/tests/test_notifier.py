@@ -0,0 +1,157 @@
+import json
+import time
+import threading
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+import notifier
+from notifier import NotificationDispatcher
+from outbox import NotificationOutbox
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ''
+
+
+class FakeSession:
+    """Records delivered post_ids; fails while `down` is set, or with the queued status codes first"""
+
+    def __init__(self, statuses=()):
+        self.down = False
+        self.statuses = list(statuses)
+        self.delivered = []
+        self.attempts = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        with self.lock:
+            self.attempts += 1
+            if self.down:
+                raise requests.ConnectionError("API is down")
+            if self.statuses:
+                return FakeResponse(self.statuses.pop(0))
+            self.delivered.extend(post['post_id'] for post in json.loads(data)['posts'])
+        return FakeResponse(200)
+
+    def close(self):
+        pass
+
+
+def dispatcher_with(session, **kwargs):
+    dispatcher = NotificationDispatcher('http://127.0.0.1:5000/api/notify-new-post', compress_min_bytes=None,
+                                        **kwargs)
+    dispatcher.session = session
+    return dispatcher
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(notifier, 'DEFAULT_RETRY_BACKOFF', 0.01)
+    monkeypatch.setattr(notifier, 'MAX_RETRY_BACKOFF', 0.04)
+
+
+def test_overflow_during_an_outage_stays_in_the_outbox(tmp_path):
+    directory = str(tmp_path / 'outbox')
+    session = FakeSession()
+    session.down = True
+    dispatcher = dispatcher_with(session, outbox=NotificationOutbox(directory), max_buffer=3, max_batch=2,
+                                 failure_threshold=100)
+    dispatcher.start()
+    for index in range(10):
+        dispatcher.submit({'post_id': f"p{index}"})
+    dispatcher.flush(timeout=0.2)
+
+    stats = dispatcher.stats()
+    assert stats['buffered'] <= 3 and stats['held_in_outbox'] and stats['dropped'] == 0
+    assert len(dispatcher.outbox.pending()) == 10
+
+    # Back up: everything is delivered, oldest first, and acknowledged
+    session.down = False
+    assert dispatcher.flush(timeout=5)
+    assert session.delivered == [f"p{index}" for index in range(10)]
+    assert dispatcher.outbox.pending() == []
+    dispatcher.stop()
+
+
+def test_restart_replays_a_backlog_larger_than_the_buffer(tmp_path):
+    directory = str(tmp_path / 'outbox')
+    outbox = NotificationOutbox(directory)
+    for index in range(7):
+        outbox.append(f"p{index}", {'post_id': f"p{index}"})
+    outbox.close()
+
+    session = FakeSession()
+    dispatcher = dispatcher_with(session, outbox=NotificationOutbox(directory), max_buffer=2, max_batch=2)
+    dispatcher.start()
+    assert dispatcher.flush(timeout=5)
+    assert session.delivered == [f"p{index}" for index in range(7)]
+    dispatcher.stop()
+    assert NotificationOutbox(directory).pending() == []
+
+
+def test_without_an_outbox_the_oldest_are_dropped():
+    session = FakeSession()
+    session.down = True
+    dispatcher = dispatcher_with(session, max_buffer=2)
+    for index in range(5):
+        dispatcher.submit({'post_id': f"p{index}"})
+    assert dispatcher.stats()['dropped'] == 3
+    assert [post['post_id'] for post, _ in dispatcher._buffer] == ['p3', 'p4']
+
+
+def test_server_errors_are_retried_with_backoff(fast_backoff):
+    session = FakeSession(statuses=[503, 503, 429])
+    dispatcher = dispatcher_with(session, max_wait=0)
+    dispatcher.start()
+    dispatcher.submit({'post_id': 'p0'})
+    wait_until(lambda: session.delivered)
+
+    stats = dispatcher.stats()
+    assert session.attempts == 4
+    assert (stats['sent'], stats['failures'], stats['dropped']) == (1, 3, 0)
+    assert dispatcher._backoff == notifier.DEFAULT_RETRY_BACKOFF
+    dispatcher.stop()
+
+
+def test_rejected_batches_are_not_retried(tmp_path):
+    session = FakeSession(statuses=[400])
+    dispatcher = dispatcher_with(session, outbox=NotificationOutbox(str(tmp_path / 'outbox')))
+    dispatcher.start()
+    dispatcher.submit({'post_id': 'p0'})
+    assert dispatcher.flush(timeout=5)
+
+    assert session.attempts == 1
+    assert dispatcher.stats()['dropped'] == 1
+    assert dispatcher.outbox.pending() == []
+    dispatcher.stop()
+
+
+def test_the_circuit_opens_after_repeated_failures_and_closes_on_success(fast_backoff):
+    session = FakeSession()
+    session.down = True
+    dispatcher = dispatcher_with(session, max_wait=0, failure_threshold=3, reset_timeout=60)
+    dispatcher.start()
+    dispatcher.submit({'post_id': 'p0'})
+    wait_until(lambda: dispatcher.stats()['circuit_open'])
+
+    # Open: nothing more is sent until the reset timeout
+    time.sleep(0.2)
+    assert session.attempts == 3
+
+    # A flush sends the trial batch right away
+    session.down = False
+    assert dispatcher.flush(timeout=5)
+    assert session.delivered == ['p0']
+    assert not dispatcher.stats()['circuit_open']
+    dispatcher.stop()
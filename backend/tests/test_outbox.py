@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import outbox
+from outbox import NotificationOutbox
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'outbox')
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(outbox.SEGMENT_SUFFIX))
+
+
+def test_pending_notifications_survive_a_restart(directory):
+    box = NotificationOutbox(directory)
+    box.append('p1', {'text': 'flood'})
+    box.append('p2', {'text': 'storm'})
+    box.append('p3', {'text': 'fire'})
+    box.ack(['p2', 'unknown'])
+    box.close()
+
+    box = NotificationOutbox(directory)
+    assert box.pending() == [('p1', {'text': 'flood'}), ('p3', {'text': 'fire'})]
+    box.close()
+
+
+def test_a_partial_last_line_is_skipped(directory):
+    box = NotificationOutbox(directory)
+    box.append('p1', {'text': 'flood'})
+    box.close()
+    with open(os.path.join(directory, segments(directory)[-1]), 'a', encoding='utf-8') as f:
+        f.write('{"id": "p2", "po')
+
+    box = NotificationOutbox(directory)
+    assert [post_id for post_id, _ in box.pending()] == ['p1']
+    box.close()
+
+
+def test_acknowledged_segments_are_deleted_oldest_first(directory):
+    box = NotificationOutbox(directory, segment_bytes=1)  # Rotate after every write
+    box.append('p1', {})
+    box.append('p2', {})
+    box.append('p3', {})
+
+    # p2's segment can't go while p1's older one is still pending
+    box.ack(['p2'])
+    assert len(segments(directory)) >= 3
+
+    box.ack(['p1', 'p3'])
+    assert box.stats() == {'pending': 0, 'segments': 1}
+    assert len(segments(directory)) == 1
+    box.close()
+
+
+@pytest.mark.skipif(outbox.fcntl is None, reason="directory locking needs fcntl")
+def test_a_second_instance_cannot_open_the_directory(directory):
+    box = NotificationOutbox(directory)
+    box.append('p1', {})
+    with pytest.raises(RuntimeError):
+        NotificationOutbox(directory)
+    assert box.pending() == [('p1', {})]
+    box.close()
+
+    reopened = NotificationOutbox(directory)
+    assert reopened.pending() == [('p1', {})]
+    reopened.close()
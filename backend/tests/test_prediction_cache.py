@@ -0,0 +1,33 @@
+from prediction_cache import PredictionCache, model_version
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_model_version_changes_with_the_weights_but_not_with_onnx_exports(tmp_path):
+    write(tmp_path / 'config.json', b'{}')
+    write(tmp_path / 'model.safetensors', b'weights')
+    version = model_version(str(tmp_path), 'torch')
+
+    write(tmp_path / 'model.onnx', b'export')
+    write(tmp_path / 'model.int8.onnx.123.tmp', b'partial export')
+    assert model_version(str(tmp_path), 'torch') == version
+
+    write(tmp_path / 'model.safetensors', b'retrained weights')
+    assert model_version(str(tmp_path), 'torch') != version
+
+
+def test_model_version_includes_the_backend(tmp_path):
+    write(tmp_path / 'model.safetensors', b'weights')
+    assert model_version(str(tmp_path), 'torch') != model_version(str(tmp_path), 'int8')
+
+
+def test_entries_from_another_model_version_miss():
+    cache = PredictionCache(model_version='v1', max_entries=10)
+    cache.put('Flood  warning', ('flood', 0.98))
+    assert cache.get('flood warning') == ('flood', 0.98)
+
+    cache.set_model_version('v2')
+    assert cache.get('flood warning') is None
@@ -0,0 +1,63 @@
+from prefilter import (AhoCorasickMatcher, HashedNgramModel, PrefilterCascade, hashed_features,
+                       positive_score_quantiles, create_prefilter, QUANTILE_STEP)
+
+
+def test_matcher_finds_overlapping_phrases_through_failure_links():
+    matcher = AhoCorasickMatcher(['he', 'she', 'his', 'hers'])
+    assert matcher.find('ushers') == set()  # Not whole words
+    assert matcher.find('she said hers') == {'she', 'hers'}
+    assert matcher.find('he and she') == {'he', 'she'}
+
+
+def test_matcher_requires_whole_words():
+    matcher = AhoCorasickMatcher(['flash flood', 'magnitude'])
+    assert matcher.find('flash flood warning, magnitude 6') == {'flash flood', 'magnitude'}
+    assert matcher.find('magnitudes of flash flooding') == set()
+
+
+def test_hashed_features_are_stable_and_include_bigrams():
+    features = hashed_features('river flood now', n_features=1024, ngram=2)
+    assert features == hashed_features('river flood now', n_features=1024, ngram=2)
+    assert len(features) <= 5
+    assert hashed_features('river flood now', n_features=1024, ngram=1) < features
+
+
+def model_for(words, weight=4.0, bias=-2.0):
+    weights = {index: weight for word in words for index in hashed_features(word)}
+    return HashedNgramModel(weights, bias)
+
+
+def test_model_scores_and_round_trips(tmp_path):
+    model = model_for(['flood'])
+    model.quantiles = positive_score_quantiles([0.2, 0.5, 0.8, 0.9])
+    assert model.score('flood') > 0.5 > model.score('lunch')
+
+    path = str(tmp_path / 'prefilter_model.json')
+    model.save(path)
+    loaded = HashedNgramModel.load(path)
+    assert loaded.score('flood') == model.score('flood')
+    assert loaded.quantiles == model.quantiles
+
+
+def test_threshold_for_recall_uses_the_stored_quantiles():
+    model = model_for(['flood'])
+    model.quantiles = [index * QUANTILE_STEP for index in range(201)]
+    assert model.threshold_for_recall(1.0) == 0.0
+    assert abs(model.threshold_for_recall(0.9) - 0.1) < 1e-9
+    assert model.threshold_for_recall(0.5) == model.quantiles[-1]
+    assert HashedNgramModel({}, 0.0).threshold_for_recall(0.99) == 0.0
+
+
+def test_cascade_passes_phrases_and_confident_posts_and_rejects_the_rest():
+    model = model_for(['flood'])
+    model.quantiles = [0.5] * 201
+    cascade = PrefilterCascade(model, phrases=['evacuation order'])
+    assert cascade.screen(['evacuation order issued', 'flood downtown', 'great lunch']) == [True, True, False]
+    stats = cascade.stats()
+    assert (stats['passed_by_phrase'], stats['passed_by_model'], stats['rejected']) == (1, 1, 1)
+
+
+def test_without_a_model_nothing_is_rejected(tmp_path):
+    cascade = create_prefilter(str(tmp_path / 'missing.json'))
+    assert cascade.screen(['great lunch', 'flash flood']) == [True, True]
+    assert cascade.stats()['rejected'] == 0
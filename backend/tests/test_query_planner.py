@@ -0,0 +1,37 @@
+from query_planner import QueryPlanner, plan_query_groups
+
+KEYWORDS = ['fire', 'flood', 'wildfire', 'storm', 'earthquake']
+
+
+def test_overlapping_keywords_share_a_group():
+    groups = plan_query_groups(KEYWORDS, group_size=4)
+    assert [group.query for group in groups] == ['fire OR wildfire OR flood OR storm', 'earthquake']
+    assert groups[1].key == 'earthquake'
+    assert sorted(keyword for group in groups for keyword in group.keywords) == sorted(KEYWORDS)
+
+
+def test_group_size_one_is_one_query_per_keyword():
+    groups = plan_query_groups(KEYWORDS, group_size=1)
+    assert [group.query for group in groups] == ['fire', 'wildfire', 'flood', 'storm', 'earthquake']
+
+
+def test_attribution_matches_whole_word_prefixes():
+    planner = QueryPlanner(KEYWORDS, group_size=4)
+    group = planner.groups[0]
+    assert planner.attribute(group, "Flooding downtown after the STORM") == ['flood', 'storm']
+    assert planner.attribute(group, "Wildfire smoke") == ['wildfire']
+    # No local match (the backend also matches stems and alt text): credit the whole group
+    assert planner.attribute(group, "evacuate now") == [group.key]
+
+
+def test_report_counts_requests_saved_and_resets():
+    planner = QueryPlanner(KEYWORDS, group_size=4, page_size=100)
+    group = planner.groups[0]
+    planner.record_fetch(group, [['flood', 'storm'], ['fire']], pages=1)
+
+    report = planner.report()
+    assert report['requests'] == 1
+    assert report['estimated_keyword_requests'] == 4
+    assert report['requests_saved'] == 3
+    assert report['duplicate_hits_saved'] == 1
+    assert planner.report()['requests'] == 0
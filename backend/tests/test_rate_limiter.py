@@ -0,0 +1,154 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (RateLimiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW, _header_number,
+                          _policy_window, endpoint_from_url)
+
+SEARCH = 'app.bsky.feed.searchPosts'
+CREATE_SESSION = 'com.atproto.server.createSession'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(monotonic=fake.monotonic, time=fake.time))
+    return fake
+
+
+def drain(limiter):
+    while limiter.try_acquire():
+        pass
+
+
+def test_header_number_reads_case_insensitive_values_with_parameters():
+    headers = {'RateLimit-Limit': '3000;w=300', 'ratelimit-remaining': '2990'}
+    assert _header_number(headers, 'ratelimit-limit') == 3000
+    assert _header_number(headers, 'ratelimit-remaining') == 2990
+    assert _header_number(headers, 'ratelimit-reset') is None
+    assert _header_number({'ratelimit-limit': 'soon'}, 'ratelimit-limit') is None
+    assert _header_number(None, 'ratelimit-limit') is None
+
+
+def test_policy_window():
+    assert _policy_window({'RateLimit-Policy': '3000;w=300'}) == 300
+    assert _policy_window({'ratelimit-policy': '3000'}) is None
+    assert _policy_window({}) is None
+
+
+def test_endpoint_from_url():
+    assert endpoint_from_url('https://bsky.social/xrpc/app.bsky.feed.searchPosts') == SEARCH
+    assert endpoint_from_url('https://bsky.social/xrpc/com.atproto.server.createSession?x=1') == CREATE_SESSION
+    assert endpoint_from_url('https://example.com/other') is None
+    assert endpoint_from_url(None) is None
+
+
+def test_tokens_refill_continuously_up_to_the_limit(clock):
+    limiter = RateLimiter(10, 10, reserve=0)  # 1 token per second
+    drain(limiter)
+    assert limiter.acquired == 10
+    assert not limiter.try_acquire()
+
+    clock.now += 2.5
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    clock.now += 1000
+    drain(limiter)
+    assert limiter.acquired == 22
+
+
+def test_remaining_header_caps_tokens_less_the_reserve(clock):
+    limiter = RateLimiter(3000, 300, reserve=5, endpoints=(SEARCH,))
+    limiter.observe({'ratelimit-limit': '3000', 'ratelimit-remaining': '12', 'ratelimit-policy': '3000;w=300'},
+                    200, endpoint=SEARCH)
+    assert limiter.stats()['tokens'] == 7
+
+
+def test_exhausted_budget_blocks_until_reset(clock):
+    limiter = RateLimiter(3000, 300, reserve=5, endpoints=(SEARCH,))
+    limiter.observe({'ratelimit-remaining': '3', 'ratelimit-reset': str(clock.now + 40)}, 200, endpoint=SEARCH)
+    assert not limiter.try_acquire()
+    clock.now += 39
+    assert not limiter.try_acquire()
+    clock.now += 2
+    assert limiter.try_acquire()
+
+
+def test_429_blocks_every_caller_until_reset(clock):
+    limiter = RateLimiter(3000, 300, endpoints=(SEARCH,))
+    limiter.observe({'ratelimit-reset': str(clock.now + 60)}, 429, endpoint=SEARCH)
+    assert limiter.stats()['blocked_for'] == 60
+    assert not limiter.try_acquire(priority=PRIORITY_HIGH)
+    clock.now += 61
+    assert limiter.try_acquire(priority=PRIORITY_HIGH)
+    assert limiter.rate_limited_responses == 1
+
+
+def test_headers_from_an_endpoint_with_its_own_policy_leave_the_bucket_alone(clock):
+    limiter = RateLimiter(3000, 300, reserve=5, endpoints=(SEARCH,))
+    session_headers = {'ratelimit-limit': '30', 'ratelimit-remaining': '29', 'ratelimit-policy': '30;w=300',
+                       'ratelimit-reset': str(clock.now + 300)}
+
+    limiter.observe(session_headers, 200, endpoint=CREATE_SESSION)
+    limiter.observe(session_headers, 429, endpoint=CREATE_SESSION)
+    # Endpoint unknown: a policy that isn't the bucket's own is ignored too
+    limiter.observe(session_headers, 200)
+
+    stats = limiter.stats()
+    assert (stats['limit'], stats['window'], stats['tokens'], stats['blocked_for']) == (3000, 300, 3000, 0)
+    assert stats['other_endpoints'][CREATE_SESSION]['limit'] == 30
+    assert limiter.try_acquire()
+
+
+def test_headers_from_the_shared_endpoint_update_the_policy(clock):
+    limiter = RateLimiter(3000, 300, endpoints=(SEARCH,))
+    limiter.observe({'ratelimit-limit': '6000', 'ratelimit-policy': '6000;w=600'}, 200, endpoint=SEARCH)
+    assert (limiter.limit, limiter.window) == (6000, 600)
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    limiter = RateLimiter(100, 1)
+    drain(limiter)
+    limiter.rate_limited(retry_after=0.5)  # Hold everyone until all waiters are queued
+
+    order = []
+
+    def wait(name, priority):
+        assert limiter.acquire(priority=priority, timeout=5)
+        order.append(name)
+
+    threads = []
+    for name, priority in (('low', PRIORITY_LOW), ('normal-1', PRIORITY_NORMAL), ('high', PRIORITY_HIGH),
+                           ('normal-2', PRIORITY_NORMAL)):
+        thread = threading.Thread(target=wait, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        while len(limiter._waiters) < len(threads):
+            time.sleep(0.001)
+
+    for thread in threads:
+        thread.join()
+    assert order == ['high', 'normal-1', 'normal-2', 'low']
+
+
+def test_acquire_times_out():
+    limiter = RateLimiter(1, 1000)
+    drain(limiter)
+    assert not limiter.acquire(timeout=0.05)
+    assert limiter.stats()['waiting'] == 0
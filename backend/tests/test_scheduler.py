@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from scheduler import AdaptiveScheduler
+
+
+@pytest.fixture
+def start():
+    # Just after every scheduler in the test is created, when all their keys are due
+    return time.monotonic() + 1
+
+
+def polled_twice(scheduler, start, posts):
+    """Record a backlog poll at start and a live poll 10s later for every key"""
+    for key in posts:
+        scheduler.record(key, 0, now=start)
+    for key, count in posts.items():
+        scheduler.record(key, count, now=start + 10)
+
+
+def test_every_key_is_due_at_start_and_first_polls_come_back_soon(start):
+    scheduler = AdaptiveScheduler(['hot', 'cold'], budget_per_second=10)
+    assert set(scheduler.due(now=start)) == {'hot', 'cold'}
+
+    scheduler.record('hot', 40, now=start)
+    assert scheduler.due(now=start) == ['cold']
+    # Longest overdue first
+    assert scheduler.due(now=start + scheduler.min_interval) == ['cold', 'hot']
+
+
+def test_hot_keys_are_polled_more_often_than_cold_ones(start):
+    scheduler = AdaptiveScheduler(['hot', 'cold'], budget_per_second=10)
+    polled_twice(scheduler, start, {'hot': 9, 'cold': 0})
+
+    intervals = scheduler.stats()['intervals']
+    assert intervals['cold'] == scheduler.max_interval
+    assert scheduler.min_interval <= intervals['hot'] < intervals['cold']
+    assert scheduler.due(now=start + 10 + intervals['hot']) == ['hot']
+
+
+def test_a_spike_or_exhausted_poll_is_due_again_immediately(start):
+    scheduler = AdaptiveScheduler(['a', 'b', 'c'], budget_per_second=10)
+    polled_twice(scheduler, start, {'a': 9, 'b': 9, 'c': 0})
+
+    scheduler.record('a', 50, now=start + 20)
+    scheduler.record('c', 1, exhausted=True, now=start + 20)
+    assert scheduler.spikes == 2
+    assert scheduler.due(now=start + 20) == ['a', 'c']
+    assert scheduler.seconds_until_next(now=start + 20) == 0.0
+
+
+def test_intervals_stretch_to_fit_the_request_budget(start):
+    keys = [f"k{index}" for index in range(5)]
+    generous = AdaptiveScheduler(keys, budget_per_second=100)
+    tight = AdaptiveScheduler(keys, budget_per_second=0.01)
+    for scheduler in (generous, tight):
+        polled_twice(scheduler, start, {key: 9 for key in keys})
+
+    generous_next = generous.seconds_until_next(now=start + 10)
+    tight_next = tight.seconds_until_next(now=start + 10)
+    assert generous_next < tight_next <= tight.max_interval
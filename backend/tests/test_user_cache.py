@@ -0,0 +1,46 @@
+import user_cache
+from user_cache import KnownUserCache, USER_KNOWN, USER_CHANGED, USER_UNKNOWN
+
+
+def user(user_id, handle='alice.bsky.social', display_name='Alice', avatar_url=''):
+    return {'user_id': user_id, 'handle': handle, 'display_name': display_name, 'avatar_url': avatar_url}
+
+
+def test_a_remembered_user_is_known_until_the_profile_changes():
+    cache = KnownUserCache()
+    assert cache.check(user('did:1')) == USER_UNKNOWN
+
+    cache.remember(user('did:1'))
+    assert cache.check(user('did:1')) == USER_KNOWN
+    assert cache.check(user('did:1', display_name='Alice (evacuated)')) == USER_CHANGED
+
+    cache.remember(user('did:1', display_name='Alice (evacuated)'))
+    assert cache.check(user('did:1', display_name='Alice (evacuated)')) == USER_KNOWN
+    assert cache.stats() == {'size': 1, 'hits': 2, 'misses': 1, 'changes': 1, 'hit_rate': 0.5}
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache.time, 'monotonic', lambda: now[0])
+    cache = KnownUserCache(ttl=60)
+    cache.remember(user('did:1'))
+
+    now[0] += 60
+    assert cache.check(user('did:1')) == USER_KNOWN
+    now[0] += 1
+    assert cache.check(user('did:1')) == USER_UNKNOWN
+    assert cache.stats()['size'] == 0
+
+
+def test_the_least_recently_used_user_is_evicted_and_forget_drops_one():
+    cache = KnownUserCache(max_users=2)
+    cache.remember(user('did:1'))
+    cache.remember(user('did:2'))
+    cache.check(user('did:1'))  # Now the most recently used
+    cache.remember(user('did:3'))
+
+    assert cache.check(user('did:2')) == USER_UNKNOWN
+    assert cache.check(user('did:1')) == USER_KNOWN
+
+    cache.forget('did:1')
+    assert cache.check(user('did:1')) == USER_UNKNOWN
@@ -0,0 +1,49 @@
+"""
+Text Cleaning
+
+Single definition of the text normalization used for both training
+(train.py) and serving (the ingestors). It produces exactly the output of the
+original six-pass clean_text from train.py:
+
+    remove URLs and @mentions, keep hashtag words without the '#',
+    replace other punctuation and digits with spaces, collapse whitespace,
+    lowercase
+
+using two precompiled regex passes plus a few str methods.
+"""
+
+import re
+
+# Pass 1, deleted outright:
+#   http\S+                 URLs
+#   @(?:(?!http\S)\w)+      mentions, stopping where a URL glued to the mention begins
+# Deleting (rather than spacing) these matters: "a@bob#tag" cleans to "atag".
+REMOVE_PATTERN = re.compile(r'http\S+|@(?:(?!http\S)\w)+')
+
+# Pass 2, replaced with a space:
+#   [^\w\s#]                punctuation other than '#'
+#   #(?!\w)                 a '#' that does not start a hashtag
+#   \d+                     digits
+# A '#' that starts a hashtag is left in place and dropped afterwards, so the
+# hashtag word stays joined to whatever precedes it, as in the original.
+SPACE_PATTERN = re.compile(r'[^\w\s#]|#(?!\w)|\d+')
+
+
+def clean_text(text):
+    """Clean text by removing URLs, mentions, special chars, etc."""
+    text = SPACE_PATTERN.sub(' ', REMOVE_PATTERN.sub('', text)).replace('#', '')
+    # Collapse whitespace and lowercase
+    return ' '.join(text.split()).lower()
+
+
+def clean_texts(texts):
+    """
+    Clean a batch of texts.
+
+    Args:
+        texts: Iterable of raw texts
+
+    Returns:
+        list: Cleaned texts in input order
+    """
+    return [clean_text(text) for text in texts]
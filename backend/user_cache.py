@@ -0,0 +1,95 @@
+"""
+Known User Cache
+
+In-process LRU/TTL cache of users already stored in DisasterFeed_Users.
+Each entry keeps a fingerprint of the user's profile (handle, display name,
+avatar) so a changed profile can be detected without reading the table.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+# Default cache parameters
+DEFAULT_MAX_USERS = 50000  # Entries kept before the least recently used is evicted
+DEFAULT_TTL = 6 * 60 * 60  # Seconds before an entry must be confirmed against the table again
+
+# Results of KnownUserCache.check()
+USER_KNOWN = 'known'
+USER_CHANGED = 'changed'
+USER_UNKNOWN = 'unknown'
+
+
+def profile_fingerprint(user_data):
+    """Build the tuple of profile fields used to detect profile changes"""
+    return (
+        user_data.get('handle', ''),
+        user_data.get('display_name', ''),
+        user_data.get('avatar_url', '')
+    )
+
+
+class KnownUserCache:
+    """Thread-safe LRU cache of user_id -> profile fingerprint with a TTL"""
+
+    def __init__(self, max_users=DEFAULT_MAX_USERS, ttl=DEFAULT_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (fingerprint, stored_at)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.changes = 0
+
+    def check(self, user_data):
+        """
+        Look up a user.
+
+        Returns:
+            str: USER_KNOWN if cached with the same profile, USER_CHANGED if cached
+            with a different profile, USER_UNKNOWN if absent or expired
+        """
+        user_id = user_data['user_id']
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return USER_UNKNOWN
+
+            self._entries.move_to_end(user_id)
+            if entry[0] != profile_fingerprint(user_data):
+                self.changes += 1
+                return USER_CHANGED
+
+            self.hits += 1
+            return USER_KNOWN
+
+    def remember(self, user_data):
+        """Record that a user (with this profile) is stored in the table"""
+        with self._lock:
+            self._entries[user_data['user_id']] = (profile_fingerprint(user_data), time.monotonic())
+            self._entries.move_to_end(user_data['user_id'])
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        """Drop a user from the cache"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.changes
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'changes': self.changes,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
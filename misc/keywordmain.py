@@ -4,7 +4,6 @@ from datetime import datetime, timedelta, timezone
 import json
 import os
 from atproto import Client, models
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, RobertaConfig
 import torch.nn.functional as F
 from dotenv import load_dotenv
 import re
@@ -12,6 +11,14 @@ import logging
 import uuid
 from decimal import Decimal
 from botocore.exceptions import ClientError
+import sys
+
+# Shared text cleaning, model loading and the classifier client live in backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from text_cleaning import clean_text
+from classifier_client import ClassifierClient
+from inference import MAX_SEQ_LENGTH
+from model_bundle import load_model_files
 
 # Set up logging
 logging.basicConfig(
@@ -32,25 +39,6 @@ DISASTER_KEYWORDS = [
     "collapsed", "destroyed", "devastation", "casualties"
 ]
 
-# Text cleaning
-def clean_text(text):
-    """Clean text by removing URLs, mentions, special chars, etc."""
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    # Remove mentions
-    text = re.sub(r'@\w+', '', text)
-    # Remove hashtags (keep the text after #)
-    text = re.sub(r'#(\w+)', r'\1', text)
-    # Remove special characters and numbers
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\d+', '', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Convert to lowercase
-    text = text.lower()
-    return text
-
-
 # Extract location from text - placeholder for future NLP implementation
 def extract_location(text):
     """
@@ -126,37 +114,8 @@ def init_dynamodb():
 def init_model(model_path):
     """Initialize AI model with proper error handling"""
     try:
-        logger.info(f"Loading model from {model_path}")
-
-        # Load tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-
-        # Define label mappings
-        id2label = {
-            0: "avalanche", 1: "blizzard", 2: "bush_fire", 3: "cyclone",
-            4: "dust_storm", 5: "earthquake", 6: "flood", 7: "forest_fire",
-            8: "haze", 9: "hurricane", 10: "landslide", 11: "meteor",
-            12: "storm", 13: "tornado", 14: "tsunami", 15: "typhoon",
-            16: "unknown", 17: "volcano", 18: "wild_fire"
-        }
-
-        # Create the reversed mapping
-        label2id = {v: k for k, v in id2label.items()}
-
-        # Create configuration
-        config = RobertaConfig.from_pretrained(
-            "roberta-base",
-            num_labels=19,
-            id2label=id2label,
-            label2id=label2id
-        )
-
-        # Load model
-        model = AutoModelForSequenceClassification.from_pretrained(
-            model_path,
-            config=config,
-            ignore_mismatched_sizes=True
-        )
+        # Model bundles load offline from memory-mapped weights; plain checkpoints still work
+        tokenizer, model, id2label = load_model_files(model_path)
 
         logger.info("Model loaded successfully")
         return tokenizer, model, id2label
@@ -502,8 +461,13 @@ def put_weather_data(dynamodb, weather_data):
 # Predict disaster type from text
 def predict_disaster(tokenizer, model, id2label, text):
     """Predict disaster type from text"""
+    if isinstance(model, ClassifierClient):
+        # Raises ClassifierUnavailable if the service is down, rather than calling the post a non-disaster
+        predictions, _ = model.predict([text])
+        return predictions[0]
+
     try:
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=MAX_SEQ_LENGTH)
         outputs = model(**inputs)
         probabilities = F.softmax(outputs.logits, dim=-1)
         predicted_index = probabilities.argmax().item()
@@ -959,7 +923,12 @@ def main(force_recreate_tables=False):
 
         # Initialize AI model
         MODEL_PATH = r'D:\School Stuff\UTD\2025\Project\Model\checkpoint-1800'
-        tokenizer, model, id2label = init_model(MODEL_PATH)
+        if os.getenv('CLASSIFIER_URL'):
+            # Use the shared classification service instead of loading the model here
+            logger.info(f"Using classification service at {os.getenv('CLASSIFIER_URL')}")
+            tokenizer, model, id2label = None, ClassifierClient(os.getenv('CLASSIFIER_URL')), None
+        else:
+            tokenizer, model, id2label = init_model(MODEL_PATH)
 
         # List existing tables
         logger.info("Listing existing tables...")
@@ -1,8 +1,8 @@
 import torch
 from torch import nn
 from datasets import load_dataset, Dataset
-from transformers import RobertaTokenizerFast, RobertaForSequenceClassification, Trainer, TrainingArguments
-from transformers import EarlyStoppingCallback
+from transformers import RobertaTokenizerFast, RobertaForSequenceClassification, Trainer, TrainingArguments, DataCollatorWithPadding
+from transformers import EarlyStoppingCallback, AutoModelForSequenceClassification
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, classification_report
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 from sklearn.model_selection import KFold
@@ -24,6 +24,16 @@ from optuna.integration import PyTorchLightningPruningCallback
 import nlpaug.augmenter.word as naw
 import plotly
 import matplotlib.colors as colors
+import sys
+import time
+import json
+
+# Shared text cleaning and serving constants live in backend/ so training and serving agree
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from text_cleaning import clean_texts
+from inference import MAX_SEQ_LENGTH  # Sequence length the ingestors truncate to
+from prefilter import HashedNgramModel, hashed_features, positive_score_quantiles, DEFAULT_N_FEATURES, DEFAULT_NGRAM
+from model_bundle import export_bundle
 
 # Download NLTK resources
 nltk.download('stopwords')
@@ -53,28 +63,22 @@ figures_dir = os.path.join(output_dir, "figures")
 os.makedirs(output_dir, exist_ok=True)
 os.makedirs(figures_dir, exist_ok=True)
 
+# What to train: "classifier" fine-tunes RoBERTa, "prefilter" trains the cheap cascade model in backend/prefilter.py,
+# "distill" trains a small student model from a fine-tuned teacher checkpoint
+TRAIN_MODE = os.getenv('TRAIN_MODE', 'classifier')
+PREFILTER_RECALL_TARGET = float(os.getenv('PREFILTER_RECALL_TARGET', 0.99))  # Validation recall the threshold must keep
+PREFILTER_NEGATIVE_LABELS = {'unknown'}  # Labels treated as "not a disaster" by the prefilter
+
+# Knowledge distillation settings (TRAIN_MODE=distill)
+TEACHER_MODEL_PATH = os.getenv('TEACHER_MODEL_PATH', output_dir)  # Fine-tuned RoBERTa checkpoint
+STUDENT_MODEL = os.getenv('STUDENT_MODEL', 'distilroberta-base')  # 6 layers, same tokenizer as roberta-base
+DISTILL_TEMPERATURE = float(os.getenv('DISTILL_TEMPERATURE', 2.0))  # Softens teacher and student distributions
+DISTILL_ALPHA = float(os.getenv('DISTILL_ALPHA', 0.7))  # Weight of the soft-target loss vs. the hard-label loss
+
 
 # ============================
 # 1. TEXT CLEANING FUNCTIONS
 # ============================
-def clean_text(text):
-    """Clean text by removing URLs, mentions, special chars, etc."""
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    # Remove mentions
-    text = re.sub(r'@\w+', '', text)
-    # Remove hashtags (keep the text after #)
-    text = re.sub(r'#(\w+)', r'\1', text)
-    # Remove special characters and numbers
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\d+', ' ', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Convert to lowercase
-    text = text.lower()
-    return text
-
-
 def advanced_preprocessing(text, remove_stopwords=False, lemmatize=False):
     """Apply advanced preprocessing options like stopword removal and lemmatization"""
     if remove_stopwords:
@@ -347,6 +351,7 @@ def objective(trial, train_dataset, eval_dataset, tokenizer, num_labels, id2labe
         logging_dir=os.path.join(logging_dir, f"trial_{trial.number}"),
         logging_steps=100,
         report_to="none",  # Disable reporting during HPO
+        group_by_length=True,  # Batch similar lengths together to minimize padding
     )
 
     # Initialize trainer
@@ -357,6 +362,7 @@ def objective(trial, train_dataset, eval_dataset, tokenizer, num_labels, id2labe
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
         tokenizer=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8),
         compute_metrics=compute_metrics_trainer_multiclass
     )
 
@@ -558,6 +564,207 @@ def plot_training_history(trainer):
         plt.close()
 
 
+# ============================
+# 7. PREFILTER TRAINING
+# ============================
+def featurize_prefilter(texts):
+    """Sparse binary matrix of hashed word n-grams, matching prefilter.hashed_features at serving time"""
+    from scipy.sparse import csr_matrix
+
+    indices, indptr = [], [0]
+    for text in texts:
+        indices.extend(sorted(hashed_features(text, DEFAULT_N_FEATURES, DEFAULT_NGRAM)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return csr_matrix((data, indices, indptr), shape=(len(texts), DEFAULT_N_FEATURES))
+
+
+def train_prefilter_model(dataset, output_path, recall_target=PREFILTER_RECALL_TARGET):
+    """Train the hashed n-gram logistic regression and pick its threshold on the validation set"""
+    from sklearn.linear_model import LogisticRegression
+
+    # The prefilter sees the same clean_text the ingestors produce, without the training-only preprocessing
+    train_texts = clean_texts(dataset['train']['text'])
+    train_labels = [label not in PREFILTER_NEGATIVE_LABELS for label in dataset['train']['event_type_detail']]
+    eval_texts = clean_texts(dataset['validation']['text'])
+    eval_labels = [label not in PREFILTER_NEGATIVE_LABELS for label in dataset['validation']['event_type_detail']]
+    logger.info(f"Training prefilter on {len(train_texts)} texts ({sum(train_labels)} disaster posts)")
+
+    classifier = LogisticRegression(C=1.0, class_weight='balanced', max_iter=1000, solver='liblinear')
+    classifier.fit(featurize_prefilter(train_texts), train_labels)
+
+    coefficients = classifier.coef_[0]
+    weights = {int(index): float(coefficients[index]) for index in np.flatnonzero(coefficients)}
+    eval_scores = classifier.predict_proba(featurize_prefilter(eval_texts))[:, 1]
+    positive_scores = [score for score, label in zip(eval_scores, eval_labels) if label]
+    negative_scores = [score for score, label in zip(eval_scores, eval_labels) if not label]
+    model = HashedNgramModel(weights, float(classifier.intercept_[0]), quantiles=positive_score_quantiles(positive_scores))
+
+    # Report what the chosen threshold does on the validation set
+    threshold = model.threshold_for_recall(recall_target)
+    recall = float(np.mean([score >= threshold for score in positive_scores])) if positive_scores else 0.0
+    rejected = float(np.mean([score < threshold for score in eval_scores])) if len(eval_scores) else 0.0
+    negatives_rejected = float(np.mean([score < threshold for score in negative_scores])) if negative_scores else 0.0
+    logger.info(f"Prefilter threshold {threshold:.4f} for recall target {recall_target}: validation recall {recall:.4f}, "
+                f"{rejected:.1%} of all and {negatives_rejected:.1%} of non-disaster validation posts rejected")
+
+    model.save(output_path, metadata={'recall_target': recall_target, 'validation_recall': recall,
+                                      'validation_rejected': rejected, 'train_size': len(train_texts)})
+    logger.info(f"Prefilter model saved to {output_path}")
+    return model
+
+
+# ============================
+# 8. KNOWLEDGE DISTILLATION
+# ============================
+class DistillationTrainer(Trainer):
+    """Trains a student on the teacher's softened logits plus the true labels"""
+
+    def __init__(self, teacher_model=None, temperature=2.0, alpha=0.5, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher_model.to(self.args.device).eval()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        labels = inputs.pop("labels")
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(**inputs).logits
+
+        # KL divergence between the softened distributions, scaled by T^2 to keep gradient magnitudes comparable
+        temperature = self.temperature
+        soft_loss = nn.functional.kl_div(
+            nn.functional.log_softmax(outputs.logits / temperature, dim=-1),
+            nn.functional.softmax(teacher_logits / temperature, dim=-1),
+            reduction="batchmean"
+        ) * temperature ** 2
+        hard_loss = nn.CrossEntropyLoss()(outputs.logits, labels)
+        loss = self.alpha * soft_loss + (1 - self.alpha) * hard_loss
+
+        return (loss, outputs) if return_outputs else loss
+
+
+def measure_cpu_latency(model, tokenizer, texts, batch_size=32):
+    """Milliseconds per post for batched CPU inference"""
+    model = model.to('cpu').eval()
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors="pt", truncation=True, padding=True,
+                           max_length=MAX_SEQ_LENGTH)
+        with torch.inference_mode():
+            model(**inputs)
+    return 1000 * (time.perf_counter() - started) / max(1, len(texts))
+
+
+def model_size_mb(model):
+    """Size of the model's parameters in MB"""
+    return sum(parameter.numel() * parameter.element_size() for parameter in model.parameters()) / (1024 * 1024)
+
+
+def distill_student(dataset, teacher_path, student_name, student_dir):
+    """Distill the fine-tuned teacher into a smaller student and compare the two on the test split"""
+    tokenizer = RobertaTokenizerFast.from_pretrained(teacher_path)
+    teacher = AutoModelForSequenceClassification.from_pretrained(teacher_path)
+    id2label = {int(index): label for index, label in teacher.config.id2label.items()}
+    label2id = {label: index for index, label in id2label.items()}
+
+    # Serving sees clean_text output, so the student learns (and is measured) on the same input
+    def prepare(split):
+        split = split.filter(lambda example: example['event_type_detail'] in label2id)
+        texts = clean_texts(split['text'])
+        tokenized = Dataset.from_dict({
+            'text': texts,
+            'labels': [label2id[label] for label in split['event_type_detail']]
+        }).map(lambda examples: tokenizer(examples['text'], truncation=True, max_length=MAX_SEQ_LENGTH), batched=True)
+        tokenized.set_format("torch", columns=["input_ids", "attention_mask", "labels"])
+        return texts, tokenized
+
+    _, train_split = prepare(dataset['train'])
+    _, eval_split = prepare(dataset['validation'])
+    test_texts, test_split = prepare(dataset['test'])
+
+    student = AutoModelForSequenceClassification.from_pretrained(
+        student_name,
+        num_labels=len(id2label),
+        id2label=id2label,
+        label2id=label2id
+    )
+    logger.info(f"Distilling {teacher_path} ({teacher.config.num_hidden_layers} layers) into {student_name} "
+                f"({student.config.num_hidden_layers} layers) on {len(train_split)} examples")
+
+    data_collator = DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8)
+    distill_args = TrainingArguments(
+        output_dir=student_dir,
+        num_train_epochs=6,
+        per_device_train_batch_size=32,
+        per_device_eval_batch_size=64,
+        learning_rate=5e-5,
+        weight_decay=0.01,
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        metric_for_best_model="f1_weighted",
+        logging_dir=os.path.join(logging_dir, "distillation"),
+        logging_steps=50,
+        report_to="tensorboard",
+        group_by_length=True,
+    )
+    trainer = DistillationTrainer(
+        teacher_model=teacher,
+        temperature=DISTILL_TEMPERATURE,
+        alpha=DISTILL_ALPHA,
+        model=student,
+        args=distill_args,
+        train_dataset=train_split,
+        eval_dataset=eval_split,
+        tokenizer=tokenizer,
+        data_collator=data_collator,
+        compute_metrics=lambda p: {
+            'accuracy': accuracy_score(p[1], np.argmax(p[0], axis=1)),
+            'f1_weighted': f1_score(p[1], np.argmax(p[0], axis=1), average='weighted')
+        }
+    )
+    trainer.add_callback(EarlyStoppingCallback(early_stopping_patience=2))
+    trainer.train()
+    trainer.save_model(student_dir)
+    tokenizer.save_pretrained(student_dir)
+
+    # Compare teacher and student on the test split
+    true_labels = np.array(test_split['labels'])
+    report = {}
+    for name, model in (('teacher', teacher), ('student', trainer.model)):
+        predictions = Trainer(model=model, args=distill_args, data_collator=data_collator).predict(test_split)
+        predicted_labels = np.argmax(predictions.predictions, axis=1)
+        report[name] = {
+            'layers': model.config.num_hidden_layers,
+            'parameters': sum(parameter.numel() for parameter in model.parameters()),
+            'size_mb': round(model_size_mb(model), 1),
+            'accuracy': round(float(accuracy_score(true_labels, predicted_labels)), 4),
+            'f1_weighted': round(float(f1_score(true_labels, predicted_labels, average='weighted')), 4),
+            'cpu_ms_per_post': round(measure_cpu_latency(model, tokenizer, test_texts[:512]), 2)
+        }
+    report['accuracy_delta'] = round(report['student']['accuracy'] - report['teacher']['accuracy'], 4)
+    report['f1_delta'] = round(report['student']['f1_weighted'] - report['teacher']['f1_weighted'], 4)
+    report['speedup'] = round(report['teacher']['cpu_ms_per_post'] / max(report['student']['cpu_ms_per_post'], 1e-6), 2)
+
+    for name in ('teacher', 'student'):
+        logger.info(f"{name}: " + ", ".join(f"{key}={value}" for key, value in report[name].items()))
+    logger.info(f"Accuracy delta {report['accuracy_delta']:+.4f}, F1 delta {report['f1_delta']:+.4f}, "
+                f"CPU speedup {report['speedup']}x")
+
+    with open(os.path.join(student_dir, "distillation_report.json"), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+
+    # Offline bundle for the ingestors
+    bundle_dir = os.path.join(student_dir, "bundle")
+    export_bundle(trainer.model, tokenizer, bundle_dir, id2label,
+                  metadata={'teacher': teacher_path, 'student': student_name,
+                            'test_f1_weighted': report['student']['f1_weighted']})
+    logger.info(f"Student model saved to '{student_dir}' (use the bundle '{bundle_dir}' as MODEL_PATH)")
+    return report
+
+
 # ============================
 # MAIN PROCESSING PIPELINE
 # ============================
@@ -565,6 +772,16 @@ def plot_training_history(trainer):
 logger.info("Loading dataset...")
 dataset = load_dataset("melisekm/natural-disasters-from-social-media")
 
+# Prefilter mode trains only the cascade model, on the full training split
+if TRAIN_MODE == 'prefilter':
+    train_prefilter_model(dataset, os.path.join(output_dir, "prefilter_model.json"))
+    sys.exit(0)
+
+# Distillation mode trains a small student from the fine-tuned teacher, on the full splits
+if TRAIN_MODE == 'distill':
+    distill_student(dataset, TEACHER_MODEL_PATH, STUDENT_MODEL, os.path.join(output_dir, "student"))
+    sys.exit(0)
+
 # Limit training dataset to 1000 samples while maintaining class distribution
 train_dataset_full = dataset['train']
 logger.info(f"Original training dataset size: {len(train_dataset_full)}")
@@ -643,7 +860,7 @@ logger.info("Applying text cleaning...")
 
 def preprocess_dataset(dataset):
     # Clean text
-    cleaned_texts = [clean_text(text) for text in dataset['text']]
+    cleaned_texts = clean_texts(dataset['text'])
     # Apply advanced preprocessing
     processed_texts = [advanced_preprocessing(text, remove_stopwords=False, lemmatize=True) for text in cleaned_texts]
 
@@ -700,8 +917,9 @@ model_name = "roberta-base"
 tokenizer = RobertaTokenizerFast.from_pretrained(model_name)
 
 
+# Truncate only; each batch is padded to its own longest text by the data collator
 def tokenize_function(examples):
-    return tokenizer(examples["text"], padding="max_length", truncation=True, max_length=128)
+    return tokenizer(examples["text"], truncation=True, max_length=MAX_SEQ_LENGTH)
 
 
 tokenized_train_dataset = train_dataset_augmented.map(tokenize_function, batched=True)
@@ -762,6 +980,7 @@ training_args = TrainingArguments(
     logging_dir=logging_dir,
     logging_steps=20,
     report_to="tensorboard",
+    group_by_length=True,  # Batch similar lengths together to minimize padding
 )
 
 
@@ -782,6 +1001,7 @@ trainer = WeightedLossTrainer(
     train_dataset=tokenized_train_dataset,
     eval_dataset=tokenized_eval_dataset,
     tokenizer=tokenizer,
+    data_collator=DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8),
     compute_metrics=compute_metrics_trainer_multiclass
 )
 
@@ -830,6 +1050,12 @@ plot_confusion_matrix(true_labels, predicted_labels, all_event_types)
 trainer.save_model(output_dir)
 tokenizer.save_pretrained(output_dir)
 
+# 19. Export the offline model bundle the ingestors load (MODEL_PATH)
+bundle_dir = os.path.join(output_dir, "bundle")
+export_bundle(trainer.model, tokenizer, bundle_dir, {index: event_type for event_type, index in label2id.items()},
+              metadata={'test_f1_weighted': float(metrics['f1_weighted'])})
+
 logger.info(f"\nEnhanced training complete! Fine-tuned model and tokenizer saved to '{output_dir}'.")
+logger.info(f"Model bundle for the ingestors saved to '{bundle_dir}'")
 logger.info(f"Training logs are saved to '{log_file_path}'")
 logger.info(f"Visualizations are saved in '{figures_dir}'")
\ No newline at end of file